@@ -0,0 +1,112 @@
+"""
+專業領域匹配指派基準測試
+
+在內存中構建 N 名銷售人員（隨機的專業領域、區域與工作負荷）的 SalesRepIndex，
+對隨機生成的機會分別用倒排索引匹配與逐個評分全部銷售人員的掃描選擇銷售人員，
+校驗兩者選出的得分一致，並報告每次選擇的延遲。每次選擇後被選中者的負荷加一，
+與實際指派一樣增量更新索引。索引匹配的p99超出預算時以非零狀態退出。
+得分一致性另由 tests/test_crm_index.py 以固定種子校驗（含同分、沒有專業領域與未知區域）。
+
+用法:
+    python bench_assignment.py --reps 10000 --queries 5000 --budget-us 1000
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+
+from crm_main import SalesRepIndex, match_score, normalize_region, split_terms
+
+INDUSTRIES = [
+    '金融', '保險', '製造業', '零售', '電商', '醫療', '教育', '物流', '能源', '政府',
+    '電信', '媒體', '遊戲', '半導體', '汽車', '房地產', '餐飲', '旅遊', '農業', '化工',
+    'saas', 'fintech', 'healthcare', 'retail', 'logistics', 'automotive', 'energy', 'telecom',
+    'biotech', 'insurance', 'education', 'media', 'gaming', 'hardware', 'security', 'cloud',
+    'consulting', 'legal', 'nonprofit', 'hospitality',
+]
+REGIONS = ['台北', '新北', '桃園', '台中', '台南', '高雄', '新竹', '基隆', '嘉義', '宜蘭',
+           '花蓮', '台東', '屏東', '苗栗', '彰化', '南投', '雲林', '澎湖', '金門', '馬祖',
+           '上海', '北京', '深圳', '廣州', '香港', '新加坡', '東京', '首爾', '曼谷', '吉隆坡']
+WEIGHTS = (10.0, 5.0, 1.0)
+
+
+def _percentile(samples, pct):
+    return samples[min(len(samples) - 1, int(len(samples) * pct))]
+
+
+def _build(count, rng):
+    reps = {}
+    index = SalesRepIndex()
+    for rep_id in range(1, count + 1):
+        specialization = '、'.join(rng.sample(INDUSTRIES, rng.randint(1, 3)))
+        region = rng.choice(REGIONS)
+        workload = rng.randint(0, 100)
+        reps[rep_id] = [split_terms(specialization), normalize_region(region), workload]
+        index.upsert(rep_id, specialization, region, workload)
+    return reps, index
+
+
+def _scan(reps, terms, region):
+    """逐個評分全部銷售人員"""
+    return max(
+        ((rep_id, match_score(rep_terms, rep_region, workload, terms, region, WEIGHTS))
+         for rep_id, (rep_terms, rep_region, workload) in reps.items()),
+        key=lambda item: item[1],
+    )
+
+
+def _run(reps, index, queries):
+    """依次為每個機會分別用兩種方式在同一狀態下選擇，校驗得分一致後按索引的選擇增加負荷"""
+    samples = {"scan": [], "index": []}
+    mismatches = 0
+    for industry, region in queries:
+        start = time.perf_counter()
+        _, scan_score = _scan(reps, split_terms(industry), normalize_region(region))
+        samples["scan"].append((time.perf_counter() - start) * 1e6)
+
+        start = time.perf_counter()
+        rep_id, score = index.match(split_terms(industry), region, WEIGHTS)
+        samples["index"].append((time.perf_counter() - start) * 1e6)
+
+        mismatches += abs(score - scan_score) > 1e-9
+        reps[rep_id][2] += 1
+        index.set_workload(rep_id, reps[rep_id][2])
+    return samples, mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="專業領域匹配指派基準測試")
+    parser.add_argument("--reps", type=int, default=10000, help="銷售人員數")
+    parser.add_argument("--queries", type=int, default=5000, help="指派的機會數")
+    parser.add_argument("--budget-us", type=float, default=1000, help="索引匹配p99延遲預算（微秒）")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    queries = [('、'.join(rng.sample(INDUSTRIES, rng.randint(1, 2))), rng.choice(REGIONS + [None]))
+               for _ in range(args.queries)]
+
+    reps, index = _build(args.reps, random.Random(7))
+    samples, mismatches = _run(reps, index, queries)
+    print(f"{args.reps} 名銷售人員，{args.queries} 個機會")
+    print(f"{'方式':<8} {'p50(µs)':>10} {'p99(µs)':>10}")
+    results = {}
+    for name, values in samples.items():
+        values.sort()
+        results[name] = (statistics.median(values), _percentile(values, 0.99))
+        print(f"{name:<8} {results[name][0]:10.1f} {results[name][1]:10.1f}")
+    print(f"得分不一致: {mismatches}")
+
+    failures = []
+    if mismatches:
+        failures.append(f"{mismatches} 個機會的索引匹配得分與全量掃描不一致")
+    if results["index"][1] > args.budget_us:
+        failures.append(f"索引匹配p99 {results['index'][1]:.0f}µs 超出預算 {args.budget_us:.0f}µs")
+    if failures:
+        print("\n".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
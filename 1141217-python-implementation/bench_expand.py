@@ -0,0 +1,122 @@
+"""
+關聯展開（expand=）查詢次數校驗與基準測試
+
+在臨時SQLite數據庫中生成不同數量的客戶（每個客戶若干機會，機會指派給銷售人員），
+分別請求 /api/customers 與 /api/opportunities 的各種 expand 組合，統計每個請求發出的SQL條數，
+並與逐行訪問惰性關聯（N+1）的寫法對比。
+
+展開後的查詢次數應為 1 + 每個展開關聯的 IN 查詢數（SQLAlchemy 每條 IN 查詢最多帶500個鍵），
+與行數無關；任一請求超出該上限時以非零狀態退出。tests/test_crm_expand.py 以小數據量校驗同一性質。
+
+用法:
+    python bench_expand.py --customers 10,100,1000 --opportunities-per-customer 5 --reps 50
+"""
+
+import argparse
+import math
+import os
+import sys
+import tempfile
+import time
+
+# selectinload 每條 IN 查詢攜帶的最大鍵數
+IN_CHUNK = 500
+
+db_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+db_file.close()
+os.environ["DATABASE_URL"] = "sqlite:///" + db_file.name
+
+from sqlalchemy import event  # noqa: E402
+
+from crm_main import Customer, Opportunity, SalesRep, app, db  # noqa: E402
+
+
+class QueryCounter:
+    """統計引擎上執行的SQL條數"""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def _seed(customers, per_customer, reps):
+    db.drop_all()
+    db.create_all()
+    db.session.add_all(SalesRep(name=f"銷售{i}", email=f"rep{i}@example.com") for i in range(reps))
+    db.session.add_all(Customer(name=f"客戶{i}", email=f"c{i}@example.com") for i in range(customers))
+    db.session.flush()
+    db.session.add_all(
+        Opportunity(name=f"機會{c}-{k}", amount=1000.0, stage="潛在", customer_id=c + 1,
+                    assigned_to=(c * per_customer + k) % reps + 1)
+        for c in range(customers) for k in range(per_customer)
+    )
+    db.session.commit()
+    db.session.remove()
+
+
+def _naive_customers():
+    """不使用 expand 時客戶端所需數據的等價寫法：逐個客戶訪問惰性關聯"""
+    return [
+        dict(customer.to_dict(), opportunities=[
+            dict(opp.to_dict(), sales_rep=opp.sales_rep.to_dict() if opp.sales_rep else None)
+            for opp in customer.opportunities
+        ])
+        for customer in Customer.query.all()
+    ]
+
+
+def _measure(counter, func):
+    db.session.remove()
+    counter.count = 0
+    start = time.perf_counter()
+    func()
+    return counter.count, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="關聯展開查詢次數校驗")
+    parser.add_argument("--customers", default="10,100,1000", help="逗號分隔的客戶數")
+    parser.add_argument("--opportunities-per-customer", type=int, default=5)
+    parser.add_argument("--reps", type=int, default=50, help="銷售人員數")
+    args = parser.parse_args()
+
+    client = app.test_client()
+    failures = []
+    try:
+        with app.app_context():
+            counter = QueryCounter(db.engine)
+            print(f"{'客戶數':>8} {'請求':<52} {'SQL條數':>8} {'上限':>6} {'耗時(ms)':>10}")
+            for customers in map(int, args.customers.split(",")):
+                _seed(customers, args.opportunities_per_customer, args.reps)
+                opportunities = customers * args.opportunities_per_customer
+                reps = min(args.reps, opportunities)
+                cases = [
+                    ("/api/customers", 1),
+                    ("/api/customers?expand=opportunities", 1 + math.ceil(customers / IN_CHUNK)),
+                    ("/api/customers?expand=opportunities.sales_rep",
+                     1 + math.ceil(customers / IN_CHUNK) + math.ceil(reps / IN_CHUNK)),
+                    ("/api/opportunities?expand=customer,sales_rep",
+                     1 + math.ceil(customers / IN_CHUNK) + math.ceil(reps / IN_CHUNK)),
+                    ("/api/customers/1?expand=opportunities.sales_rep", 3),
+                ]
+                for url, limit in cases:
+                    queries, elapsed = _measure(counter, lambda: client.get(url))
+                    print(f"{customers:>8} {url:<52} {queries:>8} {limit:>6} {elapsed:>10.1f}")
+                    if queries > limit:
+                        failures.append(f"{url}（{customers}個客戶）發出 {queries} 條SQL，上限 {limit}")
+                queries, elapsed = _measure(counter, _naive_customers)
+                print(f"{customers:>8} {'逐行訪問惰性關聯 (N+1)':<52} {queries:>8} {'-':>6} {elapsed:>10.1f}")
+            db.engine.dispose()
+    finally:
+        os.unlink(db_file.name)
+
+    if failures:
+        print("\n".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+crm_main 測試的公共配置
+
+crm_main 在導入時按環境變量 DATABASE_URL 創建應用與引擎：在臨時目錄中的SQLite文件上導入，
+導入後恢復環境變量，不影響同一進程中的其他測試
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_previous = os.environ.get('DATABASE_URL')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='crm-main-tests-'), 'crm.db')
+try:
+    import crm_main
+finally:
+    if _previous is None:
+        del os.environ['DATABASE_URL']
+    else:
+        os.environ['DATABASE_URL'] = _previous
+
+
+@pytest.fixture
+def db():
+    """每個測試使用重建的空表，並使指派引擎下次使用時重新加載"""
+    with crm_main.app.app_context():
+        crm_main.db.drop_all()
+        crm_main.db.create_all()
+        crm_main.assignment_engine.invalidate()
+        yield crm_main.db
+        crm_main.db.session.remove()
+
+
+@pytest.fixture
+def client(db):
+    return crm_main.app.test_client()
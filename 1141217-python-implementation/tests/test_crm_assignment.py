@@ -0,0 +1,155 @@
+"""
+銷售機會指派：併發指派後工作負荷與實際指派數一致、改派衝突、數據庫升級
+"""
+
+import logging
+import threading
+
+import pytest
+from sqlalchemy import create_engine, func, inspect, select, text
+
+import crm_main
+from crm_main import Customer, Opportunity, OpportunityService, SalesRep, reassign, upgrade_schema
+
+
+@pytest.fixture(autouse=True)
+def quiet_logs():
+    # 併發衝突時服務會記錄錯誤日誌，測試中不輸出
+    logging.disable(logging.CRITICAL)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+def _seed(db, reps=4, opportunities=40):
+    db.session.add(Customer(name='客戶'))
+    db.session.add_all(
+        SalesRep(name=f'銷售{i}', email=f'rep{i}@example.com', workload=0,
+                 specialization='金融、保險' if i % 2 else '製造業', region='台北' if i < 2 else '高雄')
+        for i in range(reps)
+    )
+    db.session.commit()
+    db.session.add_all(
+        Opportunity(name=f'機會{i}', amount=1000.0, customer_id=1, industry='金融', region='台北')
+        for i in range(opportunities)
+    )
+    db.session.commit()
+    db.session.remove()
+
+
+def _assigned_counts(db):
+    return dict(db.session.execute(
+        select(Opportunity.assigned_to, func.count())
+        .where(Opportunity.assigned_to.isnot(None))
+        .group_by(Opportunity.assigned_to)
+    ).all())
+
+
+def _workloads(db):
+    return {rep.id: rep.workload for rep in SalesRep.query.order_by(SalesRep.id)}
+
+
+def test_concurrent_assignments_keep_workloads_exact(db):
+    _seed(db)
+    app = crm_main.app
+    errors = []
+
+    def run(action):
+        with app.app_context():
+            try:
+                action()
+            except Exception as e:  # 衝突與SQLite的鎖等待超時都回滾，不影響一致性
+                errors.append(e)
+            finally:
+                db.session.remove()
+
+    def assign_each(rep_id, strategy):
+        for opportunity_id in range(1, 41):
+            run(lambda: OpportunityService.assign_opportunity(opportunity_id, rep_id, strategy))
+
+    def assign_batches():
+        for _ in range(10):
+            run(lambda: OpportunityService.assign_unassigned(5))
+
+    threads = [
+        threading.Thread(target=assign_each, args=(1, 'load_balancing')),
+        threading.Thread(target=assign_each, args=(2, 'load_balancing')),
+        threading.Thread(target=assign_each, args=(None, 'specialization')),
+        threading.Thread(target=assign_each, args=(None, 'load_balancing')),
+        threading.Thread(target=assign_batches),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    db.session.remove()
+    counts = _assigned_counts(db)
+    assert sum(counts.values()) > 0
+    # 每次指派都在同一事務內原子地調整雙方的負荷，無需重算即一致
+    assert OpportunityService.reconcile_workloads(check=True) == []
+    assert _workloads(db) == {rep_id: counts.get(rep_id, 0) for rep_id in range(1, 5)}
+
+
+def test_reconcile_repairs_drift(db):
+    _seed(db, opportunities=6)
+    OpportunityService.assign_unassigned(6)
+    db.session.execute(text('UPDATE sales_reps SET workload = 99 WHERE id = 1'))
+    db.session.commit()
+
+    drift = OpportunityService.reconcile_workloads()
+    assert [(rep_id, workload) for rep_id, workload, _ in drift] == [(1, 99)]
+    db.session.remove()
+    counts = _assigned_counts(db)
+    assert _workloads(db) == {rep_id: counts.get(rep_id, 0) for rep_id in range(1, 5)}
+
+
+def test_reassign_detects_concurrent_change(db):
+    _seed(db, opportunities=1)
+    OpportunityService.assign_opportunity(1, 1)
+    db.session.remove()
+
+    opportunity = db.session.get(Opportunity, 1)
+    # 讀取之後，另一個連接把機會改派給銷售人員3
+    engine = create_engine(crm_main.app.config['SQLALCHEMY_DATABASE_URI'])
+    try:
+        with engine.begin() as connection:
+            connection.execute(text('UPDATE opportunities SET assigned_to = 3 WHERE id = 1'))
+            connection.execute(text('UPDATE sales_reps SET workload = workload - 1 WHERE id = 1'))
+            connection.execute(text('UPDATE sales_reps SET workload = workload + 1 WHERE id = 3'))
+    finally:
+        engine.dispose()
+
+    with pytest.raises(ValueError, match='已被其他請求改派'):
+        reassign(opportunity, 2)
+    db.session.rollback()
+    db.session.remove()
+
+    assert db.session.get(Opportunity, 1).assigned_to == 3
+    assert _workloads(db) == {1: 0, 2: 0, 3: 1, 4: 0}
+
+
+def test_assignment_to_missing_rep_is_rejected(db, client):
+    _seed(db, opportunities=1)
+    response = client.post('/api/opportunities/1/assign', json={'sales_rep_id': 99})
+    assert response.status_code == 400
+    db.session.remove()
+    assert db.session.get(Opportunity, 1).assigned_to is None
+    assert OpportunityService.reconcile_workloads(check=True) == []
+
+
+def test_upgrade_schema_adds_missing_columns(db):
+    db.drop_all()
+    # 加入行業與區域之前的機會表
+    db.session.execute(text(
+        'CREATE TABLE opportunities (id INTEGER PRIMARY KEY, name VARCHAR(255) NOT NULL, amount FLOAT, '
+        'stage VARCHAR(50), customer_id INTEGER NOT NULL, assigned_to INTEGER, expected_close_date DATE, '
+        'created_at DATETIME, updated_at DATETIME)'
+    ))
+    db.session.execute(text("INSERT INTO opportunities (id, name, customer_id) VALUES (1, '舊機會', 1)"))
+    db.session.commit()
+
+    assert upgrade_schema() == ['opportunities.industry', 'opportunities.region']
+    assert upgrade_schema() == []
+    columns = {column['name'] for column in inspect(db.engine).get_columns('opportunities')}
+    assert {'industry', 'region'} <= columns
+    assert db.session.get(Opportunity, 1).industry is None
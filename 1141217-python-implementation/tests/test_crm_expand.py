@@ -0,0 +1,82 @@
+"""
+關聯展開（expand=）的查詢次數
+
+展開的關聯以 selectinload 批量加載：每個請求的SQL條數只取決於展開了哪些關聯，與行數無關；
+未展開的關聯設為 raiseload，意外訪問直接報錯
+"""
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import InvalidRequestError
+
+from crm_main import Customer, Opportunity, SalesRep, parse_expand
+
+
+def _seed(db, customers, per_customer=3, reps=5):
+    db.session.add_all(SalesRep(name=f"銷售{i}", email=f"rep{i}@example.com") for i in range(reps))
+    db.session.add_all(Customer(name=f"客戶{i}", email=f"c{i}@example.com") for i in range(customers))
+    db.session.flush()
+    db.session.add_all(
+        Opportunity(name=f"機會{c}-{k}", amount=1000.0, stage="潛在", customer_id=c + 1,
+                    assigned_to=(c * per_customer + k) % reps + 1)
+        for c in range(customers) for k in range(per_customer)
+    )
+    db.session.commit()
+    db.session.remove()
+
+
+def _count_queries(db, client, url):
+    """返回請求執行的SQL條數與響應"""
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return len(statements), response
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('/api/customers?expand=opportunities.sales_rep', 3),
+    ('/api/opportunities?expand=customer,sales_rep', 3),
+])
+def test_expanded_queries_do_not_grow_with_rows(db, client, url, expected):
+    counts = []
+    for customers in (10, 100):
+        db.drop_all()
+        db.create_all()
+        _seed(db, customers)
+        queries, response = _count_queries(db, client, url)
+        assert response.status_code == 200
+        assert len(response.get_json()['data']) == customers * (1 if url.startswith('/api/customers') else 3)
+        counts.append(queries)
+    assert counts == [expected, expected]
+
+
+def test_expanded_payload_is_nested(db, client):
+    _seed(db, 2, per_customer=2, reps=2)
+    data = client.get('/api/customers?expand=opportunities.sales_rep').get_json()['data']
+    opportunity = data[0]['opportunities'][0]
+    assert opportunity['customer_id'] == data[0]['id']
+    assert opportunity['sales_rep']['id'] == opportunity['assigned_to']
+
+
+def test_unexpanded_relationship_raises(db):
+    _seed(db, 2)
+    options, _ = parse_expand(Customer, 'opportunities')
+    customer = Customer.query.options(*options).first()
+    # 已展開的關聯可以訪問
+    opportunity = customer.opportunities[0]
+    with pytest.raises(InvalidRequestError):
+        opportunity.sales_rep
+
+
+@pytest.mark.parametrize('expand', ['bogus', 'opportunities.sales_rep.opportunities'])
+def test_invalid_expand_is_rejected(db, client, expand):
+    response = client.get(f'/api/customers?expand={expand}')
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
@@ -0,0 +1,103 @@
+"""
+SalesRepIndex.match 的提前終止：倒排索引選出的得分必須與逐個評分全部銷售人員的最高得分相同
+"""
+
+import random
+
+import pytest
+
+from crm_main import SalesRepIndex, match_score, normalize_region, split_terms
+
+INDUSTRIES = ['金融', '保險', '製造業', '零售', '醫療', 'saas', 'fintech', 'retail']
+REGIONS = ['台北', '台中', '高雄', 'Shanghai']
+WEIGHTS = [(10.0, 5.0, 1.0), (1.0, 1.0, 1.0), (0.0, 0.0, 1.0), (50.0, 0.5, 2.0)]
+
+
+def _scan_best(reps, terms, region, weights):
+    """逐個評分全部銷售人員，返回最高得分"""
+    region = normalize_region(region)
+    return max(
+        match_score(split_terms(specialization), normalize_region(rep_region), workload, terms, region, weights)
+        for specialization, rep_region, workload in reps.values()
+    )
+
+
+def _random_reps(rng, count):
+    reps = {}
+    for rep_id in range(1, count + 1):
+        roll = rng.random()
+        if roll < 0.15:
+            specialization = None  # 沒有專業領域
+        elif roll < 0.2:
+            specialization = ''
+        else:
+            specialization = '、'.join(rng.sample(INDUSTRIES, rng.randint(1, 3)))
+        region = rng.choice(REGIONS + [None])
+        # 負荷集中在很小的範圍內，製造大量同分
+        reps[rep_id] = (specialization, region, rng.randint(0, 3))
+    return reps
+
+
+def _build(reps):
+    index = SalesRepIndex()
+    for rep_id, (specialization, region, workload) in reps.items():
+        index.upsert(rep_id, specialization, region, workload)
+    return index
+
+
+def _queries(rng):
+    yield frozenset(), None
+    yield frozenset(), '火星'
+    yield split_terms('未知行業'), '火星'
+    yield split_terms('金融'), ' 台北 '
+    for _ in range(200):
+        industries = rng.sample(INDUSTRIES + ['未知行業'], rng.randint(0, 3))
+        region = rng.choice(REGIONS + [None, '火星', 'SHANGHAI'])
+        yield split_terms('，'.join(industries)), region
+
+
+@pytest.mark.parametrize('weights', WEIGHTS)
+@pytest.mark.parametrize('count', [1, 7, 200])
+def test_match_equals_full_scan(count, weights):
+    rng = random.Random(count * 1000 + int(sum(weights)))
+    reps = _random_reps(rng, count)
+    index = _build(reps)
+    for terms, region in _queries(rng):
+        rep_id, score = index.match(terms, region, weights)
+        assert score == _scan_best(reps, terms, region, weights), (terms, region)
+        # 返回的得分確實是該銷售人員的得分
+        specialization, rep_region, workload = reps[rep_id]
+        assert score == match_score(split_terms(specialization), normalize_region(rep_region), workload,
+                                    terms, normalize_region(region), weights)
+
+
+def test_match_stays_exact_as_workloads_change():
+    """與實際指派一樣，每次選中後負荷加一並增量更新索引"""
+    rng = random.Random(19)
+    reps = _random_reps(rng, 50)
+    index = _build(reps)
+    for terms, region in _queries(rng):
+        rep_id, score = index.match(terms, region, WEIGHTS[0])
+        assert score == _scan_best(reps, terms, region, WEIGHTS[0])
+        specialization, rep_region, workload = reps[rep_id]
+        reps[rep_id] = (specialization, rep_region, workload + 1)
+        index.set_workload(rep_id, workload + 1)
+
+
+def test_ties_and_empty_inputs():
+    reps = {
+        1: ('金融', '台北', 2),
+        2: ('金融', '台北', 2),
+        3: (None, None, 0),
+        4: ('', '高雄', 0),
+    }
+    index = _build(reps)
+    weights = WEIGHTS[0]
+    # 同分的銷售人員任選其一
+    rep_id, score = index.match(split_terms('金融'), '台北', weights)
+    assert rep_id in (1, 2) and score == 10.0 + 5.0 - 2
+    # 沒有行業與區域時退化為負載均衡
+    assert index.match(frozenset(), None, weights)[1] == 0.0
+    # 未知區域與未知行業不加分
+    assert index.match(split_terms('未知行業'), '火星', weights)[1] == 0.0
+    assert SalesRepIndex().match(frozenset(), None, weights) is None
@@ -1,34 +1,97 @@
 # crm_project/app.py
 
+from collections.abc import Mapping
+
 from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
-from flask_jwt_extended import JWTManager
+from werkzeug.utils import import_string
 
 from config import Config
+from dao.cache import dao_cache
+from extensions import db, jwt
+from utils.audit import audit_trail
+from utils.commands import register_commands
+from utils.database import engine_options, init_database
 from utils.exception_handler import register_error_handlers
-from controllers.sales_controller import sales_bp
+from utils.hashing import password_hasher
+from utils.profiling import request_profiler
+from utils.rate_limit import rate_limiter
+from utils.replication import replica_router
+from utils.serialization import init_json
+
+# 模型模塊，創建應用時導入，使 db.create_all 能看到所有表
+MODELS = ('models.user', 'models.sales', 'models.summary', 'models.replication', 'models.import_checkpoint',
+          'models.audit', 'models.changes')
+
+# 藍圖及其URL前綴，以 "模塊:屬性" 延遲導入，只有創建應用時才加載控制器、服務和DAO
+BLUEPRINTS = (
+    ('utils.auth:auth_bp', '/api/auth'),
+    ('controllers.sales_controller:sales_bp', '/api/sales'),
+)
+
+def create_app(config=None):
+    """
+    創建並配置Flask應用
+    導入本模塊不會創建應用；gunicorn 預加載（--preload）時在主進程中調用一次，
+    worker fork 後以寫時複製共享已加載的模塊和應用對象
+    :param config: 配置類或對象，或覆蓋默認配置的字典；None表示只使用 config.Config
+    """
+    # 創建Flask應用實例
+    app = Flask(__name__)
+
+    # 加載配置文件
+    app.config.from_object(Config)
+    if isinstance(config, Mapping):
+        app.config.from_mapping(config)
+    elif config is not None:
+        app.config.from_object(config)
+
+    # 按配置檔生成引擎參數並初始化數據庫
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+    for module in MODELS:
+        import_string(module)
+    db.init_app(app)
+    init_database(app, db)
+
+    # 初始化只讀副本路由，用戶最近的寫入時間記錄在DAO緩存的共享代計數器中
+    replica_router.init_app(app, db, dao_cache)
+
+    # 初始化DAO讀緩存（代計數器文件在第一次訪問時才映射，每個worker進程各自映射），
+    # 按副本路由判斷讀到的數據能否緩存
+    dao_cache.init_app(app, replica_router)
+
+    # 初始化變更審計（寫入線程在第一次提交變更時才啟動）
+    audit_trail.init_app(app)
+
+    # 初始化JWT管理器
+    jwt.init_app(app)
+
+    # 初始化密碼哈希進程池（進程池在第一次使用時才創建，不會在fork前啟動子進程）
+    password_hasher.init_app(app)
+
+    # 註冊JSON提供者（已安裝orjson時使用orjson）
+    init_json(app)
 
-# 創建Flask應用實例
-app = Flask(__name__)
+    # 初始化請求性能埋點
+    request_profiler.init_app(app)
 
-# 加載配置文件
-app.config.from_object(Config)
+    # 初始化限流與負載丟棄
+    rate_limiter.init_app(app)
 
-# 初始化數據庫
-db = SQLAlchemy(app)
+    # 註冊全局異常處理器
+    register_error_handlers(app)
 
-# 初始化JWT管理器
-jwt = JWTManager(app)
+    # 註冊命令行工具
+    register_commands(app)
 
-# 註冊全局異常處理器
-register_error_handlers(app)
+    # 註冊藍圖
+    for blueprint, url_prefix in BLUEPRINTS:
+        app.register_blueprint(import_string(blueprint), url_prefix=url_prefix)
+    app.add_url_rule('/', view_func=index)
 
-# 註冊藍圖
-app.register_blueprint(sales_bp, url_prefix='/api/sales')
+    return app
 
-@app.route('/')
 def index():
     return "Welcome to the CRM API!"
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    create_app().run(debug=True)
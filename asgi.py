@@ -0,0 +1,66 @@
+# crm_project/asgi.py
+
+"""
+銷售API的異步（ASGI）入口
+與 app.py 共用配置、模型和數據庫，路由在 AsyncSession 上以協程處理，
+等待數據庫時不佔用線程，單個進程可同時保持大量連接。
+
+只提供銷售機會的列表/搜索、按ID讀取、匯總及創建、更新、刪除，與同步版本的一致性見 tests/test_async_parity.py；
+導出、批量、增量同步、變更歷史與緩存統計接口只在同步入口（app.py）提供，本入口也不做限流與請求埋點。
+
+啟動:
+    uvicorn asgi:app --port 8000
+"""
+
+from quart import Quart, jsonify
+from werkzeug.exceptions import HTTPException
+
+from config import Config
+from dao.cache import dao_cache
+from utils.async_auth import get_jwt_identity
+from utils.async_database import async_db
+from utils.audit import audit_trail
+from controllers.async_sales_controller import async_sales_bp
+
+# 創建ASGI應用實例
+app = Quart(__name__)
+
+# 加載配置文件
+app.config.from_object(Config)
+
+# 初始化異步數據庫
+async_db.init_app(app)
+
+# 初始化DAO讀緩存：異步路由不讀緩存，寫入提交後遞增代號，使同一主機上同步worker的緩存失效
+dao_cache.init_app(app)
+
+# 初始化變更審計，操作人取自ASGI路由的JWT身份
+audit_trail.init_app(app, identity=get_jwt_identity)
+
+@app.errorhandler(HTTPException)
+async def handle_http_exception(e):
+    """處理HTTP異常"""
+    response = jsonify({
+        "code": e.code,
+        "name": e.name,
+        "description": e.description,
+    })
+    response.status_code = e.code
+    return response
+
+@app.errorhandler(ValueError)
+async def handle_value_error(e):
+    """處理ValueError"""
+    return jsonify({"error": str(e)}), 400
+
+@app.after_serving
+async def dispose_engine():
+    audit_trail.shutdown()
+    await async_db.dispose()
+
+# 註冊藍圖
+app.register_blueprint(async_sales_bp, url_prefix='/api/sales')
+
+@app.route('/')
+async def index():
+    return "Welcome to the CRM API!"
@@ -0,0 +1 @@
+# crm_project/benchmarks/__init__.py
@@ -0,0 +1,247 @@
+# crm_project/benchmarks/bench_api.py
+
+"""
+CRM API 負載生成與延遲基準測試
+
+在臨時SQLite數據庫中寫入可配置數量的用戶和銷售機會，於本進程內以真實的HTTP服務器
+啟動 app.py 中的應用（含 sales_bp 與JWT認證），按給定併發逐個場景施壓，
+報告每個端點及每種 SalesDAO.search 過濾組合的 p50/p95/p99 延遲、吞吐量與峰值RSS。
+結果以JSON輸出，可用 --compare 與之前提交的結果對比。
+
+用法:
+    python -m benchmarks.bench_api --rows 100000 --concurrency 8 --duration 5 --output before.json
+    python -m benchmarks.bench_api --rows 100000 --concurrency 8 --duration 5 --compare before.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlencode
+
+from benchmarks.common import percentile, seed_opportunities, strategy_combinations, use_temp_database
+
+
+def _rss_mb():
+    """當前常駐內存（MB）；無 /proc 時退回到進程的歷史峰值"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        scale = 2**20 if sys.platform == "darwin" else 2**10
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+class RssSampler(threading.Thread):
+    """在場景運行期間定時採樣RSS，記錄峰值"""
+
+    def __init__(self, interval=0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = _rss_mb()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.peak = max(self.peak, _rss_mb())
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        return max(self.peak, _rss_mb())
+
+
+def _scenarios(max_id):
+    """(場景名稱, 請求生成函數)；請求生成函數接收隨機數生成器，返回 (方法, 路徑, 請求體)"""
+    scenarios = [
+        ("GET /opportunities", lambda rng: ("GET", "/api/sales/opportunities?limit=50", None)),
+        ("GET /opportunities?fields", lambda rng: ("GET", "/api/sales/opportunities?limit=50&fields=id,stage,amount", None)),
+        ("GET /opportunities?sort", lambda rng: ("GET", "/api/sales/opportunities?limit=50&sort=-amount", None)),
+        ("GET /opportunities/<id>", lambda rng: ("GET", f"/api/sales/opportunities/{rng.randint(1, max_id)}", None)),
+        ("GET /opportunities?q", lambda rng: ("GET", "/api/sales/opportunities?" + urlencode({"q": "王偉", "limit": 50}), None)),
+        ("GET /summary", lambda rng: ("GET", "/api/sales/summary", None)),
+        ("POST /opportunities", lambda rng: ("POST", "/api/sales/opportunities", {
+            "name": f"壓測機會{rng.randrange(10**9)}", "customer_name": "壓測客戶", "amount": rng.randint(1000, 100000),
+        })),
+    ]
+    for params in strategy_combinations():
+        query = urlencode(dict(params, limit=50))
+        name = "search:" + ",".join(sorted(params))
+        scenarios.append((name, lambda rng, query=query: ("GET", f"/api/sales/opportunities?{query}", None)))
+    return scenarios
+
+
+def _run_scenario(port, tokens, make_request, concurrency, duration):
+    latencies, errors = [], []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(index):
+        rng = random.Random(index)
+        headers = {"Authorization": f"Bearer {tokens[index % len(tokens)]}", "Content-Type": "application/json"}
+        local_latencies, local_errors = [], 0
+        while time.perf_counter() < deadline:
+            method, path, body = make_request(rng)
+            start = time.perf_counter()
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+            try:
+                connection.request(method, path, json.dumps(body) if body else None, headers)
+                response = connection.getresponse()
+                response.read()
+                ok = response.status < 400
+            except (OSError, http.client.HTTPException):
+                ok = False
+            finally:
+                connection.close()
+            if ok:
+                local_latencies.append((time.perf_counter() - start) * 1000)
+            else:
+                local_errors += 1
+        with lock:
+            latencies.extend(local_latencies)
+            errors.append(local_errors)
+
+    sampler = RssSampler()
+    sampler.start()
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    peak_rss = sampler.stop()
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": sum(errors),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies), 3) if latencies else 0.0,
+            "p50": round(percentile(latencies, 0.50), 3),
+            "p95": round(percentile(latencies, 0.95), 3),
+            "p99": round(percentile(latencies, 0.99), 3),
+        },
+        "peak_rss_mb": round(peak_rss, 1),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _compare(results, baseline_path):
+    """打印與基線結果的p95延遲和吞吐量變化"""
+    with open(baseline_path, encoding="utf-8") as f:
+        report = json.load(f)
+    baseline = {item["scenario"]: item for item in report["results"]}
+    print(f"\n與 {baseline_path} (commit {report['meta'].get('commit')}) 對比:", file=sys.stderr)
+    print(f"{'場景':<48} {'p95變化':>10} {'吞吐量變化':>12}", file=sys.stderr)
+    for item in results:
+        old = baseline.get(item["scenario"])
+        if not old:
+            continue
+        p95_old, p95_new = old["latency_ms"]["p95"], item["latency_ms"]["p95"]
+        rps_old, rps_new = old["throughput_rps"], item["throughput_rps"]
+        p95_delta = (p95_new - p95_old) / p95_old if p95_old else 0.0
+        rps_delta = (rps_new - rps_old) / rps_old if rps_old else 0.0
+        print(f"{item['scenario']:<48} {p95_delta:>+10.1%} {rps_delta:>+12.1%}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CRM API 負載生成與延遲基準測試")
+    parser.add_argument("--rows", type=int, default=100000, help="銷售機會行數")
+    parser.add_argument("--users", type=int, default=50, help="用戶數（每個併發客戶端使用其中一個身份）")
+    parser.add_argument("--concurrency", type=int, default=8, help="併發客戶端數")
+    parser.add_argument("--duration", type=float, default=5.0, help="每個場景的持續時間（秒）")
+    parser.add_argument("--scenario", action="append", help="只運行名稱包含該字符串的場景，可重複指定")
+    parser.add_argument("--seed", type=int, default=42, help="種子數據的隨機數種子")
+    parser.add_argument("--output", help="結果JSON的輸出路徑，默認輸出到標準輸出")
+    parser.add_argument("--compare", help="與之前的結果JSON對比")
+    args = parser.parse_args()
+
+    db_path = use_temp_database()
+    # 哈希只在種子用戶時使用，壓測中不涉及登錄
+    os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+    # 壓測以單個身份發出大量請求，關閉限流
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+
+    from flask_jwt_extended import create_access_token
+    from werkzeug.serving import make_server
+    from extensions import db
+    from wsgi import app
+    from dao.sales_dao import SalesDAO
+    from models.user import User
+    from utils.hashing import password_hasher
+
+    rng = random.Random(args.seed)
+    start = time.perf_counter()
+    with app.app_context():
+        db.create_all()
+        pwhash = password_hasher.hash("secret")
+        db.session.add_all(User(username=f"bench{i}", password_hash=pwhash) for i in range(args.users))
+        db.session.commit()
+        seed_opportunities(SalesDAO(), args.rows, rng)
+        tokens = [create_access_token(identity=f"bench{i}") for i in range(args.users)]
+    print(f"已寫入 {args.users} 個用戶、{args.rows} 條銷售機會，用時 {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    results = []
+    try:
+        for name, make_request in _scenarios(args.rows):
+            if args.scenario and not any(pattern in name for pattern in args.scenario):
+                continue
+            result = _run_scenario(server.server_port, tokens, make_request, args.concurrency, args.duration)
+            results.append({"scenario": name, **result})
+            latency = result["latency_ms"]
+            print(f"{name:<48} {result['throughput_rps']:>8.1f} req/s  p50={latency['p50']:.1f}ms "
+                  f"p95={latency['p95']:.1f}ms p99={latency['p99']:.1f}ms  rss={result['peak_rss_mb']}MB"
+                  f"{'  errors=' + str(result['errors']) if result['errors'] else ''}", file=sys.stderr)
+    finally:
+        server.shutdown()
+        os.unlink(db_path)
+
+    commit = _git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "rows": args.rows,
+            "users": args.users,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    else:
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    if args.compare:
+        _compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
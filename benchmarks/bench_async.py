@@ -0,0 +1,209 @@
+# crm_project/benchmarks/bench_async.py
+
+"""
+同步（Flask多線程）與異步（ASGI + AsyncSession）服務併發連接基準測試
+
+在臨時SQLite數據庫中寫入銷售機會，分別以子進程啟動 werkzeug 多線程服務器（app.py）
+和 uvicorn（asgi.py），用asyncio客戶端在每個併發級別下保持給定數量的同時連接持續請求列表接口，
+報告吞吐量、延遲、失敗數以及服務進程的峰值線程數和峰值RSS。
+
+用法:
+    python -m benchmarks.bench_async --rows 20000 --levels 50,200,1000 --duration 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks.common import percentile, seed_opportunities, use_temp_database
+
+PATH = "/api/sales/opportunities?limit=20"
+
+
+def _serve(kind, port):
+    """子進程入口：啟動指定的服務器"""
+    if kind == "flask":
+        from werkzeug.serving import make_server
+        from wsgi import app
+
+        server = make_server("127.0.0.1", port, app, threaded=True)
+        print("ready", flush=True)
+        server.serve_forever()
+    else:
+        import uvicorn
+        from asgi import app
+
+        config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", backlog=4096)
+        server = uvicorn.Server(config)
+        print("ready", flush=True)
+        server.run()
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"服務器未在{timeout}秒內啟動")
+
+
+class ProcessSampler(threading.Thread):
+    """定時讀取服務進程的 /proc/<pid>/status，記錄峰值線程數與RSS"""
+
+    def __init__(self, pid, interval=0.05):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak_threads = 0
+        self.peak_rss_mb = 0.0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                with open(f"/proc/{self.pid}/status") as status:
+                    for line in status:
+                        if line.startswith("Threads:"):
+                            self.peak_threads = max(self.peak_threads, int(line.split()[1]))
+                        elif line.startswith("VmRSS:"):
+                            self.peak_rss_mb = max(self.peak_rss_mb, int(line.split()[1]) / 1024)
+            except OSError:
+                return
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+async def _client(port, token, deadline, latencies, errors):
+    request = (
+        f"GET {PATH} HTTP/1.1\r\nHost: 127.0.0.1\r\nAuthorization: Bearer {token}\r\n"
+        f"Connection: close\r\n\r\n"
+    ).encode()
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection("127.0.0.1", port), 10)
+            writer.write(request)
+            await writer.drain()
+            response = await asyncio.wait_for(reader.read(), 30)
+            writer.close()
+            ok = response.startswith(b"HTTP/1.1 200") or response.startswith(b"HTTP/1.0 200")
+        except (OSError, asyncio.TimeoutError):
+            ok = False
+        if ok:
+            latencies.append((time.perf_counter() - start) * 1000)
+        else:
+            errors.append(1)
+            await asyncio.sleep(0.05)
+
+
+async def _run_level(port, token, concurrency, duration):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*[_client(port, token, deadline, latencies, errors) for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+    }
+
+
+def _benchmark_server(kind, token, levels, duration):
+    port = _free_port()
+    command = [sys.executable, "-m", "benchmarks.bench_async", "--serve", kind, "--port", str(port)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    results = []
+    try:
+        process.stdout.readline()
+        _wait_for_port(port)
+        for concurrency in levels:
+            sampler = ProcessSampler(process.pid)
+            sampler.start()
+            result = asyncio.run(_run_level(port, token, concurrency, duration))
+            sampler.stop()
+            result.update(
+                server=kind, concurrency=concurrency,
+                peak_threads=sampler.peak_threads, peak_rss_mb=round(sampler.peak_rss_mb, 1),
+            )
+            results.append(result)
+            print(f"{kind:<6} c={concurrency:<5} {result['throughput_rps']:>8.1f} req/s  "
+                  f"p50={result['p50_ms']:.1f}ms p99={result['p99_ms']:.1f}ms  errors={result['errors']:<5} "
+                  f"threads={result['peak_threads']:<5} rss={result['peak_rss_mb']}MB", file=sys.stderr)
+    finally:
+        process.terminate()
+        process.wait()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="同步與異步服務併發連接基準測試")
+    parser.add_argument("--rows", type=int, default=20000, help="銷售機會行數")
+    parser.add_argument("--levels", default="50,200,1000", help="以逗號分隔的併發連接數")
+    parser.add_argument("--duration", type=float, default=5.0, help="每個併發級別的持續時間（秒）")
+    parser.add_argument("--server", action="append", choices=("flask", "asgi"), help="只測試指定服務器，可重複指定")
+    parser.add_argument("--output", help="結果JSON的輸出路徑")
+    parser.add_argument("--serve", choices=("flask", "asgi"), help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        _serve(args.serve, args.port)
+        return
+
+    db_path = use_temp_database()
+    # 關閉請求埋點，兩種服務器執行相同的工作
+    os.environ["PROFILING_ENABLED"] = "0"
+    # 壓測以單個身份發出大量請求，關閉限流
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+
+    from flask_jwt_extended import create_access_token
+    from extensions import db
+    from wsgi import app
+    from dao.sales_dao import SalesDAO
+
+    with app.app_context():
+        db.create_all()
+        seed_opportunities(SalesDAO(), args.rows, random.Random(42))
+        token = create_access_token(identity="bench")
+        db.engine.dispose()
+
+    levels = [int(level) for level in args.levels.split(",")]
+    results = []
+    try:
+        for kind in args.server or ("flask", "asgi"):
+            results.extend(_benchmark_server(kind, token, levels, args.duration))
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.unlink(db_path + suffix)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"rows": args.rows, "duration": args.duration, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# crm_project/benchmarks/bench_audit.py
+
+"""
+變更審計基準測試：對比更新銷售機會（SalesService.update_opportunity）在以下三種方式下的延遲
+- off：不記錄審計；
+- write-behind：提交後放入緩衝區，由後台線程批量寫入（默認配置）；
+- sync：緩衝區大小為0，每次提交後在請求線程內逐條寫入審計表，相當於同步寫審計
+
+用法:
+    python -m benchmarks.bench_audit --rows 1000 --updates 2000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import time
+
+from benchmarks.common import percentile, seed_opportunities, use_temp_database
+
+MODES = {
+    "off": {"AUDIT_ENABLED": False},
+    "write-behind": {"AUDIT_ENABLED": True},
+    "sync": {"AUDIT_ENABLED": True, "AUDIT_QUEUE_SIZE": 0, "AUDIT_ENQUEUE_TIMEOUT": 0},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="變更審計基準測試")
+    parser.add_argument("--rows", type=int, default=1000, help="銷售機會數")
+    parser.add_argument("--updates", type=int, default=2000, help="每種方式執行的更新次數")
+    args = parser.parse_args()
+
+    db_path = use_temp_database()
+    from extensions import db
+    from app import create_app
+    from models.sales import SalesOpportunity
+    from services.sales_service import SalesService
+    from utils.audit import audit_trail
+
+    rng = random.Random(42)
+    print(f"{'方式':<14} {'p50(ms)':>8} {'p95(ms)':>8} {'p99(ms)':>8} {'刷新(ms)':>9}")
+    try:
+        for mode, overrides in MODES.items():
+            app = create_app(dict(overrides, SQLALCHEMY_DATABASE_URI=os.environ["DATABASE_URL"],
+                                  PROFILING_ENABLED=False))
+            with app.app_context():
+                service = SalesService()
+                if mode == "off":
+                    db.create_all()
+                    seed_opportunities(service.sales_dao, args.rows, rng)
+                samples = []
+                for _ in range(args.updates):
+                    data = {"stage": rng.choice(SalesOpportunity.STAGES), "amount": rng.randint(1000, 100000)}
+                    start = time.perf_counter()
+                    service.update_opportunity(rng.randint(1, args.rows), data)
+                    samples.append((time.perf_counter() - start) * 1000)
+                    db.session.remove()
+                # 等待後台線程寫完剩餘的審計記錄
+                start = time.perf_counter()
+                audit_trail.flush()
+                drain = (time.perf_counter() - start) * 1000
+                db.engine.dispose()
+            samples.sort()
+            print(f"{mode:<14} {statistics.median(samples):8.2f} {percentile(samples, 0.95):8.2f} "
+                  f"{percentile(samples, 0.99):8.2f} {drain:9.1f}")
+    finally:
+        audit_trail.shutdown()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.unlink(db_path + suffix)
+
+
+if __name__ == "__main__":
+    main()
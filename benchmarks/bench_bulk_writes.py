@@ -0,0 +1,66 @@
+# crm_project/benchmarks/bench_bulk_writes.py
+
+"""
+批量寫入基準測試：對比逐行的 BaseDAO.create/update/delete 與 bulk_* 方法的吞吐量
+
+用法:
+    python -m benchmarks.bench_bulk_writes --rows 2000
+"""
+
+import argparse
+import os
+import time
+
+from benchmarks.common import use_temp_database
+
+
+def _timed(label, rows, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {rows:>8} 行  {elapsed:8.3f}s  {rows / elapsed:12.0f} 行/秒")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量寫入基準測試")
+    parser.add_argument("--rows", type=int, default=2000, help="每種操作寫入的行數")
+    args = parser.parse_args()
+
+    db_path = use_temp_database()
+
+    from extensions import db
+    from wsgi import app
+    from dao.sales_dao import SalesDAO
+
+    rows = [
+        {"name": f"機會{i}", "customer_name": f"客戶{i % 97}", "amount": float(i), "stage": "初期"}
+        for i in range(args.rows)
+    ]
+
+    with app.app_context():
+        db.create_all()
+        dao = SalesDAO()
+
+        per_row_ids = []
+        single = _timed("逐行 create", args.rows,
+                        lambda: per_row_ids.extend(dao.create(dict(row)).id for row in rows))
+        bulk_ids = []
+        bulk = _timed("bulk_create", args.rows, lambda: bulk_ids.extend(dao.bulk_create(rows)))
+        print(f"{'加速比':<28} {single / bulk:.1f}x\n")
+
+        single = _timed("逐行 update", args.rows,
+                        lambda: [dao.update(id, {"stage": "跟進中"}) for id in per_row_ids])
+        bulk = _timed("bulk_update", args.rows,
+                      lambda: dao.bulk_update([{"id": id, "stage": "跟進中"} for id in bulk_ids]))
+        print(f"{'加速比':<28} {single / bulk:.1f}x\n")
+
+        single = _timed("逐行 delete", args.rows, lambda: [dao.delete(id) for id in per_row_ids])
+        bulk = _timed("bulk_delete", args.rows, lambda: dao.bulk_delete(bulk_ids))
+        print(f"{'加速比':<28} {single / bulk:.1f}x")
+
+    os.unlink(db_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# crm_project/benchmarks/bench_cache.py
+
+"""
+DAO讀緩存基準測試：以讀多寫少的混合負載調用 SalesService，對比關閉與開啟讀緩存時的延遲與命中率
+- 按ID讀取：80%的讀取集中在20%的熱點機會上；
+- 搜索分頁：在 benchmarks.common 的策略組合中隨機選取，帶ETag計算時的 (id, version) 查詢；
+- 更新：按 --write-ratio 的比例隨機更新機會，提交後使相應的緩存失效
+
+用法:
+    python -m benchmarks.bench_cache --rows 100000 --operations 20000 --write-ratio 0.05
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from benchmarks.common import percentile, seed_opportunities, strategy_combinations, use_temp_database
+
+MODES = {
+    "off": {"CACHE_ENABLED": False},
+    "on": {"CACHE_ENABLED": True},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DAO讀緩存基準測試")
+    parser.add_argument("--rows", type=int, default=100000, help="銷售機會數")
+    parser.add_argument("--operations", type=int, default=20000, help="每種方式執行的操作數")
+    parser.add_argument("--write-ratio", type=float, default=0.05, help="更新操作的比例")
+    parser.add_argument("--limit", type=int, default=50, help="搜索分頁的每頁條數")
+    args = parser.parse_args()
+
+    db_path = use_temp_database()
+    generation_path = tempfile.mktemp(suffix=".bin")
+    from extensions import db
+    from app import create_app
+    from models.sales import SalesOpportunity
+    from services.sales_service import SalesService
+
+    combinations = list(strategy_combinations())
+    hot = max(args.rows // 5, 1)
+    print(f"{'方式':<5} {'操作':<7} {'次數':>7} {'p50(ms)':>8} {'p95(ms)':>8} {'p99(ms)':>8}   命中率")
+    try:
+        for mode, overrides in MODES.items():
+            app = create_app(dict(overrides, SQLALCHEMY_DATABASE_URI=os.environ["DATABASE_URL"],
+                                  CACHE_GENERATION_PATH=generation_path,
+                                  PROFILING_ENABLED=False, AUDIT_ENABLED=False))
+            with app.app_context():
+                service = SalesService()
+                if mode == "off":
+                    db.create_all()
+                    seed_opportunities(service.sales_dao, args.rows, random.Random(0))
+                # 兩種方式使用相同的操作序列
+                rng = random.Random(42)
+                samples = {"get": [], "search": [], "update": []}
+                for _ in range(args.operations):
+                    roll = rng.random()
+                    if roll < args.write_ratio:
+                        operation = "update"
+                        data = {"stage": rng.choice(SalesOpportunity.STAGES), "amount": rng.randint(1000, 100000)}
+                        call = lambda: service.update_opportunity(rng.randint(1, args.rows), data)
+                    elif roll < args.write_ratio + (1 - args.write_ratio) * 0.7:
+                        operation = "get"
+                        id = rng.randint(1, hot) if rng.random() < 0.8 else rng.randint(1, args.rows)
+                        call = lambda: (service.get_opportunity_etag(id), service.get_opportunity_by_id(id))
+                    else:
+                        operation = "search"
+                        params = rng.choice(combinations)
+                        call = lambda: service.get_opportunities_page(params, args.limit)
+                    start = time.perf_counter()
+                    call()
+                    samples[operation].append((time.perf_counter() - start) * 1000)
+                    db.session.remove()
+                stats = service.sales_dao.cache.stats()
+                db.engine.dispose()
+            ratios = {"get": stats["records"]["hit_ratio"], "search": stats["queries"]["hit_ratio"], "update": None}
+            for operation, values in samples.items():
+                values.sort()
+                ratio = f"{ratios[operation]:7.1%}" if mode == "on" and ratios[operation] is not None else "      -"
+                print(f"{mode:<5} {operation:<7} {len(values):>7} {statistics.median(values) if values else 0:8.3f} "
+                      f"{percentile(values, 0.95):8.3f} {percentile(values, 0.99):8.3f}   {ratio}")
+    finally:
+        for path in (db_path, db_path + "-wal", db_path + "-shm", generation_path):
+            if os.path.exists(path):
+                os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# crm_project/benchmarks/bench_db_concurrency.py
+
+"""
+數據庫併發基準測試：多個讀進程與寫進程同時訪問同一個SQLite文件，
+對比 default 配置檔（回滾日誌、每次提交fsync）與 production 配置檔
+（WAL、synchronous=NORMAL、mmap 等PRAGMA）下的讀寫吞吐量與延遲
+
+每個進程模擬一個獨立的應用worker，使用與應用相同的 engine_options/apply_engine_profile 創建引擎。
+
+用法:
+    python -m benchmarks.bench_db_concurrency --rows 100000 --readers 4 --writers 2 --duration 5
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import time
+
+from benchmarks.common import percentile, seed_opportunities, use_temp_database
+
+READ_STATEMENTS = (
+    "SELECT * FROM sales_opportunities WHERE id = :id",
+    "SELECT id, name, amount FROM sales_opportunities WHERE stage = :stage ORDER BY amount LIMIT 50",
+)
+WRITE_STATEMENT = "UPDATE sales_opportunities SET amount = amount + 1, version = version + 1 WHERE id = :id"
+
+
+def _profile_config(profile, url):
+    from config import Config
+
+    config = {name: getattr(Config, name) for name in dir(Config) if name.isupper()}
+    config.update(DATABASE_PROFILE=profile, SQLALCHEMY_DATABASE_URI=url)
+    return config
+
+
+def _worker(role, profile, url, rows, duration, seed, ready, start, results):
+    """單個worker進程：在給定時間內持續讀或寫，返回成功次數、錯誤數與延遲樣本"""
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.exc import OperationalError
+    from utils.database import apply_engine_profile, engine_options
+
+    config = _profile_config(profile, url)
+    engine = create_engine(url, **engine_options(config))
+    apply_engine_profile(engine, config)
+    rng = random.Random(seed)
+    stages = ("初期", "跟進中", "談判中", "成交", "失敗")
+    latencies, errors = [], 0
+
+    ready.set()
+    start.wait()
+    deadline = time.perf_counter() + duration
+    with engine.connect() as connection:
+        while time.perf_counter() < deadline:
+            begin = time.perf_counter()
+            try:
+                if role == "read":
+                    statement = READ_STATEMENTS[rng.randrange(len(READ_STATEMENTS))]
+                    connection.execute(text(statement), {"id": rng.randint(1, rows), "stage": rng.choice(stages)}).all()
+                    connection.rollback()
+                else:
+                    connection.execute(text(WRITE_STATEMENT), {"id": rng.randint(1, rows)})
+                    connection.commit()
+            except OperationalError:
+                connection.rollback()
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - begin) * 1000)
+    engine.dispose()
+    results.put((role, latencies, errors))
+
+
+def _run_profile(profile, db_path, args):
+    context = multiprocessing.get_context("fork")
+    url = "sqlite:///" + db_path
+    ready_events, processes = [], []
+    start, results = context.Event(), context.Queue()
+    roles = ["read"] * args.readers + ["write"] * args.writers
+    for index, role in enumerate(roles):
+        ready = context.Event()
+        process = context.Process(
+            target=_worker, args=(role, profile, url, args.rows, args.duration, index, ready, start, results),
+        )
+        process.start()
+        ready_events.append(ready)
+        processes.append(process)
+    for ready in ready_events:
+        ready.wait()
+    start.set()
+
+    collected = {"read": ([], 0), "write": ([], 0)}
+    for _ in processes:
+        role, latencies, errors = results.get()
+        samples, error_count = collected[role]
+        collected[role] = (samples + latencies, error_count + errors)
+    for process in processes:
+        process.join()
+
+    report = {}
+    for role, (samples, errors) in collected.items():
+        samples.sort()
+        report[role] = {
+            "ops": len(samples),
+            "errors": errors,
+            "ops_per_sec": round(len(samples) / args.duration, 1),
+            "p50_ms": round(percentile(samples, 0.50), 3),
+            "p95_ms": round(percentile(samples, 0.95), 3),
+            "p99_ms": round(percentile(samples, 0.99), 3),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite引擎配置檔併發基準測試")
+    parser.add_argument("--rows", type=int, default=100000, help="銷售機會行數")
+    parser.add_argument("--readers", type=int, default=4, help="讀進程數")
+    parser.add_argument("--writers", type=int, default=2, help="寫進程數")
+    parser.add_argument("--duration", type=float, default=5.0, help="每個配置檔的測試時間（秒）")
+    parser.add_argument("--profile", action="append", choices=("default", "production"),
+                        help="只測試指定配置檔，可重複指定；默認兩者都測")
+    args = parser.parse_args()
+
+    # 種子數據在默認配置檔（回滾日誌模式）下寫入，再為每個配置檔複製一份
+    seed_path = use_temp_database()
+    os.environ["DATABASE_PROFILE"] = "default"
+
+    from sqlalchemy import text
+    from extensions import db
+    from wsgi import app
+    from dao.sales_dao import SalesDAO
+
+    start = time.perf_counter()
+    with app.app_context():
+        db.create_all()
+        seed_opportunities(SalesDAO(), args.rows, random.Random(42))
+        # journal_mode 會持久化到數據庫文件中，確保 default 配置檔從回滾日誌模式開始
+        db.session.execute(text("PRAGMA journal_mode=DELETE"))
+        db.session.commit()
+        db.engine.dispose()
+    print(f"已寫入 {args.rows} 條銷售機會，用時 {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    try:
+        for profile in args.profile or ("default", "production"):
+            db_path = f"{seed_path}.{profile}"
+            shutil.copyfile(seed_path, db_path)
+            try:
+                report = _run_profile(profile, db_path, args)
+            finally:
+                for suffix in ("", "-wal", "-shm", "-journal"):
+                    if os.path.exists(db_path + suffix):
+                        os.unlink(db_path + suffix)
+            for role in ("read", "write"):
+                item = report[role]
+                print(f"{profile:<11} {role:<5} {item['ops_per_sec']:>9.1f} ops/s  p50={item['p50_ms']:.2f}ms "
+                      f"p95={item['p95_ms']:.2f}ms p99={item['p99_ms']:.2f}ms  errors={item['errors']}")
+    finally:
+        os.unlink(seed_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# crm_project/benchmarks/bench_fulltext.py
+
+"""
+全文檢索基準測試：對比 LIKE '%關鍵詞%' 與FTS5全文索引在名稱/客戶名稱上的子串檢索延遲
+
+用法:
+    python -m benchmarks.bench_fulltext --rows 1000000
+"""
+
+import argparse
+import os
+import random
+import time
+
+from benchmarks.common import latency_ms, use_temp_database
+
+SURNAMES = "王李張劉陳楊黃趙吳周徐孫馬朱胡郭何高林羅"
+GIVEN = "偉芳娜敏靜麗強磊軍洋勇艷傑娟濤明超秀霞平剛桂"
+PRODUCTS = ["ERP升級", "雲端遷移", "CRM導入", "數據分析平台", "Security Audit", "Annual License"]
+
+QUERIES = ["王偉", "科技", "雲端遷移", "acme", "王 ERP", "license"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="全文檢索基準測試")
+    parser.add_argument("--rows", type=int, default=1000000, help="種子數據行數")
+    parser.add_argument("--repeat", type=int, default=10, help="每個關鍵詞的計時次數")
+    parser.add_argument("--limit", type=int, default=50, help="分頁大小")
+    args = parser.parse_args()
+
+    db_path = use_temp_database()
+
+    from extensions import db
+    from wsgi import app
+    from dao.sales_dao import SalesDAO
+    from patterns.query_strategy import LikeQueryStrategy
+
+    rng = random.Random(7)
+    with app.app_context():
+        db.create_all()
+        dao = SalesDAO()
+        start = time.perf_counter()
+        for offset in range(0, args.rows, 50000):
+            dao.bulk_create([
+                {
+                    "name": f"{rng.choice(PRODUCTS)} {i}",
+                    "customer_name": rng.choice(SURNAMES) + rng.choice(GIVEN) + rng.choice(["科技", "貿易", " Acme", "實業"]),
+                    "amount": float(rng.randrange(1000, 1000000)),
+                }
+                for i in range(offset, min(offset + 50000, args.rows))
+            ])
+        print(f"已寫入並索引 {args.rows} 行，用時 {time.perf_counter() - start:.1f}s\n")
+
+        like = LikeQueryStrategy("customer_name")
+        print(f"{'關鍵詞':<12} {'LIKE p50':>10} {'LIKE p95':>10} {'FTS相關度 p50':>14} {'p95':>8} {'FTS按id p50':>12} {'p95':>8}")
+        for keyword in QUERIES:
+            like_query = like.execute(dao.model.query, dao.model, keyword).order_by(dao.model.id).limit(args.limit)
+            like_p50, like_p95 = latency_ms(like_query.all, args.repeat)
+            rank_p50, rank_p95 = latency_ms(lambda: dao.search_page({"q": keyword}, args.limit), args.repeat)
+            id_p50, id_p95 = latency_ms(lambda: dao.search_page({"q": keyword}, args.limit, sort="id"), args.repeat)
+            print(f"{keyword:<12} {like_p50:10.2f} {like_p95:10.2f} {rank_p50:14.2f} {rank_p95:8.2f} {id_p50:12.2f} {id_p95:8.2f}")
+
+    os.unlink(db_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# crm_project/benchmarks/bench_import.py
+
+"""
+批量導入基準測試：對比逐行調用 SalesService.create_opportunity 與 import-opportunities
+使用的分塊導入（同步維護索引 / --defer 推遲維護）的吞吐量
+
+每種方式導入到一個已有 --existing 行數據的新數據庫中，數據庫越大，推遲維護的收益越依賴導入量與存量之比。
+
+用法:
+    python -m benchmarks.bench_import --rows 100000 --existing 100000 --chunk-size 5000
+"""
+
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.common import opportunity_rows, seed_opportunities, use_temp_database
+
+
+def _write_csv(path, count):
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=("name", "customer_name", "amount", "stage"))
+        writer.writeheader()
+        writer.writerows(opportunity_rows(count, random.Random(7)))
+
+
+def _run(mode, args, csv_path):
+    """在全新的數據庫中導入，返回耗時（秒）"""
+    db_path = use_temp_database()
+    from extensions import db
+    from app import create_app
+    from services.import_service import OpportunityImportService
+    from services.sales_service import SalesService
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": os.environ["DATABASE_URL"], "PROFILING_ENABLED": False})
+    try:
+        with app.app_context():
+            db.create_all()
+            service = SalesService()
+            seed_opportunities(service.sales_dao, args.existing, random.Random(42))
+            db.session.remove()
+
+            start = time.perf_counter()
+            if mode == "create":
+                # 與API相同的路徑：每行一個事務
+                with open(csv_path, encoding="utf-8", newline="") as file:
+                    for row in csv.DictReader(file):
+                        service.create_opportunity(OpportunityImportService._normalize(row))
+            else:
+                OpportunityImportService().import_file(csv_path, chunk_size=args.chunk_size,
+                                                       defer=mode == "chunked+defer")
+            elapsed = time.perf_counter() - start
+            db.engine.dispose()
+        return elapsed
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.unlink(db_path + suffix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量導入基準測試")
+    parser.add_argument("--rows", type=int, default=100000, help="導入的行數")
+    parser.add_argument("--existing", type=int, default=100000, help="導入前已有的行數")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="分塊導入每個事務的行數")
+    parser.add_argument("--create-rows", type=int, default=2000, help="逐行創建只導入前N行，避免耗時過長")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    csv_path = os.path.join(workdir, "opportunities.csv")
+    create_path = os.path.join(workdir, "opportunities_head.csv")
+    _write_csv(csv_path, args.rows)
+    _write_csv(create_path, min(args.create_rows, args.rows))
+
+    print(f"{'方式':<16} {'行數':>8} {'耗時(s)':>10} {'行/秒':>10}")
+    try:
+        for mode, path, rows in (("create", create_path, min(args.create_rows, args.rows)),
+                                 ("chunked", csv_path, args.rows),
+                                 ("chunked+defer", csv_path, args.rows)):
+            elapsed = _run(mode, args, path)
+            print(f"{mode:<16} {rows:>8} {elapsed:10.2f} {rows / elapsed:10.0f}")
+    finally:
+        for name in os.listdir(workdir):
+            os.unlink(os.path.join(workdir, name))
+        os.rmdir(workdir)
+
+
+if __name__ == "__main__":
+    main()
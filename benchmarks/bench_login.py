@@ -0,0 +1,100 @@
+# crm_project/benchmarks/bench_login.py
+
+"""
+登錄吞吐量基準測試：以給定併發持續登錄，同時測量讀接口的延遲，
+對比在請求線程內直接哈希（--workers 0）與使用有界進程池時的表現
+
+用法:
+    python -m benchmarks.bench_login --workers 0 --concurrency 16
+    python -m benchmarks.bench_login --workers 4 --queue 8 --concurrency 16
+"""
+
+import argparse
+import os
+import statistics
+import threading
+import time
+
+from benchmarks.common import percentile, use_temp_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description="登錄吞吐量基準測試")
+    parser.add_argument("--workers", type=int, default=2, help="哈希進程池大小，0表示在請求線程內計算")
+    parser.add_argument("--queue", type=int, default=8, help="進程池排隊上限")
+    parser.add_argument("--concurrency", type=int, default=16, help="併發登錄線程數")
+    parser.add_argument("--users", type=int, default=100, help="用戶數")
+    parser.add_argument("--duration", type=float, default=10.0, help="持續時間（秒）")
+    args = parser.parse_args()
+
+    db_path = use_temp_database()
+    os.environ["PASSWORD_HASH_WORKERS"] = str(args.workers)
+    os.environ["PASSWORD_HASH_QUEUE_SIZE"] = str(args.queue)
+    # 壓測以單個身份發出大量請求，關閉限流
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+
+    from flask_jwt_extended import create_access_token
+    from extensions import db
+    from wsgi import app
+    from models.user import User
+    from utils.hashing import password_hasher
+
+    with app.app_context():
+        db.create_all()
+        # 所有用戶共用同一個密碼哈希，避免種子數據耗時
+        pwhash = password_hasher.hash("secret")
+        db.session.add_all(User(username=f"user{i}", password_hash=pwhash) for i in range(args.users))
+        db.session.commit()
+        read_headers = {"Authorization": f"Bearer {create_access_token(identity='user0')}"}
+
+    stop = time.perf_counter() + args.duration
+    lock = threading.Lock()
+    login_latency, read_latency = [], []
+    statuses = {}
+
+    def login_loop(index):
+        client = app.test_client()
+        i = index
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            response = client.post("/api/auth/login", json={"username": f"user{i % args.users}", "password": "secret"})
+            elapsed = time.perf_counter() - start
+            with lock:
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                if response.status_code == 200:
+                    login_latency.append(elapsed)
+            if response.status_code == 429:
+                # 客戶端被拒絕後短暫退避
+                time.sleep(0.05)
+            i += args.concurrency
+
+    def read_loop():
+        client = app.test_client()
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            client.get("/api/sales/opportunities?limit=10", headers=read_headers)
+            read_latency.append(time.perf_counter() - start)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=login_loop, args=(i,)) for i in range(args.concurrency)]
+    threads.append(threading.Thread(target=read_loop))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    password_hasher.shutdown()
+    os.unlink(db_path)
+    login_latency.sort()
+    read_latency.sort()
+
+    ok = statuses.get(200, 0)
+    print(f"workers={args.workers} queue={args.queue} concurrency={args.concurrency}")
+    print(f"成功登錄 {ok} 次，{ok / args.duration:.1f} 次/秒；狀態碼分佈 {dict(sorted(statuses.items()))}")
+    print(f"登錄延遲 p50={statistics.median(login_latency or [0]) * 1000:.1f}ms "
+          f"p99={percentile(login_latency, 0.99) * 1000:.1f}ms")
+    print(f"讀接口延遲 p50={statistics.median(read_latency or [0]) * 1000:.1f}ms "
+          f"p99={percentile(read_latency, 0.99) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# crm_project/benchmarks/bench_search_compile.py
+
+"""
+搜索語句構造與編譯開銷微基準：對 SalesDAO 搜索分頁的各種過濾條件組合，對比每次請求的語句準備與執行耗時
+- rebuild：每次請求重新組合策略、構造分頁語句並生成緩存鍵，SQL編譯命中SQLAlchemy的編譯緩存（原有做法）；
+- no-compile-cache：同 rebuild，但在關閉編譯緩存的連接上執行，每次都重新編譯SQL，作為編譯開銷的參照；
+- cached：SalesDAO.search_page_statement 按過濾條件的形狀緩存語句，只換用新的綁定參數
+prepare 列只統計語句準備（構造語句與生成緩存鍵），execute 列為準備加執行並取回一頁結果
+
+用法:
+    python -m benchmarks.bench_search_compile --rows 10000 --repeat 200
+"""
+
+import argparse
+import os
+import random
+import statistics
+import time
+
+from benchmarks.common import EXTRA_SEARCHES, percentile, seed_opportunities, strategy_combinations, use_temp_database
+
+MODES = ("rebuild", "no-compile-cache", "cached")
+
+
+def _summary(samples):
+    samples.sort()
+    return statistics.mean(samples), statistics.median(samples), percentile(samples, 0.95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="搜索語句構造與編譯開銷微基準")
+    parser.add_argument("--rows", type=int, default=10000, help="銷售機會數")
+    parser.add_argument("--repeat", type=int, default=200, help="每種條件組合的重複次數")
+    parser.add_argument("--limit", type=int, default=50, help="每頁條數")
+    args = parser.parse_args()
+
+    db_path = use_temp_database()
+    from extensions import db
+    from app import create_app
+    from dao.sales_dao import SalesDAO
+    from models.sales import SalesOpportunity
+
+    fields = list(SalesOpportunity.FIELDS)
+    searches = list(strategy_combinations()) + EXTRA_SEARCHES + [{"q": "授權"}]
+    app = create_app({"SQLALCHEMY_DATABASE_URI": os.environ["DATABASE_URL"], "PROFILING_ENABLED": False,
+                      "AUDIT_ENABLED": False, "CACHE_ENABLED": False})
+    try:
+        with app.app_context():
+            db.create_all()
+            dao = SalesDAO()
+            seed_opportunities(dao, args.rows, random.Random(42))
+
+            def rebuild(params):
+                sort = dao.default_sort(params)
+                query, plan = dao.page_statement(
+                    dao._build_search_query(params, columns=True), args.limit, None, sort,
+                    dao.search_computed(params), fields
+                )
+                # 執行時SQLAlchemy為新構造的語句生成緩存鍵，在此計入準備耗時
+                query._generate_cache_key()
+                return query, None
+
+            def cached(params):
+                statement, values, plan = dao.search_page_statement(params, args.limit, fields=fields)
+                statement._generate_cache_key()
+                return statement, values
+
+            prepare = {"rebuild": rebuild, "no-compile-cache": rebuild, "cached": cached}
+            prepare_samples = {mode: [] for mode in MODES}
+            execute_samples = {mode: [] for mode in MODES}
+            with db.engine.connect() as cached_connection, db.engine.connect() as plain_connection:
+                plain_connection = plain_connection.execution_options(compiled_cache=None)
+                connections = {"rebuild": cached_connection, "no-compile-cache": plain_connection,
+                               "cached": cached_connection}
+                for params in searches:
+                    for mode in MODES:
+                        # 預熱：cached 模式的首次調用構造並緩存語句
+                        statement, values = prepare[mode](params)
+                        connections[mode].execute(statement, values).all()
+                    for _ in range(args.repeat):
+                        for mode in MODES:
+                            start = time.perf_counter()
+                            statement, values = prepare[mode](params)
+                            prepared = time.perf_counter()
+                            connections[mode].execute(statement, values).all()
+                            end = time.perf_counter()
+                            prepare_samples[mode].append((prepared - start) * 1e6)
+                            execute_samples[mode].append((end - start) * 1e6)
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.unlink(db_path + suffix)
+
+    print(f"{len(searches)} 種條件組合，每種 {args.repeat} 次，{args.rows} 行，每頁 {args.limit} 條（單位：微秒）")
+    print(f"{'方式':<18} {'準備平均':>9} {'準備p50':>9} {'準備p95':>9} {'執行平均':>9} {'執行p50':>9} {'執行p95':>9}")
+    for mode in MODES:
+        print(f"{mode:<18} " + " ".join(f"{value:9.1f}" for value in
+                                         _summary(prepare_samples[mode]) + _summary(execute_samples[mode])))
+    saved = statistics.mean(prepare_samples["rebuild"]) - statistics.mean(prepare_samples["cached"])
+    print(f"\n語句緩存每次請求節省約 {saved:.1f} 微秒的語句準備時間")
+
+
+if __name__ == "__main__":
+    main()
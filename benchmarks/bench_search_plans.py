@@ -0,0 +1,105 @@
+# crm_project/benchmarks/bench_search_plans.py
+
+"""
+SalesDAO.search 查詢計劃校驗與延遲基準測試
+
+對每一種查詢策略組合（以及IN列表、前綴、日期範圍策略）執行 EXPLAIN QUERY PLAN，若任一帶過濾條件的查詢
+退化為全表掃描則以非零狀態退出；同時報告在給定數據量下分頁查詢的延遲。
+
+用法:
+    python -m benchmarks.bench_search_plans --rows 1000000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+from benchmarks.common import EXTRA_SEARCHES, latency_ms, strategy_combinations, use_temp_database
+
+STAGES = ["初期", "跟進中", "談判中", "成交", "失敗"]
+
+
+def _seed(db, model, rows, chunk=50000):
+    from sqlalchemy import insert
+
+    rng = random.Random(42)
+    start = time.perf_counter()
+    for offset in range(0, rows, chunk):
+        batch = [
+            {
+                "name": f"機會{i}",
+                "customer_name": f"客戶{rng.randrange(rows // 20 or 1)}",
+                "amount": round(rng.lognormvariate(9, 1.2), 2),
+                "stage": rng.choice(STAGES),
+            }
+            for i in range(offset, min(offset + chunk, rows))
+        ]
+        db.session.execute(insert(model), batch)
+        db.session.commit()
+    print(f"已寫入 {rows} 行，用時 {time.perf_counter() - start:.1f}s")
+
+
+def _explain(db, query):
+    """返回查詢計劃的detail列"""
+    connection = db.session.connection()
+    # 展開IN列表的綁定參數
+    compiled = query.statement.compile(dialect=connection.dialect, compile_kwargs={"render_postcompile": True})
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    plan = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + str(compiled), params)
+    return [row[-1] for row in plan]
+
+
+def _is_full_scan(details, table):
+    """SCAN 表本身（無論是否借助索引排序）都意味著讀取全部行"""
+    return any(d.startswith(f"SCAN {table}") for d in details)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SalesDAO.search 查詢計劃校驗")
+    parser.add_argument("--rows", type=int, default=1000000, help="種子數據行數")
+    parser.add_argument("--repeat", type=int, default=20, help="每種組合的計時次數")
+    parser.add_argument("--limit", type=int, default=50, help="分頁大小")
+    parser.add_argument("--analyze", action="store_true", help="查詢前執行ANALYZE收集統計信息")
+    args = parser.parse_args()
+
+    db_path = use_temp_database()
+
+    from extensions import db
+    from wsgi import app
+    from dao.sales_dao import SalesDAO
+
+    failures = []
+    with app.app_context():
+        db.create_all()
+        dao = SalesDAO()
+        table = dao.model.__tablename__
+        _seed(db, dao.model, args.rows)
+        if args.analyze:
+            db.session.execute(db.text("ANALYZE"))
+
+        print(f"\n{'查詢條件':<48} {'p50(ms)':>9} {'p95(ms)':>9}  計劃")
+        for params in [*strategy_combinations(), *EXTRA_SEARCHES]:
+            base = dao._build_search_query(params)
+            page, _ = dao.page_query(base, args.limit, sort=dao.default_sort(params))
+            plans = _explain(db, base) + _explain(db, page)
+            if _is_full_scan(plans, table):
+                failures.append((params, plans))
+
+            p50, p95 = latency_ms(lambda: dao.search_page(params, args.limit), args.repeat)
+            label = ",".join(sorted(params))
+            print(f"{label:<48} {p50:9.2f} {p95:9.2f}  {' | '.join(dict.fromkeys(plans))}")
+
+    os.unlink(db_path)
+
+    if failures:
+        print("\n以下組合退化為全表掃描:")
+        for params, plans in failures:
+            print(f"  {sorted(params)}: {plans}")
+        sys.exit(1)
+    print("\n所有策略組合均使用索引")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# crm_project/benchmarks/bench_serialization.py
+
+"""
+列表序列化CPU基準測試：按API的分頁大小逐頁讀取全表並編碼為JSON響應體，
+對比每10000行消耗的CPU時間（process_time，包含SQLite查詢、對象構建與JSON編碼）
+
+- orm:          加載 SalesOpportunity 對象，逐行 to_dict()/isoformat()，Flask默認的標準庫JSON編碼（優化前的路徑）
+- rows+stdlib:  按列查詢得到列值字典，由標準庫JSON提供者直接編碼
+- rows+orjson:  按列查詢得到列值字典，由orjson提供者直接編碼為字節（需安裝orjson）
+
+用法:
+    python -m benchmarks.bench_serialization --rows 50000 --limit 500 --repeat 5
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+from benchmarks.common import seed_opportunities, use_temp_database
+
+
+def _orm_page(service, limit, after):
+    opps, next_cursor = service.sales_dao.search_page({}, limit, after)
+    return {'items': [opp.to_dict() for opp in opps], 'next_cursor': next_cursor}
+
+
+def _rows_page(service, limit, after):
+    return service.get_opportunities_page({}, limit, after)[0]
+
+
+def _read_all(db, service, provider, build_page, limit):
+    """翻完所有頁並生成響應體，返回 (CPU秒數, 行數, 響應體字節數)"""
+    rows = size = 0
+    after = None
+    start = time.process_time()
+    while True:
+        page = build_page(service, limit, after)
+        size += len(provider.response(page).get_data())
+        rows += len(page['items'])
+        after = page['next_cursor']
+        # 每頁對應一個請求，請求結束時會話被移除
+        db.session.remove()
+        if not after:
+            break
+    return time.process_time() - start, rows, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="列表序列化CPU基準測試")
+    parser.add_argument("--rows", type=int, default=50000, help="銷售機會行數")
+    parser.add_argument("--limit", type=int, default=500, help="分頁大小")
+    parser.add_argument("--repeat", type=int, default=5, help="每條路徑重複次數，取中位數")
+    args = parser.parse_args()
+
+    db_path = use_temp_database()
+    os.environ["PROFILING_ENABLED"] = "0"
+
+    from flask.json.provider import DefaultJSONProvider
+    from extensions import db
+    from wsgi import app
+    from services.sales_service import SalesService
+    from utils.serialization import OrjsonJSONProvider, StdlibJSONProvider, orjson
+
+    paths = [
+        ("orm", DefaultJSONProvider(app), _orm_page),
+        ("rows+stdlib", StdlibJSONProvider(app), _rows_page),
+    ]
+    if orjson is not None:
+        paths.append(("rows+orjson", OrjsonJSONProvider(app), _rows_page))
+    else:
+        print("未安裝orjson，跳過 rows+orjson", file=sys.stderr)
+
+    try:
+        with app.app_context():
+            db.create_all()
+            service = SalesService()
+            seed_opportunities(service.sales_dao, args.rows, random.Random(42))
+
+            print(f"{'路徑':<14} {'CPU ms/1萬行':>14} {'響應體(MB)':>12} {'相對orm':>10}")
+            baseline = None
+            for name, provider, build_page in paths:
+                # 預熱語句緩存與連接池
+                _read_all(db, service, provider, build_page, args.limit)
+                samples = []
+                for _ in range(args.repeat):
+                    cpu, rows, size = _read_all(db, service, provider, build_page, args.limit)
+                    samples.append(cpu / rows * 10000 * 1000)
+                per_10k = statistics.median(samples)
+                baseline = baseline or per_10k
+                print(f"{name:<14} {per_10k:14.1f} {size / 2**20:12.2f} {baseline / per_10k:9.2f}x")
+            db.engine.dispose()
+    finally:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.unlink(db_path + suffix)
+
+
+if __name__ == "__main__":
+    main()
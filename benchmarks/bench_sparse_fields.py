@@ -0,0 +1,74 @@
+# crm_project/benchmarks/bench_sparse_fields.py
+
+"""
+字段選擇基準測試：逐頁讀取全表，對比返回全部字段與只選擇部分字段時的延遲和響應體大小
+
+用法:
+    python -m benchmarks.bench_sparse_fields --rows 100000 --fields id,stage,amount
+"""
+
+import argparse
+import os
+import random
+import time
+
+from benchmarks.common import use_temp_database
+
+
+def _read_all_pages(app, service, limit, fields):
+    """模擬客戶端翻完所有頁，返回 (耗時秒數, JSON字節數)"""
+    start = time.perf_counter()
+    size = 0
+    after = None
+    while True:
+        page, _ = service.get_opportunities_page({}, limit, after=after, fields=fields)
+        size += len(app.json.dumps(page).encode("utf-8"))
+        after = page["next_cursor"]
+        if not after:
+            break
+    return time.perf_counter() - start, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="字段選擇基準測試")
+    parser.add_argument("--rows", type=int, default=100000, help="種子數據行數")
+    parser.add_argument("--limit", type=int, default=500, help="分頁大小")
+    parser.add_argument("--fields", default="id,stage,amount", help="選擇的字段")
+    args = parser.parse_args()
+
+    db_path = use_temp_database()
+
+    from extensions import db
+    from wsgi import app
+    from services.sales_service import SalesService
+
+    rng = random.Random(1)
+    with app.app_context():
+        db.create_all()
+        service = SalesService()
+        for offset in range(0, args.rows, 50000):
+            service.sales_dao.bulk_create([
+                {
+                    "name": f"銷售機會-{i}-" + "說明" * rng.randrange(5, 30),
+                    "customer_name": f"客戶{rng.randrange(5000)}有限公司",
+                    "amount": float(rng.randrange(1000, 1000000)),
+                    "stage": rng.choice(["初期", "跟進中", "談判中", "成交", "失敗"]),
+                }
+                for i in range(offset, min(offset + 50000, args.rows))
+            ])
+
+        fields = args.fields.split(",")
+        full_time, full_size = _read_all_pages(app, service, args.limit, None)
+        db.session.remove()
+        sparse_time, sparse_size = _read_all_pages(app, service, args.limit, fields)
+
+    os.unlink(db_path)
+
+    print(f"{'路徑':<24} {'耗時(s)':>10} {'響應體(MB)':>12}")
+    print(f"{'全部字段':<24} {full_time:10.3f} {full_size / 2**20:12.2f}")
+    print(f"{'fields=' + args.fields:<24} {sparse_time:10.3f} {sparse_size / 2**20:12.2f}")
+    print(f"耗時降低 {1 - sparse_time / full_time:.0%}，響應體縮小 {1 - sparse_size / full_size:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+# crm_project/benchmarks/bench_startup.py
+
+"""
+啟動基準測試：導入耗時、create_app 耗時與預加載（寫時複製）時每個worker的私有內存
+
+- 在全新的解釋器中多次導入 app 並調用 create_app，報告中位數耗時與RSS；
+- 以 -X importtime 分解導入耗時，列出本項目模塊與第三方包中最慢的導入；
+- 校驗導入模型、DAO、服務和異步入口所依賴的模塊時不會導入 app.py；
+- 模擬prefork服務器：預加載模式在主進程中創建應用後fork出worker，
+  對照模式在每個worker中各自導入並創建應用，比較worker就緒耗時與私有內存。
+總啟動耗時或本項目模塊的導入耗時超出預算時以非零狀態退出。
+
+用法:
+    python -m benchmarks.bench_startup --runs 5 --workers 4 --budget-ms 1500 --own-budget-ms 100
+"""
+
+import argparse
+import gc
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# 本項目的頂層模塊與包
+PROJECT_MODULES = ("app", "wsgi", "asgi", "config", "extensions", "models", "dao", "services",
+                   "controllers", "utils", "patterns")
+
+# 不應導入 app.py 的模塊
+ISOLATED_MODULES = ("models.sales", "dao.sales_dao", "services.sales_service", "utils.auth",
+                    "services.async_sales_service")
+
+STARTUP_SCRIPT = """
+import json, time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+from benchmarks.bench_startup import _memory
+print(json.dumps({"import_ms": (imported - start) * 1000, "create_ms": (created - imported) * 1000,
+                  "rss_mb": _memory()[0]}))
+"""
+
+ISOLATION_SCRIPT = """
+import importlib, json, sys
+importlib.import_module(sys.argv[1])
+print(json.dumps("app" in sys.modules))
+"""
+
+
+def _memory(pid="self"):
+    """讀取進程的 RSS 與私有內存（MB）"""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as rollup:
+        for line in rollup:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Private_Clean:", "Private_Dirty:"):
+                values[parts[0][:-1]] = int(parts[1]) / 1024
+    return values["Rss"], values["Private_Clean"] + values["Private_Dirty"]
+
+
+def _python(*args, **kwargs):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return subprocess.run([sys.executable, *args], cwd=root, capture_output=True, text=True, check=True, **kwargs)
+
+
+def _startup(runs):
+    """在全新的解釋器中導入並創建應用，返回各項耗時的中位數"""
+    samples = [json.loads(_python("-c", STARTUP_SCRIPT).stdout.strip().splitlines()[-1]) for _ in range(runs)]
+    return {key: statistics.median(sample[key] for sample in samples) for key in samples[0]}
+
+
+def _import_breakdown(top):
+    """解析 -X importtime 的輸出，返回 (本項目模塊自身耗時, 最慢的本項目模塊, 最慢的第三方頂層包)"""
+    # 導入 wsgi 會調用 create_app，覆蓋創建應用時延遲加載的藍圖與模型
+    stderr = _python("-X", "importtime", "-c", "import wsgi").stderr
+    own, packages = {}, {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        root = name.split(".")[0]
+        if root in PROJECT_MODULES:
+            own[name] = int(self_us) / 1000
+        elif "." not in name:
+            # 第三方頂層包（累計耗時包含其依賴）
+            packages[name] = int(cumulative_us) / 1000
+    slowest = sorted(own.items(), key=lambda item: item[1], reverse=True)[:top]
+    heaviest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return sum(own.values()), slowest, heaviest
+
+
+def _isolation():
+    """返回導入後會連帶導入 app.py 的模塊"""
+    return [name for name in ISOLATED_MODULES if json.loads(_python("-c", ISOLATION_SCRIPT, name).stdout)]
+
+
+def _serve_workers(mode, workers):
+    """
+    模擬prefork服務器的主進程（在子進程中運行）：fork出worker，每個worker就緒後處理一個請求，
+    報告從fork到就緒的耗時以及RSS和私有內存
+    """
+    if mode == "preload":
+        from wsgi import app  # noqa: F401  預加載：在fork前創建應用
+        gc.freeze()
+
+    reader, writer = os.pipe()
+    for _ in range(workers):
+        forked = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            os.close(reader)
+            from wsgi import app
+            with app.test_client() as client:
+                client.get("/")
+            ready_ms = (time.perf_counter() - forked) * 1000
+            rss, private = _memory()
+            os.write(writer, (json.dumps({"ready_ms": ready_ms, "rss_mb": rss, "private_mb": private}) + "\n").encode())
+            os._exit(0)
+        # 逐個啟動，避免worker之間爭用CPU影響就緒耗時
+        os.waitpid(pid, 0)
+    os.close(writer)
+    with os.fdopen(reader) as results:
+        samples = [json.loads(line) for line in results]
+    print(json.dumps({key: statistics.mean(sample[key] for sample in samples) for key in samples[0]}))
+
+
+def _prefork(mode, workers):
+    output = _python("-m", "benchmarks.bench_startup", "--serve-workers", mode, "--workers", str(workers)).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="應用啟動基準測試")
+    parser.add_argument("--runs", type=int, default=5, help="冷啟動測量次數")
+    parser.add_argument("--workers", type=int, default=4, help="模擬prefork的worker數")
+    parser.add_argument("--top", type=int, default=8, help="列出最慢的導入數")
+    parser.add_argument("--budget-ms", type=float, default=1500, help="導入並創建應用的總耗時預算（毫秒）")
+    parser.add_argument("--own-budget-ms", type=float, default=100, help="本項目模塊自身導入耗時的預算（毫秒）")
+    parser.add_argument("--serve-workers", choices=("preload", "lazy"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_workers:
+        _serve_workers(args.serve_workers, args.workers)
+        return
+
+    failures = []
+
+    startup = _startup(args.runs)
+    total = startup["import_ms"] + startup["create_ms"]
+    print(f"冷啟動（{args.runs}次中位數）: 導入 {startup['import_ms']:.0f}ms + create_app {startup['create_ms']:.0f}ms "
+          f"= {total:.0f}ms（預算 {args.budget_ms:.0f}ms），RSS {startup['rss_mb']:.1f}MB")
+    if total > args.budget_ms:
+        failures.append(f"啟動耗時 {total:.0f}ms 超出預算 {args.budget_ms:.0f}ms")
+
+    own, slowest, heaviest = _import_breakdown(args.top)
+    print(f"\n本項目模塊自身導入耗時 {own:.1f}ms（預算 {args.own_budget_ms:.0f}ms），最慢的模塊:")
+    for name, ms in slowest:
+        print(f"  {ms:7.1f}ms  {name}")
+    print("最重的第三方包（累計）:")
+    for name, ms in heaviest:
+        print(f"  {ms:7.1f}ms  {name}")
+    if own > args.own_budget_ms:
+        failures.append(f"本項目模塊導入耗時 {own:.1f}ms 超出預算 {args.own_budget_ms:.0f}ms")
+
+    leaking = _isolation()
+    print(f"\n導入時不創建應用: {'通過' if not leaking else '失敗 ' + ', '.join(leaking)}")
+    if leaking:
+        failures.append(f"導入以下模塊會連帶導入 app.py: {', '.join(leaking)}")
+
+    print(f"\n模擬prefork（{args.workers}個worker，平均值）:")
+    print(f"  {'模式':<10} {'就緒(ms)':>10} {'RSS(MB)':>10} {'私有內存(MB)':>14}")
+    for mode in ("lazy", "preload"):
+        result = _prefork(mode, args.workers)
+        print(f"  {mode:<10} {result['ready_ms']:10.1f} {result['rss_mb']:10.1f} {result['private_mb']:14.1f}")
+
+    if failures:
+        print("\n" + "\n".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
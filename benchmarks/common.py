@@ -0,0 +1,103 @@
+# crm_project/benchmarks/common.py
+
+"""基準測試腳本共用的工具：臨時數據庫、種子數據生成、延遲統計"""
+
+import itertools
+import os
+import statistics
+import tempfile
+import time
+
+# 銷售階段及其在真實漏斗中的大致比例
+STAGE_WEIGHTS = {"初期": 35, "跟進中": 25, "談判中": 15, "成交": 15, "失敗": 10}
+
+SURNAMES = "王李張劉陳楊黃趙吳周徐孫馬朱胡郭何高林羅鄭梁謝宋唐許韓馮鄧曹"
+GIVEN_NAMES = "偉芳娜敏靜麗強磊軍洋勇艷傑娟濤明超秀霞平剛桂英華玉蘭萍紅"
+COMPANY_SUFFIXES = ["科技有限公司", "貿易有限公司", "實業股份有限公司", "國際集團", "Technology Ltd."]
+PRODUCTS = ["ERP升級", "雲端遷移", "CRM導入", "數據分析平台", "資安稽核", "年度授權", "Annual License"]
+
+# SalesDAO.search 每種策略使用的查詢值
+SEARCH_VALUES = {
+    "name": "機會42",
+    "customer_name": "客戶123",
+    "stage": "談判中",
+    "min_amount": 10000.0,
+    "max_amount": 20000.0,
+}
+
+# IN列表、前綴與日期範圍策略的查詢參數，單獨或與其他策略組合使用
+EXTRA_SEARCHES = [
+    {"stage_in": ("談判中", "成交")},
+    {"name_prefix": "機會4"},
+    {"customer_prefix": "客戶12"},
+    {"created_from": "2020-01-01", "created_to": "2020-12-31"},
+    {"stage_in": ("初期", "跟進中", "談判中"), "min_amount": 10000.0},
+    {"stage": "談判中", "created_from": "2020-01-01"},
+]
+
+
+def use_temp_database():
+    """
+    創建臨時SQLite文件並通過 DATABASE_URL 指向它，必須在導入應用之前調用
+    :return: 數據庫文件路徑，測試結束後由調用方刪除
+    """
+    db_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    db_file.close()
+    os.environ["DATABASE_URL"] = "sqlite:///" + db_file.name
+    return db_file.name
+
+
+def strategy_combinations():
+    """SalesDAO.search 所有非空的策略組合；金額上下限視為同一個範圍策略的不同形態"""
+    keys = ["name", "customer_name", "stage", "amount"]
+    amount_forms = [("min_amount",), ("max_amount",), ("min_amount", "max_amount")]
+    for size in range(1, len(keys) + 1):
+        for combo in itertools.combinations(keys, size):
+            forms = amount_forms if "amount" in combo else [()]
+            for form in forms:
+                fields = [k for k in combo if k != "amount"] + list(form)
+                yield {k: SEARCH_VALUES[k] for k in fields}
+
+
+def opportunity_rows(count, rng, start=0):
+    """
+    生成接近真實分佈的銷售機會：階段按漏斗比例，金額為對數正態分佈，
+    客戶名稱為中文姓名加公司後綴
+    """
+    stages = list(STAGE_WEIGHTS)
+    weights = list(STAGE_WEIGHTS.values())
+    customers = max(count // 20, 1)
+    for i in range(start, start + count):
+        customer = rng.randrange(customers)
+        yield {
+            "name": f"{rng.choice(PRODUCTS)}-{i}",
+            "customer_name": (SURNAMES[customer % len(SURNAMES)]
+                              + GIVEN_NAMES[(customer // len(SURNAMES)) % len(GIVEN_NAMES)]
+                              + rng.choice(COMPANY_SUFFIXES)),
+            "amount": round(rng.lognormvariate(10, 1.1), 2),
+            "stage": rng.choices(stages, weights)[0],
+        }
+
+
+def seed_opportunities(dao, count, rng, chunk=20000):
+    """通過 bulk_create 寫入銷售機會（同時維護全文索引和匯總表）"""
+    for offset in range(0, count, chunk):
+        dao.bulk_create(list(opportunity_rows(min(chunk, count - offset), rng, offset)))
+
+
+def percentile(samples, pct):
+    """samples需已排序，pct取0~1"""
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(len(samples) * pct))]
+
+
+def latency_ms(func, repeat):
+    """重複調用func，返回 (p50, p95) 毫秒"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), percentile(samples, 0.95)
@@ -1,4 +1,4 @@
-_# crm_project/config.py_
+# crm_project/config.py
 
 import os
 
@@ -12,6 +12,131 @@ class Config:
         'sqlite:///' + os.path.join(os.path.abspath(os.path.dirname(__file__)), 'app.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # 數據庫引擎配置檔：default 使用SQLAlchemy默認設置，production 應用下面的連接池設置與SQLite PRAGMA
+    # 默認保持原有行為；gunicorn.conf.py 在未設置時為生產部署選擇 production
+    DATABASE_PROFILE = os.environ.get('DATABASE_PROFILE') or 'default'
+    # 連接池配置（SQLite文件數據庫只使用前三項）
+    DATABASE_POOL_SIZE = int(os.environ.get('DATABASE_POOL_SIZE', 10))
+    DATABASE_MAX_OVERFLOW = int(os.environ.get('DATABASE_MAX_OVERFLOW', 20))
+    DATABASE_POOL_TIMEOUT = int(os.environ.get('DATABASE_POOL_TIMEOUT', 30))
+    # 連接最長存活秒數，應小於數據庫或代理的空閒超時
+    DATABASE_POOL_RECYCLE = int(os.environ.get('DATABASE_POOL_RECYCLE', 1800))
+    DATABASE_POOL_PRE_PING = True
+    # 只讀副本：以逗號分隔的數據庫URL，每個副本註冊為名為 replica_<序號> 的bind
+    DATABASE_REPLICA_URLS = [url for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url]
+    SQLALCHEMY_BINDS = {f'replica_{i}': url for i, url in enumerate(DATABASE_REPLICA_URLS)}
+    # 讀查詢（get_all/get_by_id/search 等）可使用的bind，為空時所有查詢都走主庫
+    DATABASE_READ_BINDS = list(SQLALCHEMY_BINDS)
+    # 用戶寫入後固定讀主庫的秒數
+    READ_YOUR_WRITES_SECONDS = int(os.environ.get('READ_YOUR_WRITES_SECONDS', 5))
+    # 副本延遲超過該秒數時不再接收讀流量
+    REPLICA_MAX_LAG_SECONDS = int(os.environ.get('REPLICA_MAX_LAG_SECONDS', 10))
+    # 讀取副本心跳（估算延遲）的最小間隔秒數
+    REPLICA_LAG_CHECK_INTERVAL = 1
+
+    # SQLite每個新連接執行的PRAGMA
+    # WAL模式下讀寫互不阻塞；synchronous=NORMAL 在WAL下只在檢查點時fsync，斷電最多丟失最近的事務但不會損壞數據庫
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,            # 遇到寫鎖時等待的毫秒數，而不是立即報錯
+        'cache_size': -65536,            # 頁緩存64MB（負數單位為KB）
+        'mmap_size': 268435456,          # 以256MB內存映射讀取數據庫文件
+        'temp_store': 'MEMORY',
+    }
+
+    # JSON提供者：auto（已安裝orjson時使用orjson）、orjson 或 stdlib
+    JSON_PROVIDER = os.environ.get('JSON_PROVIDER') or 'auto'
+
+    # 分頁配置
+    PAGINATION_DEFAULT_LIMIT = 50
+    PAGINATION_MAX_LIMIT = 500
+
+    # 導出時每批從數據庫讀取的行數
+    EXPORT_CHUNK_SIZE = 1000
+
+    # 批量導入時每個事務插入的行數
+    IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', 5000))
+
+    # 批量接口單次允許的最大操作數
+    BATCH_MAX_OPERATIONS = 10000
+
+    # 密碼哈希配置
+    # 完整的werkzeug哈希參數；修改後，用戶下次登錄時會自動按新參數重新哈希
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'pbkdf2:sha256:600000'
+    # 哈希進程池大小，0表示在請求線程內直接計算
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    # 進程池滿時允許排隊的請求數，超出則立即返回429
+    PASSWORD_HASH_QUEUE_SIZE = int(os.environ.get('PASSWORD_HASH_QUEUE_SIZE', 8))
+    # 429響應中建議客戶端等待的秒數
+    PASSWORD_HASH_RETRY_AFTER = 1
+
+    # 請求性能埋點配置
+    # 啟用後每個響應帶有 Server-Timing 頭（SQL、ORM對象構建、序列化耗時）
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '1') != '0'
+    # 超過該耗時（毫秒）的請求連同其SQL語句寫入日誌
+    PROFILING_SLOW_REQUEST_MS = int(os.environ.get('PROFILING_SLOW_REQUEST_MS', 500))
+    # 同一請求內相同語句執行達到該次數時記為疑似N+1
+    PROFILING_N_PLUS_ONE_THRESHOLD = int(os.environ.get('PROFILING_N_PLUS_ONE_THRESHOLD', 5))
+    # 每個請求最多記錄的不同語句數
+    PROFILING_MAX_STATEMENTS = 50
+
+    # 變更審計配置
+    # 字段級變更在事務提交後進入進程內的有界緩衝區，由後台線程批量寫入 audit_log
+    AUDIT_ENABLED = os.environ.get('AUDIT_ENABLED', '1') != '0'
+    # 緩衝區最多容納的變更條數
+    AUDIT_QUEUE_SIZE = int(os.environ.get('AUDIT_QUEUE_SIZE', 10000))
+    # 後台線程每批寫入的最大條數
+    AUDIT_BATCH_SIZE = 500
+    # 緩衝區未滿一批時最長等待多久（秒）寫入
+    AUDIT_FLUSH_INTERVAL = 1.0
+    # 緩衝區已滿時寫入方最多等待的秒數，超時後在當前線程內直接寫入一次，失敗不重試、計入dropped
+    AUDIT_ENQUEUE_TIMEOUT = 0.5
+    # 寫入失敗（例如SQLite的 database is locked、連接斷開）時的重試次數，及首次重試前等待的秒數（每次加倍）
+    AUDIT_WRITE_RETRIES = int(os.environ.get('AUDIT_WRITE_RETRIES', 5))
+    AUDIT_RETRY_BACKOFF = 0.1
+
+    # 限流配置
+    # 按JWT身份的令牌桶：桶容量（允許的突發開銷）與每秒補充的令牌數
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') != '0'
+    RATE_LIMIT_CAPACITY = int(os.environ.get('RATE_LIMIT_CAPACITY', 300))
+    RATE_LIMIT_REFILL_PER_SECOND = float(os.environ.get('RATE_LIMIT_REFILL_PER_SECOND', 10))
+    # 各類請求扣除的令牌數：scan 為不帶過濾條件的全表列表，search 為帶過濾條件的列表
+    RATE_LIMIT_COSTS = {
+        'read': 1,
+        'write': 2,
+        'search': 5,
+        'scan': 20,
+        'batch': 20,
+        'export': 50,
+    }
+    # 令牌桶存儲：memory（每個worker進程各自計數，N個worker時單個身份的實際限額約為N倍）
+    # 或 sqlite（同一主機的所有worker共用一個文件，限額精確，但每次扣除都取得該文件的寫鎖，見 SQLiteBucketStore）
+    RATE_LIMIT_STORAGE = os.environ.get('RATE_LIMIT_STORAGE') or 'memory'
+    RATE_LIMIT_STORAGE_PATH = os.environ.get('RATE_LIMIT_STORAGE_PATH') or \
+        os.path.join(os.path.abspath(os.path.dirname(__file__)), 'rate_limit.db')
+    # 負載丟棄：worker內請求延遲的移動平均超過該毫秒數且處理中的請求數達到隊列深度時，
+    # 開銷高於 read 的請求返回503
+    RATE_LIMIT_SHED_LATENCY_MS = int(os.environ.get('RATE_LIMIT_SHED_LATENCY_MS', 1000))
+    # worker同時處理的請求數不超過其線程數（gunicorn.conf.py 的 threads），默認在所有線程都忙時開始丟棄
+    RATE_LIMIT_SHED_QUEUE_DEPTH = int(os.environ.get('RATE_LIMIT_SHED_QUEUE_DEPTH') or
+                                      os.environ.get('GUNICORN_THREADS', 4))
+    RATE_LIMIT_SHED_RETRY_AFTER = 1
+
+    # DAO讀緩存配置
+    # 各worker在進程內緩存按ID讀取的銷售機會與搜索分頁結果，寫事務提交後通過共享的代計數器使其失效
+    CACHE_ENABLED = os.environ.get('CACHE_ENABLED', '1') != '0'
+    CACHE_ENTITY_MAX_ENTRIES = int(os.environ.get('CACHE_ENTITY_MAX_ENTRIES', 10000))
+    CACHE_QUERY_MAX_ENTRIES = int(os.environ.get('CACHE_QUERY_MAX_ENTRIES', 1000))
+    # 條目的最長存活時間，也限制從有延遲的只讀副本讀到的舊數據被緩存的時長
+    CACHE_TTL_SECONDS = float(os.environ.get('CACHE_TTL_SECONDS', 60))
+    # 代計數器存儲：mmap（同一主機的所有worker共用一個內存映射文件）或 memory（只在進程內生效）
+    CACHE_GENERATION_STORE = os.environ.get('CACHE_GENERATION_STORE') or 'mmap'
+    CACHE_GENERATION_PATH = os.environ.get('CACHE_GENERATION_PATH') or \
+        os.path.join(os.path.abspath(os.path.dirname(__file__)), 'cache_generations.bin')
+    # 代計數器的槽位數，記錄按主鍵哈希到槽位，槽位越多因哈希衝突而多失效的記錄越少
+    CACHE_GENERATION_SLOTS = 4096
+
     # JWT配置
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'another-super-secret-key'
     # JWT過期時間（秒）
@@ -0,0 +1,143 @@
+# crm_project/controllers/async_sales_controller.py
+
+from quart import Blueprint, request, jsonify, current_app, Response
+from services.async_sales_service import AsyncSalesService
+from utils.async_auth import jwt_required
+
+# 創建藍圖，路由與 sales_bp 一致
+async_sales_bp = Blueprint("async_sales", __name__)
+
+# 實例化服務
+sales_service = AsyncSalesService()
+
+@async_sales_bp.route("/opportunities", methods=["GET"])
+@jwt_required()
+async def get_opportunities():
+    """分頁獲取所有或搜索銷售機會，支持 If-None-Match 條件請求"""
+    page_args = dict(
+        params=_search_params(),
+        limit=_page_limit(),
+        after=request.args.get("after"),
+        sort=request.args.get("sort"),
+        fields=_fields(),
+    )
+    try:
+        if request.if_none_match:
+            # 條件請求先只查詢本頁各行的版本號，未變化時不加載完整的行
+            etag = await sales_service.get_opportunities_page_etag(**page_args)
+            if request.if_none_match.contains(etag):
+                return _not_modified(etag)
+        page, etag = await sales_service.get_opportunities_page(**page_args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    response = jsonify(page)
+    response.set_etag(etag)
+    return response
+
+@async_sales_bp.route("/summary", methods=["GET"])
+@jwt_required()
+async def get_summary():
+    """銷售漏斗匯總，可用 start/end (YYYY-MM-DD) 限定按日期統計的範圍"""
+    try:
+        summary = await sales_service.get_pipeline_summary(request.args.get("start"), request.args.get("end"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(summary)
+
+def _search_params():
+    """從查詢字符串中提取搜索條件"""
+    search_params = {
+        "name": request.args.get("name"),
+        "name_prefix": request.args.get("name_prefix"),
+        "customer_name": request.args.get("customer_name"),
+        "customer_prefix": request.args.get("customer_prefix"),
+        "stage": request.args.get("stage"),
+        "stage_in": _list_arg("stage_in"),
+        "min_amount": request.args.get("min_amount", type=float),
+        "max_amount": request.args.get("max_amount", type=float),
+        "created_from": request.args.get("created_from"),
+        "created_to": request.args.get("created_to"),
+        "q": request.args.get("q"),
+    }
+
+    # 過濾掉值為None的參數
+    return {k: v for k, v in search_params.items() if v is not None}
+
+def _list_arg(name):
+    """解析以逗號分隔的列表參數，例如 stage_in=談判中,成交；未指定時返回None"""
+    value = request.args.get(name)
+    if value is None:
+        return None
+    return tuple(item.strip() for item in value.split(",") if item.strip())
+
+def _not_modified(etag):
+    """返回不帶響應體的304"""
+    response = Response("", status=304)
+    response.set_etag(etag)
+    return response
+
+def _fields():
+    """解析以逗號分隔的fields參數，例如 fields=id,stage,amount"""
+    fields = request.args.get("fields")
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(",") if field.strip()]
+
+def _page_limit():
+    """讀取limit參數並限制在配置的範圍內"""
+    limit = request.args.get("limit", type=int) or current_app.config["PAGINATION_DEFAULT_LIMIT"]
+    return max(1, min(limit, current_app.config["PAGINATION_MAX_LIMIT"]))
+
+@async_sales_bp.route("/opportunities/<int:id>", methods=["GET"])
+@jwt_required()
+async def get_opportunity(id):
+    """根據ID獲取單個銷售機會，支持 If-None-Match 條件請求"""
+    fields = _fields()
+    try:
+        etag = await sales_service.get_opportunity_etag(id, fields)
+        if etag is None:
+            return jsonify({"error": "Opportunity not found"}), 404
+        if request.if_none_match.contains(etag):
+            return _not_modified(etag)
+        opportunity = await sales_service.get_opportunity_by_id(id, fields=fields)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if opportunity:
+        response = jsonify(opportunity)
+        response.set_etag(etag)
+        return response
+    return jsonify({"error": "Opportunity not found"}), 404
+
+@async_sales_bp.route("/opportunities", methods=["POST"])
+@jwt_required()
+async def create_opportunity():
+    """創建新的銷售機會"""
+    data = await request.get_json()
+    try:
+        new_opportunity = await sales_service.create_opportunity(data)
+        return jsonify(new_opportunity), 201
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@async_sales_bp.route("/opportunities/<int:id>", methods=["PUT"])
+@jwt_required()
+async def update_opportunity(id):
+    """更新銷售機會"""
+    data = await request.get_json()
+    try:
+        updated_opportunity = await sales_service.update_opportunity(id, data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if updated_opportunity:
+        return jsonify(updated_opportunity)
+    return jsonify({"error": "Opportunity not found"}), 404
+
+@async_sales_bp.route("/opportunities/<int:id>", methods=["DELETE"])
+@jwt_required()
+async def delete_opportunity(id):
+    """刪除銷售機會"""
+    deleted_opportunity = await sales_service.delete_opportunity(id)
+    if deleted_opportunity:
+        return jsonify({"message": "Opportunity deleted successfully"})
+    return jsonify({"error": "Opportunity not found"}), 404
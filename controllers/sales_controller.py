@@ -1,8 +1,9 @@
-_# crm_project/controllers/sales_controller.py_
+# crm_project/controllers/sales_controller.py
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
 from flask_jwt_extended import jwt_required
 from services.sales_service import SalesService
+from utils.rate_limit import rate_limiter
 
 # 創建藍圖
 sales_bp = Blueprint("sales", __name__)
@@ -10,39 +11,178 @@ sales_bp = Blueprint("sales", __name__)
 # 實例化服務
 sales_service = SalesService()
 
+# 導出格式對應的MIME類型
+EXPORT_MIMETYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+def _list_cost():
+    """帶過濾條件的列表走索引，按搜索計費；不帶任何條件的全表列表按掃描計費"""
+    return "search" if _search_params() else "scan"
+
 @sales_bp.route("/opportunities", methods=["GET"])
 @jwt_required()
+@rate_limiter.limit(_list_cost)
 def get_opportunities():
-    """獲取所有或搜索銷售機會"""
+    """分頁獲取所有或搜索銷售機會，支持 If-None-Match 條件請求"""
+    page_args = dict(
+        params=_search_params(),
+        limit=_page_limit(),
+        after=request.args.get("after"),
+        sort=request.args.get("sort"),
+        fields=_fields(),
+    )
+    try:
+        if request.if_none_match:
+            # 條件請求先只查詢本頁各行的版本號，未變化時不加載完整的行
+            etag = sales_service.get_opportunities_page_etag(**page_args)
+            if request.if_none_match.contains(etag):
+                return _not_modified(etag)
+        page, etag = sales_service.get_opportunities_page(**page_args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    response = jsonify(page)
+    response.set_etag(etag)
+    return response
+
+@sales_bp.route("/opportunities/export", methods=["GET"])
+@jwt_required()
+@rate_limiter.limit("export")
+def export_opportunities():
+    """以NDJSON或CSV流式導出銷售機會，支持與列表相同的查詢參數"""
+    fmt = request.args.get("format", "ndjson")
+    try:
+        chunks = sales_service.export_opportunities(
+            _search_params(), fmt, current_app.config["EXPORT_CHUNK_SIZE"]
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    response = Response(stream_with_context(chunks), mimetype=EXPORT_MIMETYPES[fmt])
+    response.headers["Content-Disposition"] = f"attachment; filename=opportunities.{fmt}"
+    return response
+
+@sales_bp.route("/opportunities/changes", methods=["GET"])
+@jwt_required()
+@rate_limiter.limit("search")
+def get_opportunity_changes():
+    """增量同步：返回 since 序列號之後創建、更新或刪除的銷售機會"""
+    try:
+        changes = sales_service.get_opportunity_changes(
+            request.args.get("since"), _page_limit(), request.args.get("after"), _fields()
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(changes)
+
+@sales_bp.route("/summary", methods=["GET"])
+@jwt_required()
+@rate_limiter.limit("read")
+def get_summary():
+    """銷售漏斗匯總，可用 start/end (YYYY-MM-DD) 限定按日期統計的範圍"""
+    try:
+        summary = sales_service.get_pipeline_summary(request.args.get("start"), request.args.get("end"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(summary)
+
+@sales_bp.route("/cache/metrics", methods=["GET"])
+@jwt_required()
+@rate_limiter.limit("read")
+def get_cache_metrics():
+    """DAO讀緩存的命中率等統計，按處理本請求的worker進程統計"""
+    return jsonify(sales_service.get_cache_metrics())
+
+@sales_bp.route("/audit/metrics", methods=["GET"])
+@jwt_required()
+@rate_limiter.limit("read")
+def get_audit_metrics():
+    """變更審計的寫入統計（含重試用盡後丟棄的條數），按處理本請求的worker進程統計"""
+    return jsonify(sales_service.get_audit_metrics())
+
+def _search_params():
+    """從查詢字符串中提取搜索條件"""
     search_params = {
         "name": request.args.get("name"),
+        "name_prefix": request.args.get("name_prefix"),
         "customer_name": request.args.get("customer_name"),
+        "customer_prefix": request.args.get("customer_prefix"),
         "stage": request.args.get("stage"),
+        "stage_in": _list_arg("stage_in"),
         "min_amount": request.args.get("min_amount", type=float),
         "max_amount": request.args.get("max_amount", type=float),
+        "created_from": request.args.get("created_from"),
+        "created_to": request.args.get("created_to"),
+        "q": request.args.get("q"),
     }
     
     # 過濾掉值為None的參數
-    search_params = {k: v for k, v in search_params.items() if v is not None}
+    return {k: v for k, v in search_params.items() if v is not None}
+
+def _list_arg(name):
+    """解析以逗號分隔的列表參數，例如 stage_in=談判中,成交；未指定時返回None"""
+    value = request.args.get(name)
+    if value is None:
+        return None
+    return tuple(item.strip() for item in value.split(",") if item.strip())
+
+def _not_modified(etag):
+    """返回不帶響應體的304"""
+    response = Response(status=304)
+    response.set_etag(etag)
+    return response
 
-    if search_params:
-        opportunities = sales_service.search_opportunities(search_params)
-    else:
-        opportunities = sales_service.get_all_opportunities()
-        
-    return jsonify(opportunities)
+def _fields():
+    """解析以逗號分隔的fields參數，例如 fields=id,stage,amount"""
+    fields = request.args.get("fields")
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(",") if field.strip()]
+
+def _page_limit():
+    """讀取limit參數並限制在配置的範圍內"""
+    limit = request.args.get("limit", type=int) or current_app.config["PAGINATION_DEFAULT_LIMIT"]
+    return max(1, min(limit, current_app.config["PAGINATION_MAX_LIMIT"]))
 
 @sales_bp.route("/opportunities/<int:id>", methods=["GET"])
 @jwt_required()
+@rate_limiter.limit("read")
 def get_opportunity(id):
-    """根據ID獲取單個銷售機會"""
-    opportunity = sales_service.get_opportunity_by_id(id)
+    """根據ID獲取單個銷售機會，支持 If-None-Match 條件請求"""
+    fields = _fields()
+    try:
+        etag = sales_service.get_opportunity_etag(id, fields)
+        if etag is None:
+            return jsonify({"error": "Opportunity not found"}), 404
+        if request.if_none_match.contains(etag):
+            return _not_modified(etag)
+        opportunity = sales_service.get_opportunity_by_id(id, fields=fields)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     if opportunity:
-        return jsonify(opportunity)
+        response = jsonify(opportunity)
+        response.set_etag(etag)
+        return response
     return jsonify({"error": "Opportunity not found"}), 404
 
+@sales_bp.route("/opportunities/<int:id>/history", methods=["GET"])
+@jwt_required()
+@rate_limiter.limit("read")
+def get_opportunity_history(id):
+    """分頁獲取銷售機會的字段級變更歷史（誰在何時把哪些字段從什麼改為什麼）"""
+    try:
+        history = sales_service.get_opportunity_history(id, _page_limit(), request.args.get("after"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if history is None:
+        return jsonify({"error": "Opportunity not found"}), 404
+    return jsonify(history)
+
 @sales_bp.route("/opportunities", methods=["POST"])
 @jwt_required()
+@rate_limiter.limit("write")
 def create_opportunity():
     """創建新的銷售機會"""
     data = request.get_json()
@@ -52,18 +192,37 @@ def create_opportunity():
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
 
+@sales_bp.route("/opportunities:batch", methods=["POST"])
+@jwt_required()
+@rate_limiter.limit("batch")
+def batch_opportunities():
+    """在一個事務中批量創建/更新/刪除銷售機會，返回逐項結果"""
+    data = request.get_json() or {}
+    try:
+        results = sales_service.batch_opportunities(
+            data.get("operations"), current_app.config["BATCH_MAX_OPERATIONS"]
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"results": results})
+
 @sales_bp.route("/opportunities/<int:id>", methods=["PUT"])
 @jwt_required()
+@rate_limiter.limit("write")
 def update_opportunity(id):
     """更新銷售機會"""
     data = request.get_json()
-    updated_opportunity = sales_service.update_opportunity(id, data)
+    try:
+        updated_opportunity = sales_service.update_opportunity(id, data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     if updated_opportunity:
         return jsonify(updated_opportunity)
     return jsonify({"error": "Opportunity not found"}), 404
 
 @sales_bp.route("/opportunities/<int:id>", methods=["DELETE"])
 @jwt_required()
+@rate_limiter.limit("write")
 def delete_opportunity(id):
     """刪除銷售機會"""
     deleted_opportunity = sales_service.delete_opportunity(id)
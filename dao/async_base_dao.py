@@ -0,0 +1,92 @@
+# crm_project/dao/async_base_dao.py
+
+from sqlalchemy import select
+
+from .base_dao import QueryBuilderMixin
+from utils.async_database import async_db
+
+class AsyncBaseDAO(QueryBuilderMixin):
+    """
+    基於 AsyncSession 的基礎數據訪問對象，與 BaseDAO 行為一致
+    查詢使用 select() 語句構建，分頁、排序與字段投影複用 QueryBuilderMixin；
+    寫入鉤子在同一事務內執行，可通過 run_sync 複用同步的派生數據維護邏輯
+    """
+
+    def __init__(self, model):
+        self.model = model
+
+    @property
+    def session(self):
+        """當前請求的異步會話"""
+        return async_db.session
+
+    async def get_page(self, limit, after=None, sort=None, fields=None):
+        """分頁獲取所有記錄，返回 (記錄列表, 下一頁游標)"""
+        return await self.paginate(select(self.model), limit, after, sort, fields=fields)
+
+    async def paginate(self, query, limit, after=None, sort=None, computed=None, fields=None):
+        """基於游標的分頁，參數與返回值同 BaseDAO.paginate"""
+        query, plan = self.page_statement(query, limit, after, sort, computed, fields)
+        result = await self.session.execute(query)
+        rows = result.all() if plan.names or plan.extra else result.scalars().all()
+        return self.page_result(rows, limit, plan)
+
+    async def get_by_id(self, id):
+        return await self.session.get(self.model, id)
+
+    async def get_fields_by_id(self, id, fields):
+        """只查詢指定字段，返回列值字典；記錄不存在時返回None"""
+        names = self._projection_names(fields)
+        stmt = select(*[self._column(name) for name in names]).where(self._column('id') == id)
+        row = (await self.session.execute(stmt)).first()
+        return dict(zip(names, row)) if row else None
+
+    async def create(self, data):
+        instance = self.model(**data)
+        self.session.add(instance)
+        await self.session.flush()
+        await self._on_saved([instance.id])
+        await self.session.commit()
+        return instance
+
+    async def update(self, id, data):
+        instance = await self.get_by_id(id)
+        if instance:
+            await self._before_change([id], set(data))
+            for key, value in data.items():
+                setattr(instance, key, value)
+            await self.session.flush()
+            await self._on_saved([id], set(data))
+            await self.session.commit()
+            # 會話提交後不過期對象，重新讀取在SQL中遞增的version
+            await self.session.refresh(instance)
+        return instance
+
+    async def delete(self, id):
+        instance = await self.get_by_id(id)
+        if instance:
+            await self._before_change([id])
+            await self.session.delete(instance)
+            await self.session.flush()
+            await self._on_deleted([id])
+            await self.session.commit()
+        return instance
+
+    async def _before_change(self, ids, fields=None):
+        """更新或刪除執行前的鉤子，參數同 BaseDAO._before_change"""
+
+    async def _on_saved(self, ids, fields=None):
+        """記錄寫入後、事務提交前的鉤子"""
+
+    async def _on_deleted(self, ids):
+        """記錄刪除後、事務提交前的鉤子"""
+
+    async def run_sync(self, fn):
+        """在當前會話的同步視圖上執行 fn(session)，與其它語句處於同一事務"""
+        return await self.session().run_sync(fn)
+
+    async def commit(self):
+        await self.session.commit()
+
+    async def rollback(self):
+        await self.session.rollback()
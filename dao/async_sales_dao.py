@@ -0,0 +1,72 @@
+# crm_project/dao/async_sales_dao.py
+
+from sqlalchemy import select
+
+from .async_base_dao import AsyncBaseDAO
+from .sales_dao import SalesQueryMixin, sales_cache, sales_changes, sales_fulltext
+from .summary_dao import SummaryDAO
+from models.sales import SalesOpportunity
+from models.summary import SalesSummary
+from utils.async_database import async_db
+
+class AsyncSalesDAO(SalesQueryMixin, AsyncBaseDAO):
+    """銷售機會的異步數據訪問對象，搜索與派生數據維護與 SalesDAO 一致"""
+
+    def __init__(self):
+        super().__init__(SalesOpportunity)
+        self.fulltext = sales_fulltext
+        self.summary = SummaryDAO()
+        self.changes = sales_changes
+        self.cache = sales_cache
+        self._init_search()
+
+    @property
+    def fulltext_enabled(self):
+        return async_db.dialect_name == 'sqlite'
+
+    def _search_base(self, columns=False):
+        return select(self.model.__table__) if columns else select(self.model)
+
+    async def search_page(self, params, limit, after=None, sort=None, fields=None):
+        """多條件查詢並進行游標分頁，參數與返回值同 SalesDAO.search_page"""
+        sort = sort or self.default_sort(params)
+        if not fields:
+            return await self.paginate(self._build_search_query(params), limit, after, sort, self.search_computed(params))
+        statement, values, plan = self.search_page_statement(params, limit, after, sort, fields)
+        result = await self.session.execute(statement, values)
+        return self.page_result(result.all(), limit, plan)
+
+    async def _before_change(self, ids, fields=None):
+        """減去舊值在匯總表中的貢獻"""
+        if fields is None or fields & self.summary_fields:
+            await self.run_sync(lambda session: self.summary.subtract(ids, session))
+
+    async def _on_saved(self, ids, fields=None):
+        """同步全文索引與匯總表，並為這批記錄分配新的變更序列號"""
+        if fields is None or fields & set(self.fulltext.fields):
+            await self.run_sync(lambda session: self.fulltext.index(ids, session=session))
+        if fields is None or fields & self.summary_fields:
+            await self.run_sync(lambda session: self.summary.add(ids, session))
+        await self.run_sync(lambda session: self.changes.touch(ids, session=session))
+        # 異步路由不讀緩存，但提交後同樣遞增代號，使同步worker中的緩存失效
+        await self.run_sync(lambda session: self.cache.invalidate(ids, session))
+
+    async def _on_deleted(self, ids):
+        await self.run_sync(lambda session: self.fulltext.remove(ids, session=session))
+        await self.run_sync(lambda session: self.changes.tombstone(ids, session=session))
+        await self.run_sync(lambda session: self.cache.invalidate(ids, session))
+
+class AsyncSummaryDAO(AsyncBaseDAO):
+    """銷售漏斗匯總的異步讀取"""
+
+    def __init__(self):
+        super().__init__(SalesSummary)
+
+    async def get_dimension(self, dimension, start=None, end=None):
+        """讀取某一維度的匯總行，可按鍵範圍過濾（用於日期）"""
+        stmt = select(self.model).where(self.model.dimension == dimension, self.model.count > 0)
+        if start is not None:
+            stmt = stmt.where(self.model.key >= start)
+        if end is not None:
+            stmt = stmt.where(self.model.key <= end)
+        return (await self.session.scalars(stmt.order_by(self.model.key))).all()
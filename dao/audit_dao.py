@@ -0,0 +1,18 @@
+# crm_project/dao/audit_dao.py
+
+from .base_dao import BaseDAO
+from models.audit import AuditLog
+
+class AuditDAO(BaseDAO):
+    """變更歷史的數據訪問對象，只讀；寫入由 utils.audit.AuditTrail 的後台線程批量完成"""
+
+    def __init__(self):
+        super().__init__(AuditLog)
+
+    def history_page(self, entity_type, entity_id, limit, after=None):
+        """
+        按id倒序（最近的變更在前）分頁獲取一個實體的變更歷史
+        走 (entity_type, entity_id, id) 索引，返回 (列值字典列表, 下一頁游標)
+        """
+        query = self.model.query.filter_by(entity_type=entity_type, entity_id=entity_id)
+        return self.paginate(query, limit, after, sort='-id', fields=self.model.FIELDS)
@@ -1,36 +1,344 @@
-_# crm_project/dao/base_dao.py_
+# crm_project/dao/base_dao.py
 
-from app import db
+from collections import namedtuple
 
-class BaseDAO:
+from sqlalchemy import Select, and_, or_, tuple_, bindparam, select, insert, update, delete
+
+from extensions import db
+from utils.pagination import parse_sort, encode_cursor, decode_cursor
+from utils.profiling import request_profiler
+
+# 分頁查詢的結構：排序規則、附加的計算列名稱、投影的字段名稱及其列數
+PagePlan = namedtuple('PagePlan', 'spec extra names width')
+
+class QueryBuilderMixin:
+    """同步與異步DAO共用的查詢構建邏輯，不執行任何SQL"""
+
+    # 允許用於排序/游標分頁的字段，子類可覆蓋
+    sortable_fields = ('id',)
+
+    # IN列表每批的最大參數個數，避免超出數據庫的綁定變量上限
+    in_chunk_size = 500
+
+    # 分頁語句中游標值與LIMIT的綁定參數名
+    CURSOR_PARAM = 'page_cursor'
+    LIMIT_PARAM = 'page_limit'
+
+    def page_statement(self, query, limit, after=None, sort=None, computed=None, fields=None):
+        """
+        構造游標分頁查詢
+        :return: (分頁查詢, PagePlan)，查詢結果交給 page_result 轉換
+        """
+        computed = computed or {}
+        query, spec = self.page_query(query, limit, after, sort, computed)
+        extra = [name for name, _ in spec if name in computed]
+
+        names = None
+        if fields:
+            names = self._projection_names(fields, [name for name, _ in spec if name not in computed])
+            query = self._project(query, [self._column(name) for name in names])
+        if extra:
+            query = query.add_columns(*[computed[name] for name in extra])
+        return query, PagePlan(spec, extra, names, len(names) if names else 1)
+
+    def page_result(self, rows, limit, plan):
+        """
+        將分頁查詢的結果轉換為 (記錄列表, 下一頁游標)
+        :param rows: 只查詢ORM對象時為對象列表，否則為行元組列表
+        """
+        if plan.names:
+            items = [dict(zip(plan.names, row)) for row in rows]
+        elif plan.extra:
+            items = [row[0] for row in rows]
+        else:
+            items = rows
+
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            last = items[-1]
+            extra_values = dict(zip(plan.extra, rows[limit - 1][plan.width:])) if plan.extra else {}
+            values = [
+                extra_values[name] if name in extra_values else (last[name] if plan.names else getattr(last, name))
+                for name, _ in plan.spec
+            ]
+            next_cursor = encode_cursor(plan.spec, values)
+        return items, next_cursor
+
+    def page_query(self, query, limit, after=None, sort=None, computed=None):
+        """
+        為基礎查詢加上游標條件、排序和LIMIT，不執行查詢
+        :return: (分頁查詢, 解析後的排序規則)
+        """
+        computed = computed or {}
+        spec = parse_sort(sort, tuple(self.sortable_fields) + tuple(computed))
+        columns = [
+            (computed[name] if name in computed else self._column(name), descending)
+            for name, descending in spec
+        ]
+
+        # 游標值與LIMIT使用命名的綁定參數，語句可以緩存並以 page_params 的參數重複執行
+        if after:
+            values = decode_cursor(after, spec)
+            binds = [
+                bindparam(f'{self.CURSOR_PARAM}_{i}', value, type_=column.type)
+                for i, ((column, _), value) in enumerate(zip(columns, values))
+            ]
+            query = query.filter(self._keyset_condition(columns, binds))
+
+        query = query.order_by(*[c.desc() if descending else c.asc() for c, descending in columns])
+        # 多取一行用於判斷是否還有下一頁
+        return query.limit(bindparam(self.LIMIT_PARAM, limit + 1)), spec
+
+    def page_params(self, limit, after, spec):
+        """以 page_statement 構造的分頁語句查詢另一頁時的游標與LIMIT綁定參數"""
+        params = {self.LIMIT_PARAM: limit + 1}
+        if after:
+            for i, value in enumerate(decode_cursor(after, spec)):
+                params[f'{self.CURSOR_PARAM}_{i}'] = value
+        return params
+
+    @staticmethod
+    def _keyset_condition(columns, values):
+        """構造"位於游標之後"的過濾條件，values 為游標值或其綁定參數"""
+        directions = {descending for _, descending in columns}
+        if len(directions) == 1:
+            # 同向排序時使用行值比較，可直接走複合索引的範圍掃描
+            lhs = tuple_(*[c for c, _ in columns])
+            rhs = tuple_(*values, types=[c.type for c, _ in columns])
+            return lhs < rhs if directions.pop() else lhs > rhs
+
+        # 混合方向時展開為 (a > x) OR (a = x AND b < y) OR ...
+        clauses = []
+        for i, (column, descending) in enumerate(columns):
+            equals = [c == v for (c, _), v in zip(columns[:i], values[:i])]
+            compare = column < values[i] if descending else column > values[i]
+            clauses.append(and_(*equals, compare))
+        return or_(*clauses)
+
+    def _column(self, name):
+        """
+        表上的列；排序、游標條件與投影都使用表的列而非ORM屬性，
+        使按列查詢的 select() 語句保持為Core語句，執行時不經過ORM的編譯與結果處理
+        """
+        return self.model.__table__.c[name]
+
+    def _project(self, query, columns):
+        """只查詢指定的列，支持ORM查詢與select()語句"""
+        if isinstance(query, Select):
+            return query.with_only_columns(*columns)
+        return query.with_entities(*columns)
+
+    @staticmethod
+    def _projection_names(fields, required=()):
+        """合併請求的字段與必須查詢的字段（如排序鍵），保持順序並去重"""
+        return list(dict.fromkeys([*fields, *required]))
+
+    @staticmethod
+    def _read(query):
+        """
+        標記為只讀查詢，可由 RoutingSession 路由到只讀副本
+        已標記的語句原樣返回：execution_options 會複製語句，丟棄已經計算好的緩存鍵
+        """
+        if query.get_execution_options().get('read_replica'):
+            return query
+        return query.execution_options(read_replica=True)
+
+    def _chunks(self, items):
+        for start in range(0, len(items), self.in_chunk_size):
+            yield items[start:start + self.in_chunk_size]
+
+class BaseDAO(QueryBuilderMixin):
     """基礎數據訪問對象，封裝通用CRUD操作"""
 
     def __init__(self, model):
         self.model = model
 
     def get_all(self):
-        return self.model.query.all()
+        with request_profiler.span('hydrate'):
+            return self._read(self.model.query).all()
+
+    def get_all_rows(self, fields):
+        """獲取所有記錄的指定字段，返回列值字典列表"""
+        return self.rows(select(self.model.__table__), fields)
+
+    def rows(self, query, fields):
+        """
+        只查詢指定的列並返回列值字典列表，值保持數據庫驅動返回的原始類型（datetime不轉字符串），
+        不創建ORM對象，也不寫入會話的identity map，適合只讀請求直接編碼為JSON
+        :param query: ORM查詢或 select() 語句
+        """
+        names = list(fields)
+        query = self._project(query, [self._column(name) for name in names])
+        with request_profiler.span('hydrate'):
+            return [dict(zip(names, row)) for row in self._all(query)]
+
+    def get_page(self, limit, after=None, sort=None, fields=None):
+        """分頁獲取所有記錄，返回 (記錄列表, 下一頁游標)"""
+        return self.paginate(self.model.query, limit, after, sort, fields=fields)
+
+    def paginate(self, query, limit, after=None, sort=None, computed=None, fields=None):
+        """
+        基於游標（keyset）的分頁：以上一頁最後一行的排序鍵作為起點，
+        無論翻到第幾頁都只需一次索引定位，避免OFFSET掃描
+        :param query: 基礎查詢
+        :param limit: 每頁條數
+        :param after: 上一頁返回的游標
+        :param sort: 排序參數，例如 "amount,-created_at"
+        :param computed: 額外可排序的計算列 {名稱: SQL表達式}，例如全文檢索的相關度
+        :param fields: 只查詢的字段列表；指定時返回列值字典（另含排序鍵），不創建ORM對象
+        :return: (記錄列表, 下一頁游標；沒有下一頁時為None)
+        """
+        query, plan = self.page_statement(query, limit, after, sort, computed, fields)
+        with request_profiler.span('hydrate'):
+            rows = self._all(query)
+        return self.page_result(rows, limit, plan)
+
+    def _all(self, query, params=None):
+        """
+        以只讀方式執行ORM查詢或 select() 語句，返回結果列表
+        :param params: select() 語句的綁定參數，用於以新的值重複執行緩存的語句
+        """
+        if isinstance(query, Select):
+            return db.session.execute(self._read(query), params).all()
+        return self._read(query).all()
 
     def get_by_id(self, id):
-        return self.model.query.get(id)
+        with request_profiler.span('hydrate'):
+            return db.session.get(self.model, id, bind_arguments={'read_replica': True})
+
+    def get_fields_by_id(self, id, fields):
+        """只查詢指定字段，返回列值字典；記錄不存在時返回None"""
+        names = self._projection_names(fields)
+        stmt = select(*[self._column(name) for name in names]).where(self._column('id') == id)
+        row = db.session.execute(self._read(stmt)).first()
+        return dict(zip(names, row)) if row else None
 
     def create(self, data):
         instance = self.model(**data)
         db.session.add(instance)
+        db.session.flush()
+        self._on_saved([instance.id])
         db.session.commit()
         return instance
 
     def update(self, id, data):
-        instance = self.get_by_id(id)
+        # 寫操作從主庫讀取，避免副本延遲導致找不到剛創建的記錄
+        instance = db.session.get(self.model, id)
         if instance:
+            self._before_change([id], set(data))
             for key, value in data.items():
                 setattr(instance, key, value)
+            db.session.flush()
+            self._on_saved([id], set(data))
             db.session.commit()
         return instance
 
     def delete(self, id):
-        instance = self.get_by_id(id)
+        instance = db.session.get(self.model, id)
         if instance:
+            self._before_change([id])
             db.session.delete(instance)
+            db.session.flush()
+            self._on_deleted([id])
             db.session.commit()
         return instance
+
+    def _before_change(self, ids, fields=None):
+        """
+        更新或刪除執行前的鉤子，此時數據庫中仍是舊值
+        :param ids: 將被更新或刪除的主鍵
+        :param fields: 將被更新的字段集合；刪除時為None
+        """
+
+    def _on_saved(self, ids, fields=None):
+        """
+        記錄寫入後、事務提交前的鉤子，子類可覆蓋以維護派生數據
+        :param ids: 被創建或更新的主鍵
+        :param fields: 被更新的字段集合；創建時為None
+        """
+
+    def _on_deleted(self, ids):
+        """記錄刪除後、事務提交前的鉤子"""
+
+    def bulk_create(self, rows, commit=True, hooks=True):
+        """
+        以一條executemany風格的INSERT批量插入
+        :param rows: 字段字典列表
+        :param commit: 是否立即提交；為False時由調用方控制事務
+        :param hooks: 是否執行 _on_saved 維護派生數據；為False時由調用方之後統一重建
+        :return: 與rows順序一致的新記錄主鍵列表
+        """
+        if not rows:
+            return []
+        stmt = insert(self.model).returning(self.model.id, sort_by_parameter_order=True)
+        ids = list(db.session.scalars(stmt, rows))
+        if hooks:
+            self._on_saved(ids)
+        if commit:
+            db.session.commit()
+        return ids
+
+    def bulk_update(self, rows, commit=True):
+        """
+        按主鍵批量更新（executemany），不逐行加載對象
+        :param rows: 字段字典列表，每項必須包含id
+        :param commit: 是否立即提交
+        :return: 實際存在並被更新的主鍵集合
+        """
+        existing = self.existing_ids([row['id'] for row in rows])
+        rows = [row for row in rows if row['id'] in existing]
+        if rows:
+            fields = {key for row in rows for key in row} - {'id'}
+            self._before_change(existing, fields)
+            db.session.execute(update(self.model), rows)
+            self._on_saved(existing, fields)
+        if commit:
+            db.session.commit()
+        return existing
+
+    def bulk_delete(self, ids, commit=True):
+        """
+        以 DELETE ... WHERE id IN (...) 批量刪除
+        :param ids: 主鍵列表
+        :param commit: 是否立即提交
+        :return: 實際存在並被刪除的主鍵集合
+        """
+        existing = self.existing_ids(ids)
+        if existing:
+            self._before_change(existing)
+        for chunk in self._chunks(sorted(existing)):
+            stmt = delete(self.model).where(self.model.id.in_(chunk))
+            db.session.execute(stmt, execution_options={'synchronize_session': False})
+        if existing:
+            self._on_deleted(existing)
+        if commit:
+            db.session.commit()
+        return existing
+
+    def drop_indexes(self):
+        """刪除表上的二級索引，用於大批量導入前；之後需調用 create_indexes 重建"""
+        connection = db.session.connection()
+        for index in self.model.__table__.indexes:
+            index.drop(connection, checkfirst=True)
+        db.session.commit()
+
+    def create_indexes(self):
+        """創建表上缺失的二級索引"""
+        connection = db.session.connection()
+        for index in self.model.__table__.indexes:
+            index.create(connection, checkfirst=True)
+        db.session.commit()
+
+    def existing_ids(self, ids):
+        """返回ids中在表內存在的主鍵集合"""
+        found = set()
+        for chunk in self._chunks(list(set(ids))):
+            found.update(db.session.scalars(select(self.model.id).where(self.model.id.in_(chunk))))
+        return found
+
+    def commit(self):
+        db.session.commit()
+
+    def rollback(self):
+        db.session.rollback()
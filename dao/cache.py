@@ -0,0 +1,294 @@
+# crm_project/dao/cache.py
+
+import collections
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# 會話 info 中記錄本事務寫入過的 {表名: 主鍵集合} 的鍵
+INVALIDATE_KEY = 'cache_invalidate'
+
+# 代計數器為8字節無符號整數
+_COUNTER = struct.Struct('Q')
+
+
+def _next_generation(current):
+    """
+    新的代號：最近一次寫入提交的時間（微秒），並保證嚴格遞增
+    代號即失效時間，可直接與只讀副本的心跳時間比較，判斷副本是否已包含這次寫入
+    """
+    return max(current + 1, int(time.time() * 1_000_000))
+
+
+class MemoryGenerationStore:
+    """進程內的代計數器，只在單進程部署（或開發、測試）中使用"""
+
+    def __init__(self, slots):
+        self._values = [0] * slots
+
+    def get(self, slot):
+        return self._values[slot]
+
+    def bump(self, slots):
+        for slot in slots:
+            self._values[slot] = _next_generation(self._values[slot])
+
+
+class MmapGenerationStore:
+    """
+    內存映射文件中的代計數器，同一主機上的所有預派生worker共用
+    讀取直接訪問映射的內存，不經過系統調用；遞增時持有文件鎖，多個進程的寫入不會丟失
+    """
+
+    def __init__(self, path, slots):
+        self.path = path
+        self.slots = slots
+        self._map = None
+        self._fd = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _mapped(self):
+        # 映射不能跨進程使用：每個worker進程在首次訪問時各自打開
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    size = self.slots * _COUNTER.size
+                    fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+                    if os.fstat(fd).st_size < size:
+                        os.ftruncate(fd, size)
+                    self._map, self._fd, self._pid = mmap.mmap(fd, size), fd, os.getpid()
+        return self._map
+
+    def get(self, slot):
+        return _COUNTER.unpack_from(self._mapped(), slot * _COUNTER.size)[0]
+
+    def bump(self, slots):
+        mapped = self._mapped()
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            for slot in slots:
+                offset = slot * _COUNTER.size
+                _COUNTER.pack_into(mapped, offset, _next_generation(_COUNTER.unpack_from(mapped, offset)[0]))
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+
+class LRUCache:
+    """
+    線程安全、按條目數限制大小的LRU緩存
+    每個條目記錄寫入時的代號與過期時間，代號變化或過期的條目視為失效；
+    不需要失效的緩存（例如按形狀緩存的SQL語句）不傳代號與存活時間
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def get(self, key, generation=None):
+        """返回 (是否命中, 值)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, entry_generation, expires = entry
+                if entry_generation == generation and expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+                self.invalidations += 1
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value, generation=None, ttl=None):
+        """ttl 為None時條目不過期"""
+        expires = float('inf') if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            self._entries[key] = (value, generation, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'invalidations': self.invalidations,
+                'evictions': self.evictions,
+            }
+
+
+class TableCache:
+    """
+    一張表的兩級緩存：按主鍵的記錄緩存與按規範化查詢參數的查詢結果緩存
+    - 記錄以寫入時該主鍵所在槽位的代號校驗，寫入某條記錄只使該記錄（及少量哈希衝突的記錄）失效；
+    - 查詢結果以表的代號校驗，表的任意寫入都使全部查詢結果失效
+    """
+
+    def __init__(self, manager, name):
+        self.manager = manager
+        self.name = name
+        self.records = LRUCache(manager.entity_max_entries)
+        self.queries = LRUCache(manager.query_max_entries)
+
+    @property
+    def enabled(self):
+        return self.manager.enabled
+
+    def table_slot(self):
+        return self.manager.slot(self.name)
+
+    def record_slot(self, id):
+        return self.manager.slot(f'{self.name}:{id}')
+
+    def get_record(self, id, loader):
+        """返回主鍵對應的記錄，未命中時調用 loader() 加載；記錄不存在時 loader 返回None，同樣緩存"""
+        return self._get(self.records, id, self.record_slot(id), loader)
+
+    def get_query(self, key, loader):
+        """返回查詢結果，未命中時調用 loader() 執行查詢"""
+        return self._get(self.queries, key, self.table_slot(), loader)
+
+    def _get(self, entries, key, slot, loader):
+        if self.manager.pinned():
+            # 調用方剛寫入過、讀取固定走主庫（讀你所寫），不使用可能來自其他主機或舊副本的條目
+            return loader()
+        # 先讀代號再加載：加載期間提交的寫入會使代號變化，加載到的舊數據不會被當作有效
+        generation = self.manager.store.get(slot)
+        hit, value = entries.get(key, generation)
+        if not hit:
+            value = loader()
+            if self.manager.fresh(generation):
+                entries.put(key, value, generation, self.manager.ttl)
+        return value
+
+    @staticmethod
+    def pending(session):
+        """會話的當前事務是否有待提交的寫入"""
+        return bool(session.info.get(INVALIDATE_KEY))
+
+    def invalidate(self, ids, session):
+        """記錄本事務寫入的主鍵，事務提交後遞增相應的代號；回滾時丟棄"""
+        session.info.setdefault(INVALIDATE_KEY, {}).setdefault(self.name, set()).update(ids)
+
+    def invalidate_all(self):
+        """
+        立即使全部記錄與查詢結果失效，用於繞過寫入鉤子的批量操作（推遲維護的導入、回填變更序列號）
+        新插入的主鍵事先無法確定（可能已緩存為不存在），因此遞增所有槽位
+        """
+        self.manager.store.bump(range(self.manager.slots))
+
+    def stats(self):
+        return {'records': self.records.stats(), 'queries': self.queries.stats()}
+
+
+class DAOCache:
+    """
+    DAO讀緩存
+    各worker進程在內存中各自緩存，失效通過同一主機上共享的代計數器傳遞：
+    寫事務提交後遞增表與所寫記錄的代號，所有worker下次讀取時發現代號變化即重新查詢。
+    配置了只讀副本時，只緩存從主庫、或心跳晚於代號（已包含最近一次寫入）的副本讀到的數據，
+    調用方處於讀你所寫的窗口內時不使用緩存；條目另有 CACHE_TTL_SECONDS 的存活時間
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.entity_max_entries = 10000
+        self.query_max_entries = 1000
+        self.ttl = 60
+        self.slots = 4096
+        self.store = MemoryGenerationStore(self.slots)
+        self.replicas = None
+        self._tables = {}
+        self._listening = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app, replicas=None):
+        """
+        :param replicas: 只讀副本路由（utils.replication.ReplicaRouter），
+                         用於判斷讀到的數據是否足夠新；None表示所有讀取都走主庫
+        """
+        self.enabled = app.config['CACHE_ENABLED']
+        self.replicas = replicas
+        self.entity_max_entries = app.config['CACHE_ENTITY_MAX_ENTRIES']
+        self.query_max_entries = app.config['CACHE_QUERY_MAX_ENTRIES']
+        self.ttl = app.config['CACHE_TTL_SECONDS']
+        self.slots = app.config['CACHE_GENERATION_SLOTS']
+        store = app.config['CACHE_GENERATION_STORE']
+        if store == 'mmap':
+            self.store = MmapGenerationStore(app.config['CACHE_GENERATION_PATH'], self.slots)
+        elif store == 'memory':
+            self.store = MemoryGenerationStore(self.slots)
+        else:
+            raise ValueError(f"不支持的緩存代號存儲: {store}")
+        # 配置變化後丟棄已有條目
+        for cache in self._tables.values():
+            cache.records = LRUCache(self.entity_max_entries)
+            cache.queries = LRUCache(self.query_max_entries)
+
+        if not self._listening:
+            # 監聽會話基類，同時覆蓋同步應用與 AsyncSession 內部的同步會話
+            event.listen(Session, 'after_commit', self._after_commit)
+            event.listen(Session, 'after_rollback', self._after_rollback)
+            self._listening = True
+
+    def table(self, name):
+        """表的緩存，在模塊導入時創建，大小等配置在 init_app 時生效"""
+        if name not in self._tables:
+            self._tables[name] = TableCache(self, name)
+        return self._tables[name]
+
+    def pinned(self):
+        """當前調用方的讀取固定走主庫（剛寫入過）"""
+        return self.replicas is not None and self.replicas.pinned()
+
+    def fresh(self, generation):
+        """本請求讀到的數據是否已包含代號對應的寫入，可以按該代號緩存"""
+        if self.replicas is None:
+            return True
+        return self.replicas.fresh_as_of() * 1_000_000 >= generation
+
+    def slot(self, key):
+        return zlib.crc32(key.encode('utf-8')) % self.slots
+
+    def stats(self):
+        return {name: cache.stats() for name, cache in self._tables.items()}
+
+    def _after_commit(self, session):
+        written = session.info.pop(INVALIDATE_KEY, None)
+        if written:
+            slots = set()
+            for name, ids in written.items():
+                slots.add(self.slot(name))
+                slots.update(self.slot(f'{name}:{id}') for id in ids)
+            self.store.bump(sorted(slots))
+
+    def _after_rollback(self, session):
+        session.info.pop(INVALIDATE_KEY, None)
+
+
+# 全局單例，在app.py中通過 init_app 加載配置
+dao_cache = DAOCache()
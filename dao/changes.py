@@ -0,0 +1,126 @@
+# crm_project/dao/changes.py
+
+import datetime
+import importlib
+
+from sqlalchemy import func, inspect, insert, select, update, delete, text
+
+from extensions import db
+from .base_dao import BaseDAO
+from models.changes import ChangeSequence, OpportunityTombstone
+
+class TombstoneDAO(BaseDAO):
+    """已刪除銷售機會的墓碑"""
+
+    sortable_fields = ('change_seq', 'id')
+
+    def __init__(self):
+        super().__init__(OpportunityTombstone)
+
+class ChangeTracker:
+    """
+    為業務表維護增量同步所需的變更序列號與墓碑，由DAO的寫入鉤子在調用方的事務內調用
+    - 每次創建或更新後為這批記錄分配一個新的序列號，寫入 change_seq 列；
+    - 每次刪除後為這批記錄寫入帶新序列號的墓碑
+    同一批記錄共用一個序列號，客戶端按 (change_seq, id) 分頁讀取
+    """
+
+    def __init__(self, model, tombstone_model):
+        self.model = model
+        self.tombstone_model = tombstone_model
+
+    def next_seq(self, session=None):
+        """
+        在當前事務中遞增並返回該表的變更序列號
+        以一條 INSERT ... ON CONFLICT DO UPDATE ... RETURNING 完成：計數器行尚不存在時，
+        併發的首次寫入不會因主鍵衝突失敗；行的鎖持有到事務結束，併發的寫事務按提交順序依次取得更大的序列號
+        """
+        session = session or db.session
+        table = ChangeSequence.__table__
+        # 按需導入方言模塊，未使用PostgreSQL時不加載其方言包
+        dialect = 'postgresql' if session.get_bind().dialect.name == 'postgresql' else 'sqlite'
+        stmt = importlib.import_module(f'sqlalchemy.dialects.{dialect}').insert(table)
+        stmt = stmt.values(name=self.model.__tablename__, value=1).on_conflict_do_update(
+            index_elements=[table.c.name],
+            set_={'value': table.c.value + 1},
+        ).returning(table.c.value)
+        return session.execute(stmt).scalar_one()
+
+    def touch(self, ids, session=None, chunk_size=500):
+        """為創建或更新的記錄分配新的序列號"""
+        if not ids:
+            return
+        session = session or db.session
+        table = self.model.__table__
+        seq = self.next_seq(session)
+        ids = sorted(ids)
+        for start in range(0, len(ids), chunk_size):
+            # 顯式保留 updated_at 與 version，不觸發它們的 onupdate（這不是業務字段的更新）
+            stmt = (
+                update(table)
+                .where(table.c.id.in_(ids[start:start + chunk_size]))
+                .values(change_seq=seq, updated_at=table.c.updated_at, version=table.c.version)
+            )
+            session.execute(stmt)
+
+    def tombstone(self, ids, session=None, chunk_size=500):
+        """
+        為刪除的記錄寫入墓碑；主鍵被復用後再次刪除時覆蓋舊墓碑
+        主鍵被復用時舊墓碑的序列號小於新記錄，客戶端按序列號依次應用即可
+        """
+        if not ids:
+            return
+        session = session or db.session
+        table = self.tombstone_model.__table__
+        seq = self.next_seq(session)
+        now = datetime.datetime.utcnow()
+        ids = sorted(ids)
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size]
+            session.execute(delete(table).where(table.c.id.in_(chunk)))
+            session.execute(insert(table), [{'id': id, 'change_seq': seq, 'deleted_at': now} for id in chunk])
+
+    # 升級已有數據庫時補建的列及其默認值：已有的行版本號從1開始，更新時間取創建時間
+    UPGRADE_COLUMNS = (
+        ('version', 'NOT NULL DEFAULT 1'),
+        ('updated_at', ''),
+        ('change_seq', ''),
+    )
+
+    def backfill(self):
+        """
+        為沒有序列號的記錄分配序列號（升級前已有的數據、推遲維護的批量導入），
+        已有數據庫缺少 version、updated_at、change_seq 列或相關表時先創建
+        :return: 分配了序列號的行數
+        """
+        connection = db.session.connection()
+        table = self.model.__table__
+        self._add_columns(connection, table)
+        for index in table.indexes:
+            if 'change_seq' in index.columns:
+                index.create(connection, checkfirst=True)
+        ChangeSequence.__table__.create(connection, checkfirst=True)
+        self.tombstone_model.__table__.create(connection, checkfirst=True)
+
+        count = db.session.scalar(select(func.count()).select_from(table).where(table.c.change_seq.is_(None)))
+        if count:
+            seq = self.next_seq()
+            stmt = (
+                update(table)
+                .where(table.c.change_seq.is_(None))
+                .values(change_seq=seq, updated_at=table.c.updated_at, version=table.c.version)
+            )
+            db.session.execute(stmt)
+        db.session.commit()
+        return count
+
+    def _add_columns(self, connection, table):
+        """以 ALTER TABLE ... ADD COLUMN 補建缺少的列，已存在的列不變，可重複執行"""
+        columns = {column['name'] for column in inspect(connection).get_columns(table.name)}
+        for name, options in self.UPGRADE_COLUMNS:
+            if name in columns:
+                continue
+            column_type = table.c[name].type.compile(dialect=connection.dialect)
+            connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {name} {column_type} {options}'.rstrip()))
+            if name == 'updated_at':
+                connection.execute(update(table).values(updated_at=table.c.created_at, version=table.c.version))
@@ -0,0 +1,148 @@
+# crm_project/dao/fulltext.py
+
+import re
+
+from sqlalchemy import DDL, Column, Float, Integer, MetaData, Table, Text, bindparam, event, or_, text, select, insert, delete, literal_column
+
+from extensions import db
+
+# 中日韓字符範圍：每個字符作為獨立詞元建立索引
+CJK_PATTERN = re.compile(r'([\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff])')
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def segment(value):
+    """
+    在CJK字符兩側插入空格，使unicode61分詞器把每個漢字視為一個詞元；
+    查詢時以相鄰短語匹配，即可對中文名稱做任意子串檢索
+    """
+    return CJK_PATTERN.sub(r' \1 ', value or '')
+
+
+def build_match_query(value):
+    """
+    將用戶輸入轉換為FTS5查詢表達式
+    以空白分隔的每個關鍵詞作為一個前綴短語，多個關鍵詞之間為AND關係，
+    例如 "王小明 acme" -> "王 小 明"* "acme"*
+    """
+    phrases = []
+    for term in (value or '').split():
+        tokens = TOKEN_PATTERN.findall(segment(term))
+        if tokens:
+            phrases.append('"' + ' '.join(tokens) + '"*')
+    if not phrases:
+        raise ValueError("搜索關鍵詞無效")
+    return ' '.join(phrases)
+
+
+class FullTextIndex:
+    """
+    基於SQLite FTS5影子表的全文索引
+    影子表以業務表主鍵作為rowid，保存分詞後的文本，由DAO在同一事務內同步維護；
+    非SQLite數據庫退化為LIKE匹配
+    """
+
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = tuple(fields)
+        self.table = Table(
+            f'{model.__tablename__}_fts',
+            MetaData(),
+            Column('rowid', Integer, primary_key=True),
+            *[Column(field, Text) for field in self.fields],
+            # FTS5的隱藏列，值為bm25相關度，越小越相關
+            Column('rank', Float),
+        )
+        event.listen(
+            model.__table__, 'after_create',
+            DDL(self._create_sql()).execute_if(dialect='sqlite'),
+        )
+
+    def _create_sql(self):
+        return (
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table.name} "
+            f"USING fts5({', '.join(self.fields)}, tokenize='unicode61 remove_diacritics 2')"
+        )
+
+    @property
+    def enabled(self):
+        return self.enabled_for(db.session)
+
+    @staticmethod
+    def enabled_for(session):
+        """該會話連接的數據庫是否支持FTS5"""
+        return session.get_bind().dialect.name == 'sqlite'
+
+    @property
+    def rank_column(self):
+        return self.table.c.rank
+
+    @property
+    def rowid_column(self):
+        return self.table.c.rowid
+
+    def bind_value(self, value, enabled=None):
+        """全文匹配條件的綁定值：FTS5查詢表達式，或退化為LIKE匹配時的 %value%"""
+        if not (self.enabled if enabled is None else enabled):
+            return f"%{value}%"
+        return build_match_query(value)
+
+    def apply(self, query, value, enabled=None, param='fulltext'):
+        """
+        為查詢加上全文匹配條件，適用於ORM查詢和select()語句
+        :param enabled: 是否使用全文索引，None表示根據當前會話的數據庫判斷
+        :param param: 匹配值的綁定參數名，以新的值重複執行語句時使用
+        """
+        columns = self.model.__table__.c
+        enabled = self.enabled if enabled is None else enabled
+        bound = bindparam(param, self.bind_value(value, enabled))
+        if not enabled:
+            return query.filter(or_(*[columns[field].like(bound) for field in self.fields]))
+        match = literal_column(self.table.name).op('MATCH')(bound)
+        return query.join(self.table, self.table.c.rowid == columns.id).filter(match)
+
+    def index(self, ids, chunk_size=500, session=None):
+        """
+        重建指定記錄的索引條目，在調用方的事務內執行
+        :param session: 執行語句的會話，默認為 db.session
+        """
+        session = session or db.session
+        if not self.enabled_for(session):
+            return
+        ids = sorted(ids)
+        columns = [self.model.id] + [getattr(self.model, field) for field in self.fields]
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size]
+            rows = session.execute(select(*columns).where(self.model.id.in_(chunk))).all()
+            session.execute(delete(self.table).where(self.table.c.rowid.in_(chunk)))
+            if rows:
+                session.execute(insert(self.table), [self._entry(row) for row in rows])
+
+    def remove(self, ids, chunk_size=500, session=None):
+        """刪除指定記錄的索引條目"""
+        session = session or db.session
+        if not self.enabled_for(session):
+            return
+        ids = sorted(ids)
+        for start in range(0, len(ids), chunk_size):
+            session.execute(delete(self.table).where(self.table.c.rowid.in_(ids[start:start + chunk_size])))
+
+    def rebuild(self, chunk_size=5000):
+        """根據業務表全量重建索引（用於已有數據庫或修復不一致），返回索引的行數"""
+        if not self.enabled:
+            return 0
+        db.session.execute(text(self._create_sql()))
+        db.session.execute(delete(self.table))
+        columns = [self.model.id] + [getattr(self.model, field) for field in self.fields]
+        count = 0
+        for rows in db.session.execute(select(*columns).execution_options(yield_per=chunk_size)).partitions():
+            db.session.execute(insert(self.table), [self._entry(row) for row in rows])
+            count += len(rows)
+        db.session.commit()
+        return count
+
+    def _entry(self, row):
+        entry = {'rowid': row[0]}
+        for field, value in zip(self.fields, row[1:]):
+            entry[field] = segment(value)
+        return entry
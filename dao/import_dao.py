@@ -0,0 +1,19 @@
+# crm_project/dao/import_dao.py
+
+from extensions import db
+from .base_dao import BaseDAO
+from models.import_checkpoint import ImportCheckpoint
+
+class ImportCheckpointDAO(BaseDAO):
+    """批量導入檢查點的數據訪問對象，寫入不單獨提交，與導入的數據處於同一事務"""
+
+    def __init__(self):
+        super().__init__(ImportCheckpoint)
+
+    def get(self, source):
+        # 已有數據庫升級後首次導入時創建檢查點表
+        self.model.__table__.create(db.session.connection(), checkfirst=True)
+        return db.session.get(self.model, source)
+
+    def add(self, checkpoint):
+        db.session.add(checkpoint)
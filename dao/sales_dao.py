@@ -1,14 +1,202 @@
-_# crm_project/dao/sales_dao.py_
+# crm_project/dao/sales_dao.py
 
+import heapq
+
+from sqlalchemy import select
+
+from extensions import db
 from .base_dao import BaseDAO
-from models.sales import SalesOpportunity
-from patterns.query_strategy import QueryStrategy, SimpleQueryStrategy, AmountRangeQueryStrategy
+from .cache import LRUCache, dao_cache
+from .changes import ChangeTracker, TombstoneDAO
+from .fulltext import FullTextIndex
+from .summary_dao import SummaryDAO
+from models.changes import OpportunityTombstone
+from models.sales import OpportunityRecord, SalesOpportunity
+from utils.pagination import encode_cursor
+from utils.profiling import request_profiler
+from patterns.query_strategy import (
+    SimpleQueryStrategy, InQueryStrategy, AmountRangeQueryStrategy, DateRangeQueryStrategy, PrefixQueryStrategy,
+    FullTextQueryStrategy, OrderingQueryStrategy,
+)
+
+# 名稱與客戶名稱的全文索引，影子表隨業務表一同創建
+sales_fulltext = FullTextIndex(SalesOpportunity, ('name', 'customer_name'))
+
+# 增量同步的變更序列號與墓碑
+sales_changes = ChangeTracker(SalesOpportunity, OpportunityTombstone)
+
+# 按ID的記錄緩存與搜索分頁結果緩存，見 dao.cache
+sales_cache = dao_cache.table(SalesOpportunity.__tablename__)
+
+# 搜索參數對應的查詢策略，模塊導入時構建一次，所有DAO共用；按此順序組合過濾條件，
+# 同一組參數無論傳入順序如何都生成相同的SQL。全文檢索策略依賴DAO連接的數據庫，由DAO初始化時加入
+SEARCH_STRATEGIES = {
+    'name': SimpleQueryStrategy('name'),
+    'name_prefix': PrefixQueryStrategy('name'),
+    'customer_name': SimpleQueryStrategy('customer_name'),
+    'customer_prefix': PrefixQueryStrategy('customer_name', 'customer_prefix'),
+    'stage': SimpleQueryStrategy('stage'),
+    'stage_in': InQueryStrategy('stage'),
+    'min_amount': AmountRangeQueryStrategy('min_amount'),
+    'max_amount': AmountRangeQueryStrategy('max_amount'),
+    'created_from': DateRangeQueryStrategy('created_at', 'from', 'created_from'),
+    'created_to': DateRangeQueryStrategy('created_at', 'to', 'created_to'),
+}
+
+class SalesQueryMixin:
+    """SalesDAO 與 AsyncSalesDAO 共用的搜索查詢構建邏輯"""
+
+    # 僅開放有 (字段, id) 索引支撐的排序字段
+    sortable_fields = ('id', 'amount', 'created_at', 'change_seq')
+
+    # 影響銷售漏斗匯總的字段
+    summary_fields = {'stage', 'amount', 'created_at'}
+
+    # 按過濾條件形狀緩存的搜索語句數上限
+    statement_cache_size = 512
+
+    def _init_search(self):
+        """構建本DAO的查詢策略註冊表與語句緩存，在DAO初始化時調用一次"""
+        self.strategies = dict(
+            SEARCH_STRATEGIES, q=FullTextQueryStrategy(self.fulltext, lambda: self.fulltext_enabled)
+        )
+        self.ordering = OrderingQueryStrategy(self.sortable_fields)
+        self.statements = LRUCache(self.statement_cache_size)
+
+    @property
+    def fulltext_enabled(self):
+        """當前數據庫是否支持全文索引"""
+        return self.fulltext.enabled
+
+    def search_computed(self, params):
+        """搜索時額外可排序的計算列"""
+        computed = {}
+        if params.get('q') and self.fulltext_enabled:
+            # 全文檢索時可按相關度排序（並據此翻頁）；按id排序時改用影子表的rowid，
+            # FTS5按rowid順序返回匹配結果，無需先取出全部匹配行再排序
+            computed['rank'] = self.fulltext.rank_column
+            computed['id'] = self.fulltext.rowid_column
+        return computed
+
+    def default_sort(self, params):
+        """
+        未指定排序時的默認排序
+        全文檢索按相關度排序；
+        金額範圍查詢按金額排序，使範圍條件與排序共用 (stage, amount)/(amount, id) 索引，
+        避免數據庫改為按主鍵順序掃描全表；創建日期範圍查詢同理按創建時間排序
+        """
+        if params.get('q') and self.fulltext_enabled:
+            return 'rank'
+        if params.get('min_amount') is not None or params.get('max_amount') is not None:
+            return 'amount'
+        if params.get('created_from') is not None or params.get('created_to') is not None:
+            return 'created_at'
+        return None
+
+    def _search_base(self, columns=False):
+        """
+        搜索的基礎查詢
+        :param columns: 為True時返回只按列查詢的Core select()語句，結果不構建ORM對象
+        """
+        return select(self.model.__table__) if columns else self.model.query
+
+    def _active_strategies(self, params):
+        """按註冊順序返回本次查詢生效的 [(策略, 值)]"""
+        return [
+            (strategy, params[key]) for key, strategy in self.strategies.items()
+            if params.get(key) is not None
+        ]
+
+    def _build_search_query(self, params, columns=False, ordered=False):
+        """
+        根據查詢參數組合各個查詢策略，columns 同 _search_base
+        :param ordered: 是否按 params['sort'] 排序；分頁查詢由 page_query 排序，不使用
+        """
+        query = self._search_base(columns)
+        # Core語句的過濾條件使用表的列，避免ORM屬性把語句重新變為ORM語句
+        target = self.model.__table__.c if columns else self.model
+
+        for strategy, value in self._active_strategies(params):
+            query = strategy.execute(query, target, value)
+        if ordered and params.get('sort'):
+            query = self.ordering.execute(query, target, params['sort'])
+
+        return query
+
+    def _statement_key(self, kind, active, *parts):
+        """語句緩存鍵：語句種類、生效的策略及其值的形狀，以及影響SQL結構的其他部分"""
+        return (kind, tuple((strategy.param, strategy.shape(value)) for strategy, value in active), *parts)
+
+    @staticmethod
+    def _strategy_params(active):
+        params = {}
+        for strategy, value in active:
+            params.update(strategy.params(value))
+        return params
+
+    def search_page_statement(self, params, limit, after=None, sort=None, fields=None):
+        """
+        構造按列查詢的搜索分頁語句
+        語句只取決於過濾條件的形狀、排序、是否帶游標與字段，按這些緩存：
+        同一形狀的後續請求直接復用已構造（並已計算緩存鍵）的語句，只換用新的綁定參數，
+        省去每次請求構造語句與生成緩存鍵的開銷
+        :return: (語句, 綁定參數, PagePlan)
+        """
+        active = self._active_strategies(params)
+        sort = sort or self.default_sort(params)
+        key = self._statement_key('page', active, sort, bool(after), tuple(fields))
+        hit, cached = self.statements.get(key)
+        if not hit:
+            query, plan = self.page_statement(
+                self._build_search_query(params, columns=True), limit, after, sort,
+                self.search_computed(params), fields
+            )
+            cached = (self._read(query), plan)
+            self.statements.put(key, cached)
+        statement, plan = cached
+        return statement, {**self._strategy_params(active), **self.page_params(limit, after, plan.spec)}, plan
 
-class SalesDAO(BaseDAO):
+    def search_rows_statement(self, params, fields):
+        """構造按列查詢、不分頁的搜索語句，按形狀緩存，返回 (語句, 綁定參數, 字段名列表)"""
+        active = self._active_strategies(params)
+        sort = params.get('sort')
+        names = list(fields)
+        key = self._statement_key('rows', active, self.ordering.shape(sort) if sort else None, tuple(names))
+        hit, statement = self.statements.get(key)
+        if not hit:
+            query = self._build_search_query(params, columns=True, ordered=True)
+            statement = self._read(self._project(query, [self._column(name) for name in names]))
+            self.statements.put(key, statement)
+        return statement, self._strategy_params(active), names
+
+class SalesDAO(SalesQueryMixin, BaseDAO):
     """銷售機會數據訪問對象"""
 
     def __init__(self):
         super().__init__(SalesOpportunity)
+        self.fulltext = sales_fulltext
+        self.summary = SummaryDAO()
+        self.changes = sales_changes
+        self.tombstones = TombstoneDAO()
+        self.cache = sales_cache
+        self._init_search()
+
+    def _cacheable(self):
+        """本事務已有未提交的寫入時不讀寫緩存，避免緩存未提交（可能回滾）的數據"""
+        return self.cache.enabled and not self.cache.pending(db.session)
+
+    def get_fields_by_id(self, id, fields):
+        """只查詢指定字段，返回列值字典；記錄不存在時返回None。命中緩存時不查詢數據庫"""
+        if not self._cacheable() or not set(fields) <= set(self.model.FIELDS):
+            return super().get_fields_by_id(id, fields)
+
+        def load():
+            values = super(SalesDAO, self).get_fields_by_id(id, self.model.FIELDS)
+            return OpportunityRecord(values) if values else None
+
+        # 緩存完整記錄，不同字段組合的讀取共用同一條目
+        record = self.cache.get_record(id, load)
+        return record.to_fields(self._projection_names(fields)) if record else None
 
     def search(self, params):
         """
@@ -16,19 +204,111 @@ class SalesDAO(BaseDAO):
         :param params: 查詢參數字典
         :return: 查詢結果
         """
-        query = self.model.query
-        
-        strategies = {
-            'name': SimpleQueryStrategy('name'),
-            'customer_name': SimpleQueryStrategy('customer_name'),
-            'stage': SimpleQueryStrategy('stage'),
-            'min_amount': AmountRangeQueryStrategy('min_amount'),
-            'max_amount': AmountRangeQueryStrategy('max_amount')
-        }
-
-        for key, value in params.items():
-            if key in strategies and value is not None:
-                strategy = strategies[key]
-                query = strategy.execute(query, self.model, value)
-
-        return query.all()
+        with request_profiler.span('hydrate'):
+            return self._read(self._build_search_query(params, ordered=True)).all()
+
+    def search_rows(self, params, fields):
+        """多條件查詢，只返回指定字段的列值字典列表，不創建ORM對象"""
+        statement, values, names = self.search_rows_statement(params, fields)
+        with request_profiler.span('hydrate'):
+            return [dict(zip(names, row)) for row in self._all(statement, values)]
+
+    def search_page(self, params, limit, after=None, sort=None, fields=None):
+        """
+        多條件查詢並進行游標分頁
+        :param params: 查詢參數字典
+        :param limit: 每頁條數
+        :param after: 上一頁返回的游標
+        :param sort: 排序參數，例如 "amount,-created_at"
+        :param fields: 只查詢的字段列表，為None時返回完整的ORM對象；指定時以Core語句查詢並返回列值字典
+        :return: (查詢結果, 下一頁游標)
+        """
+        sort = sort or self.default_sort(params)
+        if not fields:
+            # ORM查詢與對象屬於會話，不緩存
+            return self.paginate(self._build_search_query(params), limit, after, sort, self.search_computed(params))
+
+        def query():
+            statement, values, plan = self.search_page_statement(params, limit, after, sort, fields)
+            with request_profiler.span('hydrate'):
+                rows = self._all(statement, values)
+            return self.page_result(rows, limit, plan)
+
+        if not self._cacheable():
+            return query()
+
+        def load():
+            rows, next_cursor = query()
+            # 以元組保存，命中時重建字典，調用方修改返回的字典不影響緩存
+            names = tuple(rows[0]) if rows else ()
+            return names, [tuple(row.values()) for row in rows], next_cursor
+
+        key = ('page', self._cache_params(params), limit, after, sort, tuple(fields))
+        names, values, next_cursor = self.cache.get_query(key, load)
+        return [dict(zip(names, row)) for row in values], next_cursor
+
+    @staticmethod
+    def _cache_params(params):
+        """規範化查詢參數作為緩存鍵：忽略值為None的參數，與參數順序無關，列表值轉換為元組"""
+        return tuple(sorted(
+            (key, tuple(value) if isinstance(value, (list, set, frozenset)) else value)
+            for key, value in params.items() if value is not None
+        ))
+
+    def iter_rows(self, params, fields, chunk_size=1000):
+        """
+        以服務器端游標分批流式讀取查詢結果的指定字段，內存佔用與結果集大小無關
+        按列查詢，不創建ORM對象；語句與 search_rows 共用形狀緩存
+        :param params: 查詢參數字典
+        :param fields: 查詢的字段列表
+        :param chunk_size: 每批從數據庫讀取的行數
+        :return: 按id排序、與fields順序對應的行元組迭代器
+        """
+        statement, values, _ = self.search_rows_statement(dict(params, sort='id'), fields)
+        # 以執行選項傳入，不複製緩存的語句
+        return db.session.execute(statement, values, execution_options={'yield_per': chunk_size})
+
+    def changes_page(self, since, limit, after=None, fields=None):
+        """
+        增量同步：按 (change_seq, id) 順序分頁讀取序列號大於since的記錄與墓碑
+        兩張表各自沿 (change_seq, id) 索引範圍掃描 limit+1 行後歸併，讀取量只與變更數有關
+        :param fields: 記錄查詢的字段，None表示全部字段；始終包含 id 與 change_seq
+        :return: ([(是否已刪除, 列值字典)], 下一頁游標)
+        """
+        sources = (
+            (False, self, self.model.__table__, fields or self.model.FIELDS),
+            (True, self.tombstones, self.tombstones.model.__table__, OpportunityTombstone.FIELDS),
+        )
+        pages = []
+        for deleted, dao, table, names in sources:
+            query = select(table).where(table.c.change_seq > since)
+            query, plan = dao.page_statement(query, limit, after, 'change_seq', fields=names)
+            with request_profiler.span('hydrate'):
+                pages.append([(deleted, dict(zip(plan.names, row))) for row in dao._all(query)])
+
+        merged = list(heapq.merge(*pages, key=lambda item: (item[1]['change_seq'], item[1]['id'])))
+        next_cursor = None
+        if len(merged) > limit:
+            merged = merged[:limit]
+            last = merged[-1][1]
+            next_cursor = encode_cursor(plan.spec, [last['change_seq'], last['id']])
+        return merged, next_cursor
+
+    def _before_change(self, ids, fields=None):
+        """減去舊值在匯總表中的貢獻"""
+        if fields is None or fields & self.summary_fields:
+            self.summary.subtract(ids)
+
+    def _on_saved(self, ids, fields=None):
+        """同步全文索引與匯總表，並為這批記錄分配新的變更序列號"""
+        if fields is None or fields & set(self.fulltext.fields):
+            self.fulltext.index(ids)
+        if fields is None or fields & self.summary_fields:
+            self.summary.add(ids)
+        self.changes.touch(ids)
+        self.cache.invalidate(ids, db.session)
+
+    def _on_deleted(self, ids):
+        self.fulltext.remove(ids)
+        self.changes.tombstone(ids)
+        self.cache.invalidate(ids, db.session)
@@ -0,0 +1,122 @@
+# crm_project/dao/summary_dao.py
+
+from collections import defaultdict
+
+import importlib
+
+from sqlalchemy import func, select, delete, insert
+
+from extensions import db
+from .base_dao import BaseDAO
+from models.sales import SalesOpportunity
+from models.summary import SalesSummary
+from utils.profiling import request_profiler
+
+class SummaryDAO(BaseDAO):
+    """
+    銷售漏斗匯總數據訪問對象
+    匯總表隨銷售機會的寫入在同一事務內增量維護：更新/刪除前減去舊值的貢獻，
+    寫入後加上新值的貢獻，讀取時只需掃描 O(階段數) / O(天數) 行
+    """
+
+    # 重算校驗時允許的金額誤差（浮點累加）
+    amount_tolerance = 0.01
+
+    def __init__(self):
+        super().__init__(SalesSummary)
+
+    def add(self, ids, session=None):
+        """
+        加上指定銷售機會的貢獻
+        :param session: 執行語句的會話，默認為 db.session
+        """
+        self._apply(self._contributions(ids, session), 1, session)
+
+    def subtract(self, ids, session=None):
+        """減去指定銷售機會的貢獻"""
+        self._apply(self._contributions(ids, session), -1, session)
+
+    def get_dimension(self, dimension, start=None, end=None):
+        """讀取某一維度的匯總行，可按鍵範圍過濾（用於日期）"""
+        query = self.model.query.filter(self.model.dimension == dimension, self.model.count > 0)
+        if start is not None:
+            query = query.filter(self.model.key >= start)
+        if end is not None:
+            query = query.filter(self.model.key <= end)
+        with request_profiler.span('hydrate'):
+            return self._read(query).order_by(self.model.key).all()
+
+    def rebuild(self, check=False):
+        """
+        從銷售機會表全量重算匯總並與匯總表比較
+        :param check: 為True時只檢查漂移，不修改匯總表
+        :return: 漂移列表 [(維度, 鍵, 匯總表中的(數量, 金額), 重算的(數量, 金額))]
+        """
+        self.model.__table__.create(db.session.connection(), checkfirst=True)
+        expected = self._contributions()
+        actual = {(row.dimension, row.key): (row.count, row.amount_sum) for row in self.model.query}
+
+        drift = []
+        for key in sorted(set(expected) | set(actual)):
+            want = tuple(expected.get(key, (0, 0.0)))
+            have = actual.get(key, (0, 0.0))
+            if want[0] != have[0] or abs(want[1] - have[1]) > self.amount_tolerance:
+                drift.append((*key, have, want))
+
+        if not check:
+            db.session.execute(delete(self.model.__table__))
+            rows = [
+                {'dimension': dimension, 'key': key, 'count': count, 'amount_sum': amount}
+                for (dimension, key), (count, amount) in expected.items()
+            ]
+            if rows:
+                db.session.execute(insert(self.model.__table__), rows)
+            db.session.commit()
+        return drift
+
+    def _contributions(self, ids=None, session=None):
+        """
+        統計銷售機會在各維度上的數量與金額
+        :param ids: 只統計這些主鍵；為None時統計全表
+        :return: {(維度, 鍵): [數量, 金額]}
+        """
+        totals = defaultdict(lambda: [0, 0.0])
+        day = func.date(SalesOpportunity.created_at)
+        stmt = (
+            select(SalesOpportunity.stage, day, func.count(), func.sum(SalesOpportunity.amount))
+            .group_by(SalesOpportunity.stage, day)
+        )
+        if ids is None:
+            statements = [stmt]
+        else:
+            statements = [stmt.where(SalesOpportunity.id.in_(chunk)) for chunk in self._chunks(sorted(ids))]
+
+        for statement in statements:
+            for stage, day_key, count, amount in (session or db.session).execute(statement):
+                for key in ((SalesSummary.DIMENSION_STAGE, stage or ''),
+                            (SalesSummary.DIMENSION_DAY, str(day_key) if day_key else '')):
+                    totals[key][0] += count
+                    totals[key][1] += amount or 0.0
+        return totals
+
+    def _apply(self, deltas, sign, session=None):
+        """以 INSERT ... ON CONFLICT DO UPDATE 累加增量"""
+        session = session or db.session
+        rows = [
+            {'dimension': dimension, 'key': key, 'count': sign * count, 'amount_sum': sign * amount}
+            for (dimension, key), (count, amount) in deltas.items()
+        ]
+        if not rows:
+            return
+        table = self.model.__table__
+        # 按需導入方言模塊，未使用PostgreSQL時不加載其方言包
+        name = 'postgresql' if session.get_bind().dialect.name == 'postgresql' else 'sqlite'
+        stmt = importlib.import_module(f'sqlalchemy.dialects.{name}').insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.dimension, table.c.key],
+            set_={
+                'count': table.c.count + stmt.excluded.count,
+                'amount_sum': table.c.amount_sum + stmt.excluded.amount_sum,
+            },
+        )
+        session.execute(stmt, rows)
@@ -0,0 +1,14 @@
+# crm_project/extensions.py
+
+"""
+Flask擴展實例，在 create_app 中綁定應用
+模型、DAO等模塊從這裡導入 db；導入它們不會導入 app.py，也不會創建應用
+"""
+
+from flask_jwt_extended import JWTManager
+from flask_sqlalchemy import SQLAlchemy
+
+from utils.replication import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+jwt = JWTManager()
@@ -0,0 +1,30 @@
+# crm_project/models/audit.py
+
+from extensions import db
+import datetime
+
+class AuditLog(db.Model):
+    """
+    變更歷史：每條記錄對應一個實體在一次提交中的創建、更新或刪除
+    由 utils.audit.AuditTrail 在後台線程中批量寫入
+    """
+    __tablename__ = 'audit_log'
+    __table_args__ = (
+        # 按實體查詢變更歷史並按id倒序分頁
+        db.Index('ix_audit_log_entity_id', 'entity_type', 'entity_id', 'id'),
+    )
+
+    ACTIONS = ('create', 'update', 'delete')
+
+    id = db.Column(db.Integer, primary_key=True)
+    entity_type = db.Column(db.String(64), nullable=False) # 實體的表名
+    entity_id = db.Column(db.Integer, nullable=False)
+    action = db.Column(db.String(16), nullable=False)
+    changes = db.Column(db.JSON, nullable=False) # {字段: [舊值, 新值]}
+    actor = db.Column(db.String(128)) # 執行變更的用戶（JWT身份），後台任務等為空
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow) # 事務提交時間
+
+    FIELDS = ('id', 'action', 'changes', 'actor', 'changed_at')
+
+    def __repr__(self):
+        return f'<AuditLog {self.entity_type}:{self.entity_id} {self.action}>'
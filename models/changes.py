@@ -0,0 +1,35 @@
+# crm_project/models/changes.py
+
+from extensions import db
+import datetime
+
+class ChangeSequence(db.Model):
+    """
+    變更序列號計數器，每種實體一行
+    寫事務遞增計數器後持有該行的鎖直到提交，序列號的分配順序與提交順序一致，
+    增量同步時不會跳過序列號較小但提交較晚的變更
+    """
+    __tablename__ = 'change_sequences'
+
+    name = db.Column(db.String(64), primary_key=True) # 實體的表名
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ChangeSequence {self.name}={self.value}>'
+
+class OpportunityTombstone(db.Model):
+    """已刪除銷售機會的墓碑，供增量同步的客戶端刪除本地副本"""
+    __tablename__ = 'sales_opportunity_tombstones'
+    __table_args__ = (
+        # 增量同步按 (change_seq, id) 游標分頁
+        db.Index('ix_sales_opportunity_tombstones_change_seq_id', 'change_seq', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True) # 被刪除的銷售機會id
+    change_seq = db.Column(db.BigInteger, nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+
+    FIELDS = ('id', 'change_seq', 'deleted_at')
+
+    def __repr__(self):
+        return f'<OpportunityTombstone {self.id}@{self.change_seq}>'
@@ -0,0 +1,28 @@
+# crm_project/models/import_checkpoint.py
+
+from extensions import db
+import datetime
+
+class ImportCheckpoint(db.Model):
+    """
+    批量導入的進度檢查點
+    與每批導入的數據在同一事務中提交，中斷後從最後一個已提交的批次之後繼續，不會重複或遺漏記錄
+    """
+    __tablename__ = 'import_checkpoints'
+
+    source = db.Column(db.String(1024), primary_key=True) # 導入文件的絕對路徑
+    fingerprint = db.Column(db.String(64), nullable=False) # 文件大小與開頭內容的摘要，用於發現文件被替換
+    format = db.Column(db.String(16), nullable=False)
+    header = db.Column(db.Text) # CSV表頭（JSON數組）
+    offset = db.Column(db.BigInteger, nullable=False, default=0) # 最後一條已提交記錄之後的字節位置
+    records = db.Column(db.Integer, nullable=False, default=0) # 已處理的記錄數（含被拒絕的記錄）
+    imported = db.Column(db.Integer, nullable=False, default=0)
+    rejected = db.Column(db.Integer, nullable=False, default=0)
+    # 是否推遲了二級索引、全文索引與匯總表的維護（完成時統一重建）
+    deferred = db.Column(db.Boolean, nullable=False, default=False)
+    started_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+    completed_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<ImportCheckpoint {self.source} @{self.offset}>'
@@ -0,0 +1,16 @@
+# crm_project/models/replication.py
+
+from extensions import db
+
+class ReplicationHeartbeat(db.Model):
+    """
+    複製心跳：主庫上定時寫入當前時間，隨複製到達只讀副本，
+    副本中的時間即副本數據的新鮮度，用於估算複製延遲
+    """
+    __tablename__ = 'replication_heartbeat'
+
+    id = db.Column(db.Integer, primary_key=True)
+    updated_at = db.Column(db.Float, nullable=False) # Unix時間戳（秒）
+
+    def __repr__(self):
+        return f'<ReplicationHeartbeat {self.updated_at}>'
@@ -1,11 +1,24 @@
 # crm_project/models/sales.py
 
-from app import db
+from extensions import db
 import datetime
 
 class SalesOpportunity(db.Model):
     """營銷機會模型"""
     __tablename__ = 'sales_opportunities'
+    __table_args__ = (
+        # 支撐游標分頁的排序索引，id作為決勝字段
+        db.Index('ix_sales_opportunities_amount_id', 'amount', 'id'),
+        db.Index('ix_sales_opportunities_created_at_id', 'created_at', 'id'),
+        # 與 SalesDAO.search 實際產生的過濾組合對應的索引
+        # 可用 benchmarks/bench_search_plans.py 校驗每種組合的查詢計劃
+        db.Index('ix_sales_opportunities_stage_amount', 'stage', 'amount'),
+        db.Index('ix_sales_opportunities_stage_id', 'stage', 'id'),
+        db.Index('ix_sales_opportunities_customer_name_created_at', 'customer_name', 'created_at'),
+        db.Index('ix_sales_opportunities_name', 'name'),
+        # 增量同步按 (change_seq, id) 游標分頁
+        db.Index('ix_sales_opportunities_change_seq_id', 'change_seq', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(128), nullable=False)
@@ -13,10 +26,33 @@ class SalesOpportunity(db.Model):
     amount = db.Column(db.Float, nullable=False)
     stage = db.Column(db.String(64), default='初期') # 例如：初期, 跟進中, 談判中, 成交, 失敗
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+    # 行版本號，每次UPDATE（包括批量更新）都在SQL中原子地加一，用於生成ETag
+    version = db.Column(db.Integer, nullable=False, default=1, onupdate=db.literal_column('version') + 1)
+    # 最近一次創建或更新時分配的變更序列號，由 SalesDAO 在同一事務內寫入，見 dao.changes
+    change_seq = db.Column(db.BigInteger)
+
+    # 銷售階段，按漏斗順序排列
+    STAGES = ('初期', '跟進中', '談判中', '成交', '失敗')
+
+    # 記錄變更歷史的字段，見 utils.audit
+    AUDITED_FIELDS = ('name', 'customer_name', 'amount', 'stage')
+
+    # 對外輸出的字段，可通過 fields 參數選取子集
+    FIELDS = ('id', 'name', 'customer_name', 'amount', 'stage', 'created_at', 'updated_at', 'version', 'change_seq')
 
     def __repr__(self):
         return f'<SalesOpportunity {self.name}>'
 
+    @staticmethod
+    def fields_to_dict(values, fields):
+        """將按列查詢得到的值字典轉換為只含指定字段的可序列化字典"""
+        data = {}
+        for field in fields:
+            value = values[field]
+            data[field] = value.isoformat() if isinstance(value, datetime.datetime) else value
+        return data
+
     def to_dict(self):
         """將對象轉換為字典"""
         return {
@@ -25,5 +61,23 @@ class SalesOpportunity(db.Model):
             'customer_name': self.customer_name,
             'amount': self.amount,
             'stage': self.stage,
-            'created_at': self.created_at.isoformat()
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'version': self.version,
+            'change_seq': self.change_seq,
         }
+
+class OpportunityRecord:
+    """
+    DAO緩存中的銷售機會，只保存 FIELDS 中的列值
+    使用 __slots__，不帶實例字典，也不關聯會話，比ORM對象與列值字典佔用更少內存
+    """
+    __slots__ = SalesOpportunity.FIELDS
+
+    def __init__(self, values):
+        for field in self.__slots__:
+            setattr(self, field, values[field])
+
+    def to_fields(self, fields):
+        """返回指定字段的列值字典，每次調用都是新的字典，調用方可以修改"""
+        return {field: getattr(self, field) for field in fields}
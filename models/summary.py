@@ -0,0 +1,27 @@
+# crm_project/models/summary.py
+
+from extensions import db
+
+class SalesSummary(db.Model):
+    """銷售漏斗匯總模型，按維度（階段/創建日期）累計機會數量與金額，隨寫入增量維護"""
+    __tablename__ = 'sales_summary'
+
+    DIMENSION_STAGE = 'stage'
+    DIMENSION_DAY = 'day'
+
+    dimension = db.Column(db.String(16), primary_key=True)
+    key = db.Column(db.String(64), primary_key=True) # 階段名稱或 YYYY-MM-DD
+    count = db.Column(db.Integer, nullable=False, default=0)
+    amount_sum = db.Column(db.Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f'<SalesSummary {self.dimension}:{self.key}>'
+
+    def to_dict(self):
+        """將對象轉換為字典"""
+        return {
+            self.dimension: self.key,
+            'count': self.count,
+            'total_amount': self.amount_sum,
+            'avg_amount': self.amount_sum / self.count if self.count else 0.0,
+        }
@@ -1,6 +1,6 @@
-_# crm_project/models/user.py_
+# crm_project/models/user.py
 
-from app import db
+from extensions import db
 from werkzeug.security import generate_password_hash, check_password_hash
 
 class User(db.Model):
@@ -9,7 +9,7 @@ class User(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), unique=True, nullable=False)
-    password_hash = db.Column(db.String(128), nullable=False)
+    password_hash = db.Column(db.String(255), nullable=False) # 預留空間給scrypt等更長的哈希格式
 
     def __repr__(self):
         return f'<User {self.username}>'
@@ -1,37 +1,184 @@
-_# crm_project/patterns/query_strategy.py_
+# crm_project/patterns/query_strategy.py
 
+import datetime
 from abc import ABC, abstractmethod
 
+from sqlalchemy import bindparam
+
+from utils.pagination import parse_sort
+
 class QueryStrategy(ABC):
-    """查詢策略接口"""
+    """
+    查詢策略接口
+    查詢值以命名的綁定參數傳入：execute 構造的SQL只取決於參數名與 shape(value)，
+    值只影響 params(value) 返回的綁定參數，構造好的語句可按形狀緩存，換用新的參數重複執行
+    """
+
+    # 綁定參數名的前綴，避免與分頁游標等其他綁定參數重名
+    PARAM_PREFIX = 'search_'
+
+    def __init__(self, param):
+        self.param = self.PARAM_PREFIX + param
+
     @abstractmethod
     def execute(self, query, model, value):
         pass
 
+    def shape(self, value):
+        """值中影響SQL結構的部分，作為語句緩存鍵的一部分；SQL與值無關時為None"""
+        return None
+
+    def bind_value(self, value):
+        """查詢值轉換為綁定參數的值"""
+        return value
+
+    def params(self, value):
+        """執行緩存的語句時使用的綁定參數"""
+        return {self.param: self.bind_value(value)}
+
+    def bind(self, value):
+        """帶當前值的綁定參數"""
+        return bindparam(self.param, self.bind_value(value))
+
 class SimpleQueryStrategy(QueryStrategy):
     """簡單的完全匹配查詢策略"""
-    def __init__(self, field_name):
+    def __init__(self, field_name, param=None):
+        super().__init__(param or field_name)
+        self.field_name = field_name
+
+    def execute(self, query, model, value):
+        return query.filter(getattr(model, self.field_name) == self.bind(value))
+
+class InQueryStrategy(QueryStrategy):
+    """IN列表查詢策略，值為可迭代對象；以展開的綁定參數傳入，列表長度不同也共用同一條語句"""
+    def __init__(self, field_name, param=None):
+        super().__init__(param or f'{field_name}_in')
         self.field_name = field_name
 
+    def bind_value(self, value):
+        return list(value)
+
+    def bind(self, value):
+        return bindparam(self.param, self.bind_value(value), expanding=True)
+
     def execute(self, query, model, value):
-        return query.filter(getattr(model, self.field_name) == value)
+        return query.filter(getattr(model, self.field_name).in_(self.bind(value)))
 
 class AmountRangeQueryStrategy(QueryStrategy):
     """金額範圍查詢策略"""
     def __init__(self, boundary_type): # boundary_type可以是 'min_amount' 或 'max_amount'
+        super().__init__(boundary_type)
         self.boundary_type = boundary_type
 
     def execute(self, query, model, value):
         if self.boundary_type == 'min_amount':
-            return query.filter(model.amount >= value)
+            return query.filter(model.amount >= self.bind(value))
         elif self.boundary_type == 'max_amount':
-            return query.filter(model.amount <= value)
+            return query.filter(model.amount <= self.bind(value))
+        return query
+
+class DateRangeQueryStrategy(QueryStrategy):
+    """
+    日期範圍查詢策略，值為 YYYY-MM-DD 字符串或 date，上下限都包含當天
+    轉換為時間列上的半開區間 [當天0點, 次日0點)，可使用時間列的索引
+    """
+    def __init__(self, field_name, boundary_type, param=None): # boundary_type可以是 'from' 或 'to'
+        super().__init__(param or f'{field_name}_{boundary_type}')
+        self.field_name = field_name
+        self.boundary_type = boundary_type
+
+    def bind_value(self, value):
+        if isinstance(value, str):
+            try:
+                value = datetime.date.fromisoformat(value)
+            except ValueError:
+                raise ValueError(f"日期格式無效: {value}，應為YYYY-MM-DD")
+        if self.boundary_type == 'to':
+            value += datetime.timedelta(days=1)
+        return datetime.datetime.combine(value, datetime.time())
+
+    def execute(self, query, model, value):
+        column = getattr(model, self.field_name)
+        if self.boundary_type == 'from':
+            return query.filter(column >= self.bind(value))
+        elif self.boundary_type == 'to':
+            return query.filter(column < self.bind(value))
         return query
 
+class PrefixQueryStrategy(QueryStrategy):
+    """
+    前綴匹配查詢策略
+    轉換為範圍條件 [前綴, 前綴末字符加一)，與 LIKE 'value%' 不同，可直接使用該列的普通索引；
+    按列的排序規則比較，SQLite默認的BINARY排序規則下區分大小寫
+    """
+    def __init__(self, field_name, param=None):
+        super().__init__(param or f'{field_name}_prefix')
+        self.field_name = field_name
+
+    def bind_value(self, value):
+        if not value:
+            raise ValueError("前綴不能為空")
+        return value, value[:-1] + chr(ord(value[-1]) + 1)
+
+    def params(self, value):
+        lower, upper = self.bind_value(value)
+        return {f'{self.param}_lower': lower, f'{self.param}_upper': upper}
+
+    def execute(self, query, model, value):
+        column = getattr(model, self.field_name)
+        lower, upper = self.bind_value(value)
+        return query.filter(
+            column >= bindparam(f'{self.param}_lower', lower),
+            column < bindparam(f'{self.param}_upper', upper),
+        )
+
 class LikeQueryStrategy(QueryStrategy):
     """模糊查詢策略"""
-    def __init__(self, field_name):
+    def __init__(self, field_name, param=None):
+        super().__init__(param or f'{field_name}_like')
         self.field_name = field_name
 
+    def bind_value(self, value):
+        return f"%{value}%"
+
+    def execute(self, query, model, value):
+        return query.filter(getattr(model, self.field_name).like(self.bind(value)))
+
+class FullTextQueryStrategy(QueryStrategy):
+    """全文檢索策略，以全文索引代替無法使用索引的 LIKE '%value%'"""
+    def __init__(self, index, enabled=None, param='q'):
+        super().__init__(param)
+        self.index = index # 提供 apply(query, value, enabled, param) 的全文索引，例如 dao.fulltext.FullTextIndex
+        self.enabled = enabled # 是否使用全文索引，可為返回布爾值的函數；None表示由索引根據當前數據庫判斷
+
+    def _enabled(self):
+        enabled = self.enabled() if callable(self.enabled) else self.enabled
+        return self.index.enabled if enabled is None else enabled
+
+    def shape(self, value):
+        # 使用全文索引與退化為LIKE時的SQL不同
+        return self._enabled()
+
+    def bind_value(self, value):
+        return self.index.bind_value(value, self._enabled())
+
+    def execute(self, query, model, value):
+        return self.index.apply(query, value, self._enabled(), self.param)
+
+class OrderingQueryStrategy(QueryStrategy):
+    """排序策略，值為排序參數，例如 "amount,-created_at"；只允許 allowed_fields 中的字段，以id作為決勝字段"""
+    def __init__(self, allowed_fields, param='sort'):
+        super().__init__(param)
+        self.allowed_fields = tuple(allowed_fields)
+
+    def shape(self, value):
+        return tuple(parse_sort(value, self.allowed_fields))
+
+    def params(self, value):
+        return {}
+
     def execute(self, query, model, value):
-        return query.filter(getattr(model, self.field_name).like(f"%{value}%"))
+        return query.order_by(*[
+            getattr(model, name).desc() if descending else getattr(model, name).asc()
+            for name, descending in parse_sort(value, self.allowed_fields)
+        ])
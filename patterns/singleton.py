@@ -1,4 +1,4 @@
-_# crm_project/patterns/singleton.py_
+# crm_project/patterns/singleton.py
 
 class SingletonMeta(type):
     """
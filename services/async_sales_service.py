@@ -0,0 +1,75 @@
+# crm_project/services/async_sales_service.py
+
+from dao.async_sales_dao import AsyncSalesDAO, AsyncSummaryDAO
+from models.sales import SalesOpportunity
+from models.summary import SalesSummary
+from services.sales_service import SalesService
+
+class AsyncSalesService:
+    """
+    銷售機會業務邏輯層的異步版本，供ASGI應用使用
+    參數校驗、序列化與ETag計算複用 SalesService，行為與同步版本一致
+    """
+
+    def __init__(self):
+        self.sales_dao = AsyncSalesDAO()
+        self.summary_dao = AsyncSummaryDAO()
+
+    async def get_opportunities_page(self, params, limit, after=None, sort=None, fields=None):
+        """分頁獲取（或搜索）銷售機會，返回 (分頁結果, 強ETag)"""
+        fields = SalesService._parse_fields(fields)
+        rows, next_cursor = await self.sales_dao.search_page(
+            params, limit, after, sort, SalesService._page_fields(fields)
+        )
+        etag = SalesService._page_etag(rows, next_cursor, fields)
+        items = SalesService._serialize(rows, fields or SalesOpportunity.FIELDS)
+        return {'items': items, 'next_cursor': next_cursor}, etag
+
+    async def get_opportunities_page_etag(self, params, limit, after=None, sort=None, fields=None):
+        """計算分頁結果的強ETag，只查詢本頁各行的 (id, version)"""
+        fields = SalesService._parse_fields(fields)
+        rows, next_cursor = await self.sales_dao.search_page(
+            params, limit, after, sort, SalesService.ETAG_FIELDS
+        )
+        return SalesService._page_etag(rows, next_cursor, fields)
+
+    async def get_opportunity_etag(self, id, fields=None):
+        """計算單個銷售機會的強ETag，不存在時返回None"""
+        fields = SalesService._parse_fields(fields)
+        row = await self.sales_dao.get_fields_by_id(id, ['version'])
+        return SalesService._etag('item', id, row['version'], fields) if row else None
+
+    async def get_opportunity_by_id(self, id, fields=None):
+        """根據ID獲取銷售機會"""
+        fields = SalesService._parse_fields(fields)
+        if fields:
+            values = await self.sales_dao.get_fields_by_id(id, fields)
+            return SalesService._serialize([values], fields)[0] if values else None
+        opp = await self.sales_dao.get_by_id(id)
+        return opp.to_dict() if opp else None
+
+    async def create_opportunity(self, data):
+        """創建銷售機會"""
+        SalesService._validate_writable(data)
+        SalesService._validate_new_opportunity(data)
+        new_opp = await self.sales_dao.create(data)
+        return new_opp.to_dict()
+
+    async def update_opportunity(self, id, data):
+        """更新銷售機會"""
+        SalesService._validate_writable(data)
+        updated_opp = await self.sales_dao.update(id, data)
+        return updated_opp.to_dict() if updated_opp else None
+
+    async def delete_opportunity(self, id):
+        """刪除銷售機會"""
+        deleted_opp = await self.sales_dao.delete(id)
+        return deleted_opp.to_dict() if deleted_opp else None
+
+    async def get_pipeline_summary(self, start=None, end=None):
+        """銷售漏斗匯總，參數與返回值同 SalesService.get_pipeline_summary"""
+        SalesService._validate_date_range(start, end)
+        return SalesService._pipeline_summary(
+            await self.summary_dao.get_dimension(SalesSummary.DIMENSION_STAGE),
+            await self.summary_dao.get_dimension(SalesSummary.DIMENSION_DAY, start, end),
+        )
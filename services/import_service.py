@@ -0,0 +1,245 @@
+# crm_project/services/import_service.py
+
+import csv
+import datetime
+import hashlib
+import json
+import os
+import time
+
+from dao.import_dao import ImportCheckpointDAO
+from dao.sales_dao import SalesDAO
+from dao.summary_dao import SummaryDAO
+from models.import_checkpoint import ImportCheckpoint
+from models.sales import SalesOpportunity
+from services.sales_service import SalesService
+from utils.serialization import orjson
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+
+class OpportunityImportService:
+    """
+    銷售機會批量導入
+    流式讀取CSV或JSON Lines文件，按塊在事務中插入，每塊提交時在同一事務中更新檢查點；
+    中斷後再次導入同一文件時從最後一個已提交的塊之後繼續
+    """
+
+    FORMATS = ('csv', 'jsonl')
+    EXTENSIONS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+
+    # 創建銷售機會的必填字段
+    REQUIRED_FIELDS = ('name', 'customer_name', 'amount')
+
+    # 計算文件指紋時讀取的開頭字節數
+    FINGERPRINT_BYTES = 1 << 20
+
+    def __init__(self):
+        self.sales_dao = SalesDAO()
+        self.summary_dao = SummaryDAO()
+        self.checkpoint_dao = ImportCheckpointDAO()
+
+    def import_file(self, path, format=None, chunk_size=5000, defer=False, restart=False,
+                    rejects_path=None, progress=None):
+        """
+        導入文件中的銷售機會
+        :param format: csv 或 jsonl，None時根據擴展名判斷
+        :param chunk_size: 每個事務插入的行數
+        :param defer: 導入期間刪除二級索引並暫停全文索引與匯總表的維護，完成時統一重建；
+                      選項記錄在檢查點中，續傳時沿用
+        :param restart: 丟棄已有的檢查點，從頭導入
+        :param rejects_path: 校驗失敗的記錄寫入的JSON Lines文件，默認為 <path>.rejects.jsonl
+        :param progress: 每塊提交後以進度字典調用的回調
+        :return: 導入結束時的進度字典
+        """
+        path = os.path.abspath(path)
+        format = format or self._detect_format(path)
+        if format not in self.FORMATS:
+            raise ValueError(f"format必須是{', '.join(self.FORMATS)}之一")
+        if chunk_size < 1:
+            raise ValueError("chunk_size必須是正整數")
+        rejects_path = rejects_path or path + '.rejects.jsonl'
+        size = os.path.getsize(path)
+
+        with open(path, 'rb') as file:
+            checkpoint = self._checkpoint(path, file, size, format, defer, restart)
+            if checkpoint.deferred and checkpoint.records == 0:
+                self.sales_dao.drop_indexes()
+
+            file.seek(checkpoint.offset)
+            if format == 'csv':
+                header = json.loads(checkpoint.header)
+                records, parse = self._csv_records(file), lambda row: self._csv_record(header, row)
+            else:
+                records, parse = self._jsonl_records(file), self._jsonl_record
+
+            # 新的導入覆蓋舊的拒絕文件，續傳時追加
+            with open(rejects_path, 'a' if checkpoint.records else 'w', encoding='utf-8') as rejects_file:
+                started, imported = time.perf_counter(), checkpoint.imported
+                for rows, rejects, offset in self._chunks(records, parse, checkpoint.records, chunk_size):
+                    self._commit_chunk(checkpoint, rows, len(rejects), offset)
+                    for reject in rejects:
+                        rejects_file.write(json.dumps(reject, ensure_ascii=False) + '\n')
+                    rejects_file.flush()
+                    if progress:
+                        progress(self._progress(checkpoint, size, started, imported))
+
+        if checkpoint.deferred:
+            self._rebuild_deferred()
+        checkpoint.completed_at = datetime.datetime.utcnow()
+        self.checkpoint_dao.commit()
+        return dict(self._progress(checkpoint, size, started, imported), rejects_path=rejects_path)
+
+    def _detect_format(self, path):
+        format = self.EXTENSIONS.get(os.path.splitext(path)[1].lower())
+        if not format:
+            raise ValueError("無法根據擴展名判斷文件格式，請指定format")
+        return format
+
+    def _fingerprint(self, file, size):
+        file.seek(0)
+        digest = hashlib.sha1(file.read(self.FINGERPRINT_BYTES)).hexdigest()
+        return f'{size}:{digest}'
+
+    def _checkpoint(self, path, file, size, format, defer, restart):
+        """讀取或創建檢查點；文件被替換或上次導入已完成時需指定restart"""
+        fingerprint = self._fingerprint(file, size)
+        checkpoint = self.checkpoint_dao.get(path)
+        if checkpoint and restart:
+            if checkpoint.deferred and not checkpoint.completed_at:
+                # 上次推遲維護的導入未完成，先恢復索引與匯總表
+                self._rebuild_deferred()
+            self.checkpoint_dao.delete(path)
+            checkpoint = None
+        if checkpoint:
+            if checkpoint.fingerprint != fingerprint:
+                raise ValueError("文件內容與檢查點記錄的不一致，如需重新導入請指定restart")
+            if checkpoint.format != format:
+                raise ValueError(f"檢查點記錄的文件格式為{checkpoint.format}")
+            if checkpoint.completed_at:
+                raise ValueError("該文件已導入完成，如需再次導入請指定restart")
+            return checkpoint
+
+        checkpoint = ImportCheckpoint(source=path, fingerprint=fingerprint, format=format, offset=0,
+                                      records=0, imported=0, rejected=0, deferred=defer)
+        if format == 'csv':
+            file.seek(0)
+            header = next(csv.reader(self._lines(file, 'utf-8-sig')), None)
+            missing = [field for field in self.REQUIRED_FIELDS if field not in (header or ())]
+            if missing:
+                raise ValueError(f"CSV表頭缺少字段: {', '.join(missing)}")
+            checkpoint.header = json.dumps([field.strip() for field in header], ensure_ascii=False)
+            checkpoint.offset = file.tell()
+        self.checkpoint_dao.add(checkpoint)
+        self.checkpoint_dao.commit()
+        return checkpoint
+
+    @staticmethod
+    def _lines(file, encoding='utf-8'):
+        for line in iter(file.readline, b''):
+            yield line.decode(encoding)
+
+    def _csv_records(self, file):
+        """逐條讀取CSV記錄，返回 (字段值列表, 記錄之後的字節位置)；引號內的換行由csv模塊拼接"""
+        for row in csv.reader(self._lines(file)):
+            # csv模塊按需逐行讀取，產出一條記錄時文件位置恰好位於該記錄之後
+            if row:
+                yield row, file.tell()
+
+    @staticmethod
+    def _jsonl_records(file):
+        for line in iter(file.readline, b''):
+            if line.strip():
+                yield line, file.tell()
+
+    @staticmethod
+    def _csv_record(header, row):
+        if len(row) != len(header):
+            raise ValueError(f"字段數{len(row)}與表頭的{len(header)}不一致")
+        return dict(zip(header, row))
+
+    @staticmethod
+    def _jsonl_record(line):
+        record = _loads(line)
+        if not isinstance(record, dict):
+            raise ValueError("每行必須是JSON對象")
+        return record
+
+    def _chunks(self, records, parse, number, chunk_size):
+        """
+        把記錄校驗後分塊
+        :param number: 已處理的記錄數，用於給拒絕的記錄編號
+        :return: (待插入的行, 拒絕的記錄, 塊末尾的字節位置) 迭代器
+        """
+        rows, rejects, offset = [], [], None
+        for raw, offset in records:
+            number += 1
+            try:
+                rows.append(self._normalize(parse(raw)))
+            except ValueError as e:
+                data = raw.decode('utf-8', 'replace').rstrip('\r\n') if isinstance(raw, bytes) else raw
+                rejects.append({'record': number, 'error': str(e), 'data': data})
+            if len(rows) + len(rejects) >= chunk_size:
+                yield rows, rejects, offset
+                rows, rejects = [], []
+        if rows or rejects:
+            yield rows, rejects, offset
+
+    @staticmethod
+    def _normalize(record):
+        """
+        按 SalesService.create_opportunity 的規則校驗一條記錄
+        只保留可寫字段，缺省的階段取漏斗的第一個階段，使每行的字段相同以便整塊一次插入
+        """
+        data = {}
+        for field in SalesService.WRITABLE_FIELDS:
+            value = record.get(field)
+            if isinstance(value, str):
+                value = value.strip()
+            data[field] = value
+        if data['amount'] not in (None, ''):
+            # CSV中的金額是字符串，先轉換，使 "0" 與API中的 0 一樣被視為缺失
+            try:
+                data['amount'] = float(data['amount'])
+            except (TypeError, ValueError):
+                raise ValueError("金額必須是數字")
+        SalesService._validate_new_opportunity(data)
+        data['stage'] = data['stage'] or SalesOpportunity.STAGES[0]
+        return data
+
+    def _commit_chunk(self, checkpoint, rows, rejected, offset):
+        """在同一事務中插入一塊數據並推進檢查點"""
+        try:
+            self.sales_dao.bulk_create(rows, commit=False, hooks=not checkpoint.deferred)
+            checkpoint.offset = offset
+            checkpoint.records += len(rows) + rejected
+            checkpoint.imported += len(rows)
+            checkpoint.rejected += rejected
+            self.checkpoint_dao.commit()
+        except Exception:
+            self.checkpoint_dao.rollback()
+            raise
+
+    def _rebuild_deferred(self):
+        """
+        重建導入期間推遲維護的二級索引、全文索引與匯總表，並為導入的記錄分配變更序列號；
+        推遲維護的插入不經過寫入鉤子，最後使讀緩存全部失效
+        """
+        self.sales_dao.create_indexes()
+        self.sales_dao.changes.backfill()
+        self.sales_dao.fulltext.rebuild()
+        self.summary_dao.rebuild()
+        self.sales_dao.cache.invalidate_all()
+
+    @staticmethod
+    def _progress(checkpoint, size, started, imported):
+        elapsed = time.perf_counter() - started
+        return {
+            'imported': checkpoint.imported,
+            'rejected': checkpoint.rejected,
+            'offset': checkpoint.offset,
+            'size': size,
+            'elapsed': elapsed,
+            # 只統計本次運行插入的行
+            'rows_per_second': (checkpoint.imported - imported) / elapsed if elapsed else 0.0,
+        }
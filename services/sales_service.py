@@ -1,33 +1,160 @@
-_# crm_project/services/sales_service.py_
+# crm_project/services/sales_service.py
 
+import csv
+import datetime
+import hashlib
+import io
+import json
+import math
+import os
+
+from dao.audit_dao import AuditDAO
 from dao.sales_dao import SalesDAO
+from dao.summary_dao import SummaryDAO
+from models.sales import SalesOpportunity
+from models.summary import SalesSummary
+from utils.audit import audit_trail
+from utils.profiling import request_profiler
+
+def _isoformat(value):
+    """json.dumps 的 default：把datetime編碼為ISO格式字符串，與 to_dict 一致"""
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    raise TypeError(f"無法序列化的類型: {type(value).__name__}")
 
 class SalesService:
     """銷售機會業務邏輯層"""
 
+    # 導出的字段及順序
+    EXPORT_FIELDS = ('id', 'name', 'customer_name', 'amount', 'stage', 'created_at')
+    EXPORT_FORMATS = ('ndjson', 'csv')
+    # 導出的第一塊只包含這麼多行，客戶端不必等一整批讀取並序列化完才收到數據
+    EXPORT_FIRST_CHUNK_SIZE = 100
+
+    # 允許通過API寫入的字段
+    WRITABLE_FIELDS = ('name', 'customer_name', 'amount', 'stage')
+    BATCH_OPERATIONS = ('create', 'update', 'delete')
+
+    # 計算分頁ETag時查詢的字段
+    ETAG_FIELDS = ('id', 'version')
+
     def __init__(self):
         self.sales_dao = SalesDAO()
+        self.summary_dao = SummaryDAO()
+        self.audit_dao = AuditDAO()
 
     def get_all_opportunities(self):
         """獲取所有銷售機會"""
-        return [opp.to_dict() for opp in self.sales_dao.get_all()]
+        return self.sales_dao.get_all_rows(SalesOpportunity.FIELDS)
+
+    def get_opportunities_page(self, params, limit, after=None, sort=None, fields=None):
+        """
+        分頁獲取（或搜索）銷售機會
+        ETag由同一次查詢得到的行計算，與響應體描述的是同一份數據
+        :param fields: 只返回的字段列表，None表示全部字段
+        :return: (分頁結果, 強ETag)，列表項為列值字典，datetime等值由應用的JSON提供者直接編碼
+        """
+        fields = self._parse_fields(fields)
+        # 按列查詢，不創建ORM對象，也不逐行調用 to_dict/isoformat
+        rows, next_cursor = self.sales_dao.search_page(params, limit, after, sort, self._page_fields(fields))
+        etag = self._page_etag(rows, next_cursor, fields)
+        with request_profiler.span('serialize'):
+            items = self._select_fields(rows, fields) if fields else rows
+        return {'items': items, 'next_cursor': next_cursor}, etag
+
+    @classmethod
+    def _page_fields(cls, fields):
+        """分頁查詢的字段：請求的字段加上計算ETag所需的字段"""
+        if not fields:
+            return SalesOpportunity.FIELDS
+        return list(dict.fromkeys([*fields, *cls.ETAG_FIELDS]))
+
+    @staticmethod
+    def _select_fields(rows, fields):
+        """去掉為生成游標而額外查詢的排序鍵"""
+        if not rows or len(rows[0]) == len(fields):
+            return rows
+        return [{field: row[field] for field in fields} for row in rows]
+
+    @staticmethod
+    def _serialize(opps, fields=None):
+        """將ORM對象或按列查詢得到的值字典轉換為響應字典"""
+        if fields:
+            return [SalesOpportunity.fields_to_dict(opp, fields) for opp in opps]
+        return [opp.to_dict() for opp in opps]
+
+    def get_opportunities_page_etag(self, params, limit, after=None, sort=None, fields=None):
+        """
+        計算分頁結果的強ETag，用於 If-None-Match 條件請求，與 get_opportunities_page 返回的ETag相同
+        只查詢本頁各行的 (id, version)，不加載也不序列化完整的行；
+        行被修改、插入或刪除導致本頁內容變化時ETag隨之變化
+        """
+        fields = self._parse_fields(fields)
+        rows, next_cursor = self.sales_dao.search_page(params, limit, after, sort, self.ETAG_FIELDS)
+        return self._page_etag(rows, next_cursor, fields)
+
+    @classmethod
+    def _page_etag(cls, rows, next_cursor, fields):
+        versions = [(row['id'], row['version']) for row in rows]
+        return cls._etag('page', versions, next_cursor, fields)
 
-    def get_opportunity_by_id(self, id):
-        """根據ID獲取銷售機會"""
-        opp = self.sales_dao.get_by_id(id)
-        return opp.to_dict() if opp else None
+    def get_opportunity_etag(self, id, fields=None):
+        """計算單個銷售機會的強ETag，不存在時返回None"""
+        fields = self._parse_fields(fields)
+        row = self.sales_dao.get_fields_by_id(id, ['version'])
+        return self._etag('item', id, row['version'], fields) if row else None
+
+    @staticmethod
+    def _etag(*parts):
+        raw = json.dumps(parts, separators=(',', ':'), ensure_ascii=False, default=str)
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def get_opportunity_by_id(self, id, fields=None):
+        """根據ID獲取銷售機會，返回列值字典"""
+        fields = self._parse_fields(fields)
+        return self.sales_dao.get_fields_by_id(id, fields or SalesOpportunity.FIELDS)
+
+    @staticmethod
+    def _parse_fields(fields):
+        """校驗字段選擇參數，未指定時返回None"""
+        if not fields:
+            return None
+        unknown = [field for field in fields if field not in SalesOpportunity.FIELDS]
+        if unknown:
+            raise ValueError(f"不支持的字段: {', '.join(unknown)}")
+        return list(dict.fromkeys(fields))
 
     def create_opportunity(self, data):
         """創建銷售機會"""
         # 在這裡可以添加業務邏輯，例如數據驗證、權限檢查等
-        if not data.get('name') or not data.get('customer_name') or not data.get('amount'):
-            raise ValueError("缺少必要的機會信息")
+        self._validate_writable(data)
+        self._validate_new_opportunity(data)
         
         new_opp = self.sales_dao.create(data)
         return new_opp.to_dict()
 
+    @staticmethod
+    def _validate_new_opportunity(data):
+        """校驗創建銷售機會所需的字段"""
+        if not data.get('name') or not data.get('customer_name') or not data.get('amount'):
+            raise ValueError("缺少必要的機會信息")
+
+    @classmethod
+    def _validate_writable(cls, data):
+        """
+        校驗請求體只包含允許寫入的字段且類型正確
+        id、version、change_seq、updated_at 等由服務端維護，客戶端寫入會使ETag失效判斷出錯
+        """
+        if not isinstance(data, dict) or not data:
+            raise ValueError("請求體必須是非空的JSON對象")
+        unknown = set(data) - set(cls.WRITABLE_FIELDS)
+        if unknown:
+            raise ValueError(f"不允許寫入的字段: {', '.join(sorted(unknown))}")
+        cls._validate_values(data)
+
     def update_opportunity(self, id, data):
         """更新銷售機會"""
+        self._validate_writable(data)
         updated_opp = self.sales_dao.update(id, data)
         return updated_opp.to_dict() if updated_opp else None
 
@@ -36,6 +163,237 @@ class SalesService:
         deleted_opp = self.sales_dao.delete(id)
         return deleted_opp.to_dict() if deleted_opp else None
 
+    def get_opportunity_history(self, id, limit, after=None):
+        """
+        獲取銷售機會的變更歷史，最近的變更在前
+        審計記錄由後台線程批量寫入，剛提交的變更可能在 AUDIT_FLUSH_INTERVAL 秒內尚未出現
+        :return: 分頁結果；機會不存在且沒有任何歷史時返回None（已刪除的機會仍可查詢歷史）
+        """
+        rows, next_cursor = self.audit_dao.history_page(SalesOpportunity.__tablename__, id, limit, after)
+        if not rows and not after and self.sales_dao.get_fields_by_id(id, ('id',)) is None:
+            return None
+        return {'items': rows, 'next_cursor': next_cursor}
+
+    def get_opportunity_changes(self, since, limit, after=None, fields=None):
+        """
+        增量同步：返回變更序列號大於since的已創建/更新的機會與已刪除機會的墓碑，按序列號升序
+        有下一頁時以相同的since加上 after=next_cursor 繼續讀取；讀完最後一頁後，
+        客戶端保存響應中的since作為下次同步的起點
+        :return: {'items': [...], 'next_cursor': ..., 'since': 最後一頁時為下次同步的起點，否則為None}
+        """
+        try:
+            since = int(since or 0)
+        except (TypeError, ValueError):
+            raise ValueError("since必須是非負整數")
+        if since < 0:
+            raise ValueError("since必須是非負整數")
+        fields = self._parse_fields(fields)
+        rows, next_cursor = self.sales_dao.changes_page(since, limit, after, fields)
+        with request_profiler.span('serialize'):
+            items = []
+            for deleted, row in rows:
+                if deleted:
+                    items.append(dict(row, deleted=True))
+                else:
+                    item = {field: row[field] for field in fields} if fields else row
+                    items.append(dict(item, id=row['id'], change_seq=row['change_seq'], deleted=False))
+        if next_cursor is None:
+            since = items[-1]['change_seq'] if items else since
+        return {'items': items, 'next_cursor': next_cursor, 'since': None if next_cursor else since}
+
+    def get_cache_metrics(self):
+        """返回當前worker進程中銷售機會讀緩存的統計"""
+        return {'pid': os.getpid(), 'enabled': self.sales_dao.cache.enabled, **self.sales_dao.cache.stats()}
+
+    @staticmethod
+    def get_audit_metrics():
+        """返回當前worker進程中變更審計的寫入統計"""
+        return {'pid': os.getpid(), 'enabled': audit_trail.enabled, **audit_trail.stats()}
+
     def search_opportunities(self, params):
         """搜索銷售機會"""
-        return [opp.to_dict() for opp in self.sales_dao.search(params)]
+        return self.sales_dao.search_rows(params, SalesOpportunity.FIELDS)
+
+    def batch_opportunities(self, operations, max_operations=None):
+        """
+        在同一事務中批量執行混合操作
+        操作按 create、update、delete 分組，每組只發出一次批量語句；
+        分組改變了執行順序，因此同一批中的update/delete不能重複操作同一id，重複的項返回400
+        :param operations: [{"op": "create", "data": {...}}, {"op": "update", "id": 1, "data": {...}},
+                            {"op": "delete", "id": 2}, ...]
+        :param max_operations: 單批允許的最大操作數
+        :return: 與operations一一對應的結果列表
+        """
+        if not isinstance(operations, list) or not operations:
+            raise ValueError("operations必須是非空列表")
+        if max_operations and len(operations) > max_operations:
+            raise ValueError(f"單批操作數不能超過{max_operations}")
+
+        results = [None] * len(operations)
+        creates, updates, deletes = [], [], []
+        seen = set()
+        for index, operation in enumerate(operations):
+            try:
+                op, id, data = self._parse_batch_operation(operation)
+                if op != 'create':
+                    if id in seen:
+                        raise ValueError(f"同一批操作中不能重複操作id {id}")
+                    seen.add(id)
+            except ValueError as e:
+                results[index] = {'index': index, 'status': 400, 'error': str(e)}
+                continue
+            if op == 'create':
+                creates.append((index, data))
+            elif op == 'update':
+                updates.append((index, dict(data, id=id)))
+            else:
+                deletes.append((index, id))
+
+        try:
+            new_ids = self.sales_dao.bulk_create([data for _, data in creates], commit=False)
+            updated = self.sales_dao.bulk_update([data for _, data in updates], commit=False)
+            deleted = self.sales_dao.bulk_delete([id for _, id in deletes], commit=False)
+            self.sales_dao.commit()
+        except Exception:
+            self.sales_dao.rollback()
+            raise
+
+        for (index, _), new_id in zip(creates, new_ids):
+            results[index] = {'index': index, 'op': 'create', 'status': 201, 'id': new_id}
+        for index, data in updates:
+            results[index] = self._batch_result(index, 'update', data['id'], data['id'] in updated)
+        for index, id in deletes:
+            results[index] = self._batch_result(index, 'delete', id, id in deleted)
+        return results
+
+    def _parse_batch_operation(self, operation):
+        """校驗單個批量操作，返回 (操作類型, id, 數據)"""
+        if not isinstance(operation, dict) or operation.get('op') not in self.BATCH_OPERATIONS:
+            raise ValueError(f"op必須是{', '.join(self.BATCH_OPERATIONS)}之一")
+        op = operation['op']
+
+        id = operation.get('id')
+        if op != 'create' and not isinstance(id, int):
+            raise ValueError("update和delete操作必須提供整數id")
+        if op == 'delete':
+            return op, id, None
+
+        data = operation.get('data')
+        if not isinstance(data, dict) or not data:
+            raise ValueError("create和update操作必須提供data")
+        self._validate_writable(data)
+        if op == 'create':
+            self._validate_new_opportunity(data)
+        return op, id, data
+
+    @staticmethod
+    def _validate_values(data):
+        """校驗寫入字段的類型，使錯誤的值在執行SQL之前以400報告，而不是在數據庫中失敗"""
+        for field in ('name', 'customer_name'):
+            if field in data and (not isinstance(data[field], str) or not data[field].strip()):
+                raise ValueError(f"{field}必須是非空字符串")
+        if 'amount' in data:
+            amount = data['amount']
+            if isinstance(amount, bool) or not isinstance(amount, (int, float)) or not math.isfinite(amount):
+                raise ValueError("amount必須是數字")
+        if 'stage' in data and not isinstance(data['stage'], str):
+            raise ValueError("stage必須是字符串")
+
+    @staticmethod
+    def _batch_result(index, op, id, found):
+        if found:
+            return {'index': index, 'op': op, 'status': 200, 'id': id}
+        return {'index': index, 'op': op, 'status': 404, 'id': id, 'error': "Opportunity not found"}
+
+    def get_pipeline_summary(self, start=None, end=None):
+        """
+        銷售漏斗匯總：按階段及按創建日期統計數量、總金額和平均金額
+        :param start: 起始日期 YYYY-MM-DD（含），只作用於按日期統計
+        :param end: 結束日期 YYYY-MM-DD（含）
+        """
+        self._validate_date_range(start, end)
+        return self._pipeline_summary(
+            self.summary_dao.get_dimension(SalesSummary.DIMENSION_STAGE),
+            self.summary_dao.get_dimension(SalesSummary.DIMENSION_DAY, start, end),
+        )
+
+    @staticmethod
+    def _validate_date_range(start, end):
+        for value in (start, end):
+            if value is not None:
+                try:
+                    datetime.date.fromisoformat(value)
+                except ValueError:
+                    raise ValueError(f"日期格式無效: {value}，應為YYYY-MM-DD")
+
+    @staticmethod
+    def _pipeline_summary(stages, days):
+        """按漏斗順序排列階段並轉換為響應字典"""
+        order = {stage: index for index, stage in enumerate(SalesOpportunity.STAGES)}
+        stages = sorted(stages, key=lambda row: (order.get(row.key, len(order)), row.key))
+        return {
+            'stages': [row.to_dict() for row in stages],
+            'daily': [row.to_dict() for row in days],
+        }
+
+    def export_opportunities(self, params, fmt='ndjson', chunk_size=1000):
+        """
+        流式導出銷售機會
+        :param params: 查詢參數字典
+        :param fmt: 導出格式，ndjson 或 csv
+        :param chunk_size: 每批讀取並輸出的行數
+        :return: 逐塊生成文本的迭代器
+        """
+        # 在返回生成器之前校驗參數，使錯誤能在響應開始前被報告
+        if fmt not in self.EXPORT_FORMATS:
+            raise ValueError(f"不支持的導出格式: {fmt}")
+
+        if fmt == 'csv':
+            rows = self.sales_dao.iter_rows(params, self.EXPORT_FIELDS, chunk_size)
+            return self._iter_csv(self._batches(rows, chunk_size))
+        # NDJSON 輸出與 to_dict 相同的全部字段
+        rows = self.sales_dao.iter_rows(params, SalesOpportunity.FIELDS, chunk_size)
+        return self._iter_ndjson(self._batches(rows, chunk_size))
+
+    def _batches(self, rows, chunk_size):
+        """把行分成每塊輸出的批次，第一批較小"""
+        size = min(self.EXPORT_FIRST_CHUNK_SIZE, chunk_size)
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= size:
+                yield batch
+                batch, size = [], chunk_size
+        if batch:
+            yield batch
+
+    @staticmethod
+    def _iter_ndjson(batches):
+        fields = SalesOpportunity.FIELDS
+        for batch in batches:
+            # 按列讀到的行元組直接編碼，datetime 由 default 轉為ISO格式
+            yield ''.join(
+                json.dumps(dict(zip(fields, row)), ensure_ascii=False, default=_isoformat) + '\n' for row in batch
+            )
+
+    def _iter_csv(self, batches):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(self.EXPORT_FIELDS)
+        # 表頭立即輸出，客戶端無需等待第一批數據
+        yield self._drain(buffer)
+
+        for batch in batches:
+            writer.writerows(
+                [value.isoformat() if isinstance(value, datetime.datetime) else value for value in row]
+                for row in batch
+            )
+            yield self._drain(buffer)
+
+    @staticmethod
+    def _drain(buffer):
+        """取出緩衝區內容並清空"""
+        text = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return text
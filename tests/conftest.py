@@ -0,0 +1,63 @@
+# crm_project/tests/conftest.py
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+# 配置類在導入時讀取環境變量：在導入應用模塊之前指向臨時目錄中的數據庫與運行時文件
+_tmp = tempfile.mkdtemp(prefix='crm-tests-')
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(_tmp, 'crm.db')}")
+os.environ.setdefault('RATE_LIMIT_STORAGE_PATH', os.path.join(_tmp, 'rate_limit.db'))
+os.environ.setdefault('CACHE_GENERATION_PATH', os.path.join(_tmp, 'cache_generations.bin'))
+os.environ.setdefault('AUDIT_ENABLED', '0')
+os.environ.setdefault('PROFILING_ENABLED', '0')
+os.environ.setdefault('PASSWORD_HASH_WORKERS', '0')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """按覆蓋的配置創建應用，每個測試使用獨立的空數據庫；默認關閉限流"""
+    from app import create_app
+    from extensions import db
+
+    def make(**config):
+        app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'crm.db'}",
+            'CACHE_GENERATION_PATH': str(tmp_path / 'cache_generations.bin'),
+            'RATE_LIMIT_ENABLED': False,
+            **config,
+        })
+        with app.app_context():
+            # 只在主庫建表：副本由 replicate 命令從主庫複製；Flask-SQLAlchemy 的 db 在應用之間保留
+            # 配置過的綁定鍵，其他應用沒有這些綁定
+            db.create_all(bind_key=None)
+        return app
+
+    return make
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth(app):
+    """返回指定身份的認證請求頭"""
+    from flask_jwt_extended import create_access_token
+
+    def headers(identity='tester'):
+        with app.app_context():
+            return {'Authorization': f"Bearer {create_access_token(identity=identity)}"}
+
+    return headers
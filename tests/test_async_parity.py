@@ -0,0 +1,158 @@
+# crm_project/tests/test_async_parity.py
+
+"""
+同步（WSGI）與異步（ASGI）銷售API的一致性測試
+兩個應用連接同一個數據庫，對兩者都提供的接口發出相同的請求，比較狀態碼、響應體與ETag
+"""
+
+import asyncio
+from urllib.parse import quote
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import create_app
+from extensions import db
+
+# 兩個入口都提供的只讀請求
+READ_REQUESTS = [
+    '/api/sales/opportunities',
+    '/api/sales/opportunities?limit=2',
+    '/api/sales/opportunities?sort=-amount,created_at&limit=3',
+    '/api/sales/opportunities?stage=談判中',
+    '/api/sales/opportunities?stage_in=初期,成交&sort=amount',
+    '/api/sales/opportunities?min_amount=2000&max_amount=8000',
+    '/api/sales/opportunities?name_prefix=大&fields=id,name',
+    '/api/sales/opportunities?customer_name=客戶1&created_from=2000-01-01',
+    '/api/sales/opportunities?q=客戶',
+    '/api/sales/opportunities?fields=id,amount,stage&limit=4',
+    '/api/sales/opportunities?fields=bogus',
+    '/api/sales/opportunities?after=not-a-cursor',
+    '/api/sales/opportunities?sort=unknown',
+    '/api/sales/opportunities?created_from=2024-13-01',
+    '/api/sales/opportunities/1',
+    '/api/sales/opportunities/1?fields=id,version',
+    '/api/sales/opportunities/9999',
+    '/api/sales/summary',
+    '/api/sales/summary?start=not-a-date',
+]
+
+# 兩個入口應以相同的400拒絕的寫入請求
+INVALID_WRITES = [
+    ('POST', '/api/sales/opportunities', {'name': 'x', 'customer_name': 'y'}),
+    ('POST', '/api/sales/opportunities', {'name': 'x', 'customer_name': 'y', 'amount': 1, 'version': 9}),
+    ('PUT', '/api/sales/opportunities/1', {'amount': 'abc'}),
+    ('PUT', '/api/sales/opportunities/1', {'id': 5}),
+]
+
+
+@pytest.fixture(scope='module')
+def sync_app():
+    app = create_app({'RATE_LIMIT_ENABLED': False, 'TESTING': True})
+    with app.app_context():
+        db.drop_all(bind_key=None)
+        db.create_all(bind_key=None)
+    return app
+
+
+@pytest.fixture(scope='module')
+def async_app(sync_app):
+    # asgi 在導入時按 config.Config 創建應用，需在同步應用建表之後導入
+    from asgi import app
+    return app
+
+
+@pytest.fixture(scope='module')
+def headers(sync_app):
+    with sync_app.app_context():
+        return {'Authorization': f"Bearer {create_access_token(identity='tester')}"}
+
+
+@pytest.fixture(scope='module', autouse=True)
+def opportunities(sync_app, headers):
+    client = sync_app.test_client()
+    stages = ('初期', '跟進中', '談判中', '成交', '失敗')
+    for i in range(10):
+        response = client.post('/api/sales/opportunities', headers=headers, json={
+            'name': f'大單{i}', 'customer_name': f'客戶{i % 3}', 'amount': 1000 * (i + 1), 'stage': stages[i % 5],
+        })
+        assert response.status_code == 201
+
+
+def _run_async(app, requests):
+    """在同一個事件循環中依次執行ASGI請求，結束後釋放綁定該循環的連接"""
+    from utils.async_database import async_db
+
+    async def run():
+        client = app.test_client()
+        results = []
+        try:
+            for method, path, headers, body in requests:
+                response = await client.open(path, method=method, headers=headers, json=body)
+                results.append((response.status_code, await response.get_json(), response.headers.get('ETag')))
+        finally:
+            await async_db.dispose()
+        return results
+
+    return asyncio.run(run())
+
+
+def _run_sync(app, requests):
+    client = app.test_client()
+    results = []
+    for method, path, headers, body in requests:
+        response = client.open(path, method=method, headers=headers, json=body)
+        results.append((response.status_code, response.get_json(), response.headers.get('ETag')))
+    return results
+
+
+def test_read_endpoints_match(sync_app, async_app, headers):
+    # 查詢字符串中的中文按URL編碼發送
+    requests = [('GET', quote(path, safe='/?=&,-'), headers, None) for path in READ_REQUESTS]
+    for path, expected, actual in zip(READ_REQUESTS, _run_sync(sync_app, requests), _run_async(async_app, requests)):
+        assert actual == expected, path
+
+
+def test_pagination_cursors_match(sync_app, async_app, headers):
+    """以一個入口返回的游標在另一個入口翻頁，結果相同"""
+    first = ('GET', '/api/sales/opportunities?limit=3&sort=-amount', headers, None)
+    (_, page, _), = _run_sync(sync_app, [first])
+    following = ('GET', f"/api/sales/opportunities?limit=3&sort=-amount&after={page['next_cursor']}", headers, None)
+    assert _run_async(async_app, [following]) == _run_sync(sync_app, [following])
+
+
+def test_conditional_requests_match(sync_app, async_app, headers):
+    (_, _, etag), = _run_sync(sync_app, [('GET', '/api/sales/opportunities/2', headers, None)])
+    conditional = ('GET', '/api/sales/opportunities/2', dict(headers, **{'If-None-Match': etag}), None)
+    assert [status for status, _, _ in _run_async(async_app, [conditional])] == [304]
+    assert [status for status, _, _ in _run_sync(sync_app, [conditional])] == [304]
+
+
+def test_invalid_writes_match(sync_app, async_app, headers):
+    requests = [(method, path, headers, body) for method, path, body in INVALID_WRITES]
+    expected = _run_sync(sync_app, requests)
+    assert [status for status, _, _ in expected] == [400] * len(requests)
+    assert _run_async(async_app, requests) == expected
+
+
+def test_writes_are_visible_to_both(sync_app, async_app, headers):
+    """異步入口的寫入與同步入口的寫入產生相同的讀取結果"""
+    create = ('POST', '/api/sales/opportunities', headers,
+              {'name': '異步單', 'customer_name': '客戶9', 'amount': 4321, 'stage': '成交'})
+    (status, created, _), = _run_async(async_app, [create])
+    assert status == 201
+    path = f"/api/sales/opportunities/{created['id']}"
+    update = ('PUT', path, headers, {'amount': 5000})
+    (status, updated, _), = _run_async(async_app, [update])
+    assert status == 200 and updated['version'] == 2
+    read = ('GET', path, headers, None)
+    assert _run_async(async_app, [read]) == _run_sync(sync_app, [read])
+    (status, _, _), = _run_async(async_app, [('DELETE', path, headers, None)])
+    assert status == 200
+    assert _run_sync(sync_app, [read])[0][0] == 404
+
+
+def test_requires_authentication(sync_app, async_app):
+    requests = [('GET', '/api/sales/opportunities', {}, None)]
+    assert [status for status, _, _ in _run_async(async_app, requests)] == [401]
+    assert [status for status, _, _ in _run_sync(sync_app, requests)] == [401]
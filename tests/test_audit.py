@@ -0,0 +1,77 @@
+# crm_project/tests/test_audit.py
+
+"""審計寫後緩衝：寫入線程失敗重試，緩衝區溢出時提交方只寫一次、不在請求線程內退避等待"""
+
+import datetime
+import types
+
+import pytest
+
+from utils import audit
+from utils.audit import audit_trail
+
+
+def _rows(count):
+    return [
+        {'entity_type': 'sales_opportunities', 'entity_id': i, 'action': 'create',
+         'changes': {'name': [None, f'機會{i}']}, 'actor': 'tester', 'changed_at': datetime.datetime.utcnow()}
+        for i in range(1, count + 1)
+    ]
+
+
+@pytest.fixture
+def audited(make_app, monkeypatch):
+    """緩衝區只容納1條、不等待空位；記錄退避等待而不真正休眠"""
+    make_app(
+        AUDIT_ENABLED=True,
+        AUDIT_QUEUE_SIZE=1,
+        AUDIT_ENQUEUE_TIMEOUT=0,
+        AUDIT_FLUSH_INTERVAL=0.01,
+        AUDIT_WRITE_RETRIES=3,
+        AUDIT_RETRY_BACKOFF=10.0,
+    )
+    sleeps = []
+    monkeypatch.setattr(audit, 'time', types.SimpleNamespace(sleep=sleeps.append))
+    yield sleeps
+    audit_trail.flush()
+
+
+def _fail(monkeypatch, times):
+    """讓前 times 次獲取寫入引擎失敗"""
+    get_engine = audit_trail._get_engine
+    failures = [times]
+
+    def flaky():
+        if failures[0]:
+            failures[0] -= 1
+            raise RuntimeError('database is locked')
+        return get_engine()
+
+    monkeypatch.setattr(audit_trail, '_get_engine', flaky)
+
+
+def test_writer_thread_retries_with_backoff(audited, monkeypatch):
+    before = audit_trail.stats()
+    _fail(monkeypatch, 2)
+    audit_trail.enqueue(_rows(1))
+    assert audit_trail.flush(timeout=5)
+    after = audit_trail.stats()
+    assert after['written'] - before['written'] == 1
+    assert after['retried'] - before['retried'] == 2
+    assert after['dropped'] == before['dropped']
+    assert audited == [10.0, 20.0]
+
+
+def test_overflow_writes_once_without_retrying(audited, monkeypatch):
+    before = audit_trail.stats()
+    _fail(monkeypatch, 1)
+    # 2條超過緩衝區容量，在提交方線程內寫入：失敗即丟棄，不重試、不休眠
+    assert audit_trail.enqueue(_rows(2)) is None
+    after = audit_trail.stats()
+    assert after['dropped'] - before['dropped'] == 2
+    assert after['retried'] == before['retried']
+    assert audited == []
+
+    # 下一次溢出時寫入成功
+    audit_trail.enqueue(_rows(2))
+    assert audit_trail.stats()['written'] - after['written'] == 2
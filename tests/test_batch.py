@@ -0,0 +1,79 @@
+# crm_project/tests/test_batch.py
+
+"""批量混合操作：逐項結果與校驗錯誤，任一語句失敗時整批回滾"""
+
+import pytest
+
+from controllers.sales_controller import sales_service
+
+URL = '/api/sales/opportunities'
+
+
+@pytest.fixture
+def seeded(client, auth):
+    headers = auth()
+    for i in range(3):
+        client.post(URL, headers=headers, json={'name': f'機會{i}', 'customer_name': '客戶', 'amount': 1000})
+    return headers
+
+
+def _batch(client, headers, operations):
+    return client.post(f'{URL}:batch', headers=headers, json={'operations': operations})
+
+
+def _names(client, headers):
+    return {item['id']: item['name'] for item in client.get(URL, headers=headers).get_json()['items']}
+
+
+def test_mixed_batch_reports_each_item(client, seeded):
+    response = _batch(client, seeded, [
+        {'op': 'create', 'data': {'name': '新機會', 'customer_name': '客戶', 'amount': 500}},
+        {'op': 'update', 'id': 1, 'data': {'stage': '談判中'}},
+        {'op': 'delete', 'id': 2},
+        {'op': 'update', 'id': 99, 'data': {'amount': 1}},
+        {'op': 'create', 'data': {'name': '缺少金額', 'customer_name': '客戶'}},
+        {'op': 'update', 'id': 3, 'data': {'version': 7}},
+        {'op': 'delete', 'id': 1},
+        {'op': 'archive', 'id': 3},
+    ])
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [result['status'] for result in results] == [201, 200, 200, 404, 400, 400, 400, 400]
+    assert [result['index'] for result in results] == list(range(8))
+    assert results[0]['id'] == 4
+    assert results[4]['error'] == "缺少必要的機會信息"
+    assert results[5]['error'] == "不允許寫入的字段: version"
+    assert results[6]['error'] == "同一批操作中不能重複操作id 1"
+
+    # 校驗失敗的項不影響其他項
+    assert _names(client, seeded) == {1: '機會0', 3: '機會2', 4: '新機會'}
+    item = client.get(f'{URL}/1', headers=seeded).get_json()
+    assert item['stage'] == '談判中' and item['version'] == 2
+
+
+def test_failed_statement_rolls_back_whole_batch(client, seeded, monkeypatch):
+    def fail(ids, commit=True):
+        raise ValueError("刪除失敗")
+
+    monkeypatch.setattr(sales_service.sales_dao, 'bulk_delete', fail)
+    response = _batch(client, seeded, [
+        {'op': 'create', 'data': {'name': '新機會', 'customer_name': '客戶', 'amount': 500}},
+        {'op': 'update', 'id': 1, 'data': {'name': '已改名'}},
+        {'op': 'delete', 'id': 2},
+    ])
+    assert response.status_code == 400
+    # 已執行的創建與更新一併回滾
+    assert _names(client, seeded) == {1: '機會0', 2: '機會1', 3: '機會2'}
+    assert client.get(f'{URL}/1', headers=seeded).get_json()['version'] == 1
+
+
+@pytest.mark.parametrize('body, error', [
+    ({}, "operations必須是非空列表"),
+    ({'operations': []}, "operations必須是非空列表"),
+    ({'operations': [{'op': 'delete', 'id': 1}] * 3}, "單批操作數不能超過2"),
+])
+def test_invalid_batch_is_rejected(make_app, auth, body, error):
+    client = make_app(BATCH_MAX_OPERATIONS=2).test_client()
+    response = client.post(f'{URL}:batch', headers=auth(), json=body)
+    assert response.status_code == 400
+    assert response.get_json()['error'] == error
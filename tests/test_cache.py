@@ -0,0 +1,73 @@
+# crm_project/tests/test_cache.py
+
+"""DAO讀緩存：提交後按代號失效，事務內有未提交寫入時不讀寫緩存，回滾不留下髒條目"""
+
+import pytest
+
+from dao.sales_dao import SalesDAO, sales_cache
+from extensions import db
+
+URL = '/api/sales/opportunities'
+
+
+@pytest.fixture
+def headers(client, auth):
+    headers = auth()
+    for i in range(3):
+        client.post(URL, headers=headers, json={'name': f'機會{i}', 'customer_name': '客戶', 'amount': 100})
+    return headers
+
+
+def _lookups(kind):
+    stats = sales_cache.stats()[kind]
+    return stats['hits'], stats['misses']
+
+
+def test_committed_write_invalidates_cached_reads(client, headers):
+    for id in (1, 2):
+        client.get(f'{URL}/{id}', headers=headers)
+    hits, misses = _lookups('records')
+    # 計算ETag與讀取響應體各查一次緩存
+    assert client.get(f'{URL}/1', headers=headers).get_json()['name'] == '機會0'
+    assert _lookups('records') == (hits + 2, misses)
+
+    client.put(f'{URL}/1', headers=headers, json={'name': '已改名'})
+    hits, misses = _lookups('records')
+    assert client.get(f'{URL}/1', headers=headers).get_json()['name'] == '已改名'
+    assert _lookups('records') == (hits + 1, misses + 1)
+    # 只有被寫入的記錄失效
+    client.get(f'{URL}/2', headers=headers)
+    assert _lookups('records') == (hits + 3, misses + 1)
+
+
+def test_committed_write_invalidates_cached_pages(client, headers):
+    query = {'fields': 'id,name'}
+    assert len(client.get(URL, headers=headers, query_string=query).get_json()['items']) == 3
+    hits, _ = _lookups('queries')
+    client.get(URL, headers=headers, query_string=query)
+    assert _lookups('queries')[0] == hits + 1
+
+    client.post(URL, headers=headers, json={'name': '新機會', 'customer_name': '客戶', 'amount': 1})
+    client.delete(f'{URL}/2', headers=headers)
+    items = client.get(URL, headers=headers, query_string=query).get_json()['items']
+    assert [item['id'] for item in items] == [1, 3, 4]
+
+
+def test_uncommitted_write_is_not_cached_and_rollback_keeps_entries(app, client, headers):
+    dao = SalesDAO()
+    with app.app_context():
+        before = dao.get_fields_by_id(1, ['name'])
+        hits, misses = _lookups('records')
+
+        dao.bulk_update([{'id': 1, 'name': '未提交'}], commit=False)
+        # 事務內讀到自己未提交的寫入，但既不讀也不寫緩存
+        assert dao.get_fields_by_id(1, ['name']) == {'name': '未提交'}
+        assert _lookups('records') == (hits, misses)
+        dao.rollback()
+
+        # 回滾不遞增代號，回滾前緩存的條目仍然有效且是已提交的值
+        assert dao.get_fields_by_id(1, ['name']) == before == {'name': '機會0'}
+        assert _lookups('records') == (hits + 1, misses)
+        db.session.remove()
+
+    assert client.get(f'{URL}/1', headers=headers).get_json()['name'] == '機會0'
@@ -0,0 +1,103 @@
+# crm_project/tests/test_changes.py
+
+"""增量同步（since=）：按變更序列號分頁讀取創建、更新與刪除墓碑，since 斷點續讀不重複不遺漏"""
+
+import threading
+
+import pytest
+
+URL = '/api/sales/opportunities'
+
+
+@pytest.fixture
+def headers(client, auth):
+    headers = auth()
+    for i in range(5):
+        client.post(URL, headers=headers, json={'name': f'機會{i}', 'customer_name': '客戶', 'amount': 100})
+    return headers
+
+
+def _sync(client, headers, since, **args):
+    """從since讀完全部頁，返回各項、頁數與下次同步的起點"""
+    items, pages, after = [], 0, None
+    while True:
+        query = dict(args, since=since, **({'after': after} if after else {}))
+        response = client.get(f'{URL}/changes', headers=headers, query_string=query)
+        assert response.status_code == 200
+        page = response.get_json()
+        items.extend(page['items'])
+        pages += 1
+        after = page['next_cursor']
+        if after is None:
+            return items, pages, page['since']
+        assert page['since'] is None
+
+
+def test_sync_pages_and_resumes_from_since(client, headers):
+    items, pages, since = _sync(client, headers, 0, limit=2)
+    assert [item['id'] for item in items] == [1, 2, 3, 4, 5]
+    assert pages == 3
+    seqs = [item['change_seq'] for item in items]
+    assert seqs == sorted(set(seqs)) and since == seqs[-1]
+    assert not any(item['deleted'] for item in items)
+
+    # 沒有新變更時返回空頁，起點不變
+    assert _sync(client, headers, since) == ([], 1, since)
+
+
+def test_updates_and_deletes_appear_after_since(client, headers):
+    _, _, since = _sync(client, headers, 0)
+    client.put(f'{URL}/2', headers=headers, json={'stage': '成交'})
+    client.delete(f'{URL}/4', headers=headers)
+    client.post(f'{URL}:batch', headers=headers, json={'operations': [
+        {'op': 'update', 'id': 1, 'data': {'amount': 5}},
+        {'op': 'delete', 'id': 5},
+        {'op': 'create', 'data': {'name': '新機會', 'customer_name': '客戶', 'amount': 1}},
+    ]})
+
+    items, _, new_since = _sync(client, headers, since, limit=2, fields='stage,amount')
+    assert [(item['id'], item['deleted']) for item in items] == [
+        (2, False), (4, True), (6, False), (1, False), (5, True),
+    ]
+    assert all(item['change_seq'] > since for item in items)
+    assert new_since == max(item['change_seq'] for item in items)
+    assert items[0]['stage'] == '成交' and items[3]['amount'] == 5
+    # 墓碑只帶id、序列號與刪除時間
+    assert set(items[1]) == {'id', 'change_seq', 'deleted_at', 'deleted'}
+
+    # 同一行多次變更只以最新的序列號出現一次
+    client.put(f'{URL}/2', headers=headers, json={'stage': '失敗'})
+    client.put(f'{URL}/2', headers=headers, json={'stage': '談判中'})
+    items, _, _ = _sync(client, headers, new_since)
+    assert [(item['id'], item['stage']) for item in items] == [(2, '談判中')]
+
+
+@pytest.mark.parametrize('since', ['-1', 'abc'])
+def test_invalid_since_is_rejected(client, headers, since):
+    response = client.get(f'{URL}/changes', headers=headers, query_string={'since': since})
+    assert response.status_code == 400
+
+
+def test_concurrent_first_use_of_sequence(app):
+    """計數器行尚不存在時併發取號：不因主鍵衝突失敗，序列號不重複"""
+    from dao.sales_dao import sales_changes
+    from extensions import db
+
+    seqs, errors = [], []
+
+    def take():
+        with app.app_context():
+            try:
+                for _ in range(10):
+                    seqs.append(sales_changes.next_seq())
+                    db.session.commit()
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=take) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert sorted(seqs) == list(range(1, 81))
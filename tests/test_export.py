@@ -0,0 +1,65 @@
+# crm_project/tests/test_export.py
+
+"""流式導出：NDJSON與CSV的內容與列表一致，第一塊較小，無效參數在響應開始前返回400"""
+
+import csv
+import io
+import json
+
+import pytest
+
+from services.sales_service import SalesService
+
+URL = '/api/sales/opportunities'
+
+
+@pytest.fixture
+def headers(client, auth):
+    headers = auth()
+    response = client.post(f'{URL}:batch', headers=headers, json={'operations': [
+        {'op': 'create', 'data': {'name': f'機會{i}', 'customer_name': '客戶', 'amount': i + 0.5,
+                                  'stage': '成交' if i % 2 else '初期'}}
+        for i in range(250)
+    ]})
+    assert response.status_code == 200
+    return headers
+
+
+def _chunks(client, headers, **query):
+    response = client.get(f'{URL}/export', headers=headers, query_string=query, buffered=False)
+    assert response.status_code == 200
+    chunks = [chunk.decode('utf-8') for chunk in response.response]
+    response.close()
+    return chunks
+
+
+def test_ndjson_matches_list(client, headers):
+    chunks = _chunks(client, headers, stage='成交')
+    rows = [json.loads(line) for line in ''.join(chunks).splitlines()]
+    listed = client.get(URL, headers=headers, query_string={'stage': '成交', 'limit': 200}).get_json()['items']
+    assert rows == listed
+    # 第一塊只含 EXPORT_FIRST_CHUNK_SIZE 行
+    assert [chunk.count('\n') for chunk in chunks] == [SalesService.EXPORT_FIRST_CHUNK_SIZE, 25]
+
+
+def test_csv_has_header_and_iso_dates(make_app, auth):
+    client = make_app(EXPORT_CHUNK_SIZE=2).test_client()
+    headers = auth()
+    for i in range(5):
+        client.post(URL, headers=headers, json={'name': f'機會,{i}', 'customer_name': '客戶', 'amount': 10})
+
+    chunks = _chunks(client, headers, format='csv')
+    # 表頭單獨一塊，之後每塊 EXPORT_CHUNK_SIZE 行
+    assert [chunk.count('\n') for chunk in chunks] == [1, 2, 2, 1]
+    rows = list(csv.reader(io.StringIO(''.join(chunks))))
+    assert rows[0] == list(SalesService.EXPORT_FIELDS)
+    assert [row[0] for row in rows[1:]] == ['1', '2', '3', '4', '5']
+    assert rows[1][1] == '機會,0'
+    item = client.get(f'{URL}/1', headers=headers).get_json()
+    assert rows[1][5] == item['created_at'] and 'T' in rows[1][5]
+
+
+@pytest.mark.parametrize('query', [{'format': 'xml'}, {'q': '!!!'}])
+def test_invalid_export_is_rejected(client, headers, query):
+    response = client.get(f'{URL}/export', headers=headers, query_string=query)
+    assert response.status_code == 400
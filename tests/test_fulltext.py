@@ -0,0 +1,70 @@
+# crm_project/tests/test_fulltext.py
+
+"""全文檢索（q=）：中文任意子串、英文前綴，影子表隨創建、更新、刪除同步"""
+
+import pytest
+
+URL = '/api/sales/opportunities'
+
+
+@pytest.fixture
+def seeded(client, auth):
+    headers = auth()
+    for name, customer in [('王小明的年度合約', '台灣科技'), ('Acme renewal', '大同公司'), ('小明續約', 'Acme Corp')]:
+        client.post(URL, headers=headers, json={'name': name, 'customer_name': customer, 'amount': 1000})
+    return headers
+
+
+def _search(client, headers, q):
+    response = client.get(URL, headers=headers, query_string={'q': q})
+    assert response.status_code == 200
+    return sorted(item['id'] for item in response.get_json()['items'])
+
+
+@pytest.mark.parametrize('q, expected', [
+    ('小明', [1, 3]),
+    ('年度合', [1]),
+    ('科技', [1]),
+    ('acm', [2, 3]),
+    ('ACME renew', [2]),
+    ('小明 acme', [3]),
+    ('明小', []),
+    ('cme', []),
+])
+def test_substring_and_prefix_matches(client, seeded, q, expected):
+    assert _search(client, seeded, q) == expected
+
+
+def test_index_follows_updates_and_deletes(client, seeded):
+    assert client.put(f'{URL}/1', headers=seeded, json={'name': '李大華的合約'}).status_code == 200
+    assert _search(client, seeded, '小明') == [3]
+    assert _search(client, seeded, '大華') == [1]
+    # 未修改的字段仍在索引中
+    assert _search(client, seeded, '台灣') == [1]
+
+    assert client.delete(f'{URL}/3', headers=seeded).status_code == 200
+    assert _search(client, seeded, '小明') == []
+    assert _search(client, seeded, 'acme') == [2]
+
+
+def test_index_follows_batch_operations(client, seeded):
+    response = client.post(f'{URL}:batch', headers=seeded, json={'operations': [
+        {'op': 'create', 'data': {'name': '小明追加採購', 'customer_name': '客戶', 'amount': 10}},
+        {'op': 'update', 'id': 2, 'data': {'customer_name': '小明企業'}},
+        {'op': 'delete', 'id': 1},
+    ]})
+    assert response.status_code == 200
+    assert _search(client, seeded, '小明') == [2, 3, 4]
+
+
+def test_rebuild_matches_incremental_index(app, client, seeded):
+    before = {q: _search(client, seeded, q) for q in ('小明', 'acme', '公司')}
+    result = app.test_cli_runner().invoke(args=['rebuild-search-index'])
+    assert result.exit_code == 0
+    assert '3 條' in result.output
+    assert {q: _search(client, seeded, q) for q in before} == before
+
+
+def test_blank_query_is_rejected(client, seeded):
+    response = client.get(URL, headers=seeded, query_string={'q': '!!!'})
+    assert response.status_code == 400
@@ -0,0 +1,70 @@
+# crm_project/tests/test_pagination.py
+
+"""游標分頁：同值排序鍵按id決勝，翻頁不重複不遺漏；無效或與排序不匹配的游標返回400"""
+
+import pytest
+
+URL = '/api/sales/opportunities'
+
+
+@pytest.fixture
+def seeded(client, auth):
+    headers = auth()
+    # 只有3種金額，大量同值行跨越頁邊界
+    for i in range(17):
+        response = client.post(URL, headers=headers, json={
+            'name': f'機會{i}', 'customer_name': f'客戶{i % 4}', 'amount': 1000 * (i % 3 + 1),
+        })
+        assert response.status_code == 201
+    return headers
+
+
+def _walk(client, headers, **args):
+    """沿 next_cursor 讀完全部頁，返回各行與頁數"""
+    items, pages, after = [], 0, None
+    while True:
+        query = dict(args, **({'after': after} if after else {}))
+        response = client.get(URL, headers=headers, query_string=query)
+        assert response.status_code == 200
+        page = response.get_json()
+        items.extend(page['items'])
+        pages += 1
+        after = page['next_cursor']
+        if after is None:
+            return items, pages
+
+
+@pytest.mark.parametrize('sort, key', [
+    ('amount', lambda item: (item['amount'], item['id'])),
+    ('-amount', lambda item: (-item['amount'], -item['id'])),
+    ('created_at', lambda item: (item['created_at'], item['id'])),
+    (None, lambda item: item['id']),
+], ids=['amount', '-amount', 'created_at', 'default'])
+def test_cursor_round_trip_across_ties(client, seeded, sort, key):
+    args = {'limit': 4, **({'sort': sort} if sort else {})}
+    items, pages = _walk(client, seeded, **args)
+    ids = [item['id'] for item in items]
+    assert sorted(ids) == list(range(1, 18))
+    assert items == sorted(items, key=key)
+    assert pages == 5
+
+
+def test_cursor_pages_with_selected_fields(client, seeded):
+    items, _ = _walk(client, seeded, limit=5, sort='amount', fields='name')
+    assert len(items) == 17
+    # 為生成游標額外查詢的排序鍵不出現在響應中
+    assert all(set(item) == {'name'} for item in items)
+
+
+@pytest.mark.parametrize('after', ['!!!', 'bm90LWpzb24', 'eyJzIjoiaWQiLCJ2Ijo1fQ'])
+def test_malformed_cursor_is_rejected(client, seeded, after):
+    response = client.get(URL, headers=seeded, query_string={'after': after})
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+def test_cursor_from_another_sort_is_rejected(client, seeded):
+    page = client.get(URL, headers=seeded, query_string={'limit': 4, 'sort': 'amount'}).get_json()
+    response = client.get(URL, headers=seeded, query_string={'after': page['next_cursor'], 'sort': '-amount'})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == "分頁游標與排序條件不匹配"
@@ -0,0 +1,113 @@
+# crm_project/tests/test_rate_limit.py
+
+"""令牌桶的補充與扣除、429及 Retry-After、按負載丟棄請求"""
+
+import types
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from utils import rate_limit
+from utils.rate_limit import MemoryBucketStore, SQLiteBucketStore, rate_limiter
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit, 'time', types.SimpleNamespace(time=clock.time, perf_counter=clock.time))
+    return clock
+
+
+def _headers(app, identity):
+    with app.app_context():
+        return {'Authorization': f"Bearer {create_access_token(identity=identity)}"}
+
+
+@pytest.fixture
+def limited(make_app):
+    """容量為3、每秒補充1個令牌，按ID讀取扣1個、列表扣2個"""
+    return make_app(
+        RATE_LIMIT_ENABLED=True,
+        RATE_LIMIT_STORAGE='memory',
+        RATE_LIMIT_CAPACITY=3,
+        RATE_LIMIT_REFILL_PER_SECOND=1.0,
+        RATE_LIMIT_COSTS={'read': 1, 'write': 1, 'search': 2, 'scan': 2, 'batch': 2, 'export': 2},
+        RATE_LIMIT_SHED_LATENCY_MS=100,
+        RATE_LIMIT_SHED_QUEUE_DEPTH=1,
+    )
+
+
+@pytest.mark.parametrize('store_factory', [
+    lambda tmp_path: MemoryBucketStore(),
+    lambda tmp_path: SQLiteBucketStore(str(tmp_path / 'rate_limit.db')),
+], ids=['memory', 'sqlite'])
+def test_bucket_refills_over_time(clock, tmp_path, store_factory):
+    store = store_factory(tmp_path)
+    assert store.take('user:a', 2, 3, 1.0) == (True, 1.0)
+    assert store.take('user:a', 2, 3, 1.0) == (False, 1.0)
+    clock.now += 1.5
+    assert store.take('user:a', 2, 3, 1.0) == (True, 0.5)
+    # 補充不超過容量
+    clock.now += 100
+    assert store.take('user:a', 1, 3, 1.0) == (True, 2.0)
+    # 各身份的桶互不影響
+    assert store.take('user:b', 3, 3, 1.0) == (True, 0.0)
+
+
+def test_sqlite_store_is_shared_between_workers(clock, tmp_path):
+    """兩個存儲實例（模擬兩個worker）使用同一文件時共用限額"""
+    path = str(tmp_path / 'rate_limit.db')
+    assert SQLiteBucketStore(path).take('user:a', 3, 3, 1.0) == (True, 0.0)
+    assert SQLiteBucketStore(path).take('user:a', 1, 3, 1.0) == (False, 0.0)
+
+
+def test_exhausted_bucket_returns_429_with_retry_after(limited):
+    client = limited.test_client()
+    headers, other = _headers(limited, 'alice'), _headers(limited, 'bob')
+
+    assert client.get('/api/sales/opportunities/1', headers=headers).status_code == 404
+    assert client.get('/api/sales/opportunities', headers=headers).status_code == 200
+    response = client.get('/api/sales/opportunities', headers=headers)
+    assert response.status_code == 429
+    # 餘額約為0、需要2個令牌、每秒補充1個
+    assert response.headers['Retry-After'] == '2'
+    # 其他身份不受影響
+    assert client.get('/api/sales/opportunities', headers=other).status_code == 200
+
+
+def test_overloaded_worker_sheds_expensive_requests(limited, monkeypatch):
+    client = limited.test_client()
+    headers = _headers(limited, 'alice')
+
+    # 延遲移動平均遠高於閾值；隊列深度為1，本請求自身即達到深度
+    monkeypatch.setattr(rate_limiter, '_latency', 10.0)
+    response = client.get('/api/sales/opportunities', headers=headers)
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    # 最便宜一檔的請求不丟棄
+    assert client.get('/api/sales/opportunities/1', headers=headers).status_code == 404
+    assert rate_limiter._inflight == 0
+
+    # 延遲恢復後不再丟棄
+    monkeypatch.setattr(rate_limiter, '_latency', 0.0)
+    assert client.get('/api/sales/opportunities', headers=headers).status_code == 200
+
+
+def test_streamed_response_counts_as_inflight_until_closed(limited):
+    client = limited.test_client()
+    headers = _headers(limited, 'alice')
+
+    response = client.get('/api/sales/opportunities/export', headers=headers, buffered=False)
+    assert response.status_code == 200
+    assert rate_limiter._inflight == 1
+    response.get_data()
+    response.close()
+    assert rate_limiter._inflight == 0
@@ -0,0 +1,71 @@
+# crm_project/tests/test_replication.py
+
+"""讀寫分離的讀你所寫：按JWT身份記錄最近一次寫入，寫入者讀主庫、其他用戶讀副本，不下發cookie"""
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from dao.cache import MmapGenerationStore, dao_cache
+from extensions import db
+from models.sales import SalesOpportunity
+from utils.replication import LAST_WRITE_KEY, replica_router
+
+URL = '/api/sales/opportunities'
+
+
+@pytest.fixture
+def replicated(make_app, tmp_path):
+    app = make_app(
+        SQLALCHEMY_BINDS={'replica_0': f"sqlite:///{tmp_path / 'replica.db'}"},
+        DATABASE_READ_BINDS=['replica_0'],
+        CACHE_GENERATION_STORE='mmap',
+    )
+    assert app.test_cli_runner().invoke(args=['replicate', '--once']).exit_code == 0
+    return app
+
+
+def _headers(app, identity):
+    with app.app_context():
+        return {'Authorization': f"Bearer {create_access_token(identity=identity)}"}
+
+
+def _ids(client, headers):
+    response = client.get(URL, headers=headers)
+    assert response.status_code == 200
+    return [item['id'] for item in response.get_json()['items']]
+
+
+def test_writer_reads_primary_and_others_read_replica(replicated):
+    client = replicated.test_client()
+    alice, bob = _headers(replicated, 'alice'), _headers(replicated, 'bob')
+
+    response = client.post(URL, headers=alice, json={'name': '機會', 'customer_name': '客戶', 'amount': 1})
+    assert response.status_code == 201
+    assert 'Set-Cookie' not in response.headers
+
+    # 寫入尚未複製到副本：寫入者固定讀主庫，其他用戶讀副本
+    assert _ids(client, alice) == [1]
+    assert _ids(client, bob) == []
+
+    # 同一主機上的其他worker通過共享的代計數器文件看到這次寫入
+    slot = dao_cache.slot(f'{LAST_WRITE_KEY}:alice')
+    other_worker = MmapGenerationStore(replicated.config['CACHE_GENERATION_PATH'], dao_cache.slots)
+    assert other_worker.get(slot) == dao_cache.store.get(slot) > 0
+    assert other_worker.get(dao_cache.slot(f'{LAST_WRITE_KEY}:bob')) == 0
+
+
+def test_reads_return_to_replica_after_window(replicated, monkeypatch):
+    client = replicated.test_client()
+    alice = _headers(replicated, 'alice')
+    client.post(URL, headers=alice, json={'name': '機會', 'customer_name': '客戶', 'amount': 1})
+    assert replicated.test_cli_runner().invoke(args=['replicate', '--once']).exit_code == 0
+
+    with replicated.app_context():
+        # 其他來源的寫入（不在請求中）只進入主庫
+        db.session.add(SalesOpportunity(name='未複製', customer_name='客戶', amount=2))
+        db.session.commit()
+
+    # 窗口結束後讀取已複製到這次寫入的副本
+    monkeypatch.setattr(replica_router, 'sticky_seconds', 0)
+    monkeypatch.setattr(replica_router, 'lag_check_interval', 0)
+    assert _ids(client, alice) == [1]
@@ -0,0 +1,64 @@
+# crm_project/tests/test_summary.py
+
+"""銷售漏斗匯總表隨單條與批量寫入增量維護，與 rebuild-summary 重算的結果一致"""
+
+import pytest
+from sqlalchemy import text
+
+from extensions import db
+
+URL = '/api/sales/opportunities'
+
+
+def _check(app):
+    return app.test_cli_runner().invoke(args=['rebuild-summary', '--check'])
+
+
+def _stages(client, headers):
+    summary = client.get('/api/sales/summary', headers=headers).get_json()
+    return {row['stage']: (row['count'], row['total_amount']) for row in summary['stages']}
+
+
+@pytest.fixture
+def headers(client, auth):
+    headers = auth()
+    for i in range(4):
+        client.post(URL, headers=headers, json={
+            'name': f'機會{i}', 'customer_name': '客戶', 'amount': 100 * (i + 1), 'stage': '初期' if i % 2 else '跟進中',
+        })
+    return headers
+
+
+def test_summary_has_no_drift_after_writes(app, client, headers):
+    client.put(f'{URL}/1', headers=headers, json={'stage': '成交', 'amount': 150})
+    client.put(f'{URL}/2', headers=headers, json={'name': '不影響匯總'})
+    client.delete(f'{URL}/3', headers=headers)
+    client.post(f'{URL}:batch', headers=headers, json={'operations': [
+        {'op': 'create', 'data': {'name': '批量', 'customer_name': '客戶', 'amount': 50, 'stage': '成交'}},
+        {'op': 'update', 'id': 4, 'data': {'stage': '失敗'}},
+        {'op': 'update', 'id': 2, 'data': {'amount': 250}},
+        {'op': 'delete', 'id': 99},
+    ]})
+
+    result = _check(app)
+    assert result.exit_code == 0, result.output
+    assert "匯總表與銷售機會一致" in result.output
+    # 數量歸零的階段保留為0或不出現均可，只比較非零項
+    stages = {stage: value for stage, value in _stages(client, headers).items() if value[0]}
+    assert stages == {'成交': (2, 200.0), '初期': (1, 250.0), '失敗': (1, 400.0)}
+
+
+def test_check_reports_drift_and_rebuild_repairs_it(app, client, headers):
+    with app.app_context():
+        db.session.execute(text("UPDATE sales_summary SET count = count + 5 WHERE dimension = 'stage'"))
+        db.session.commit()
+
+    result = _check(app)
+    assert result.exit_code == 1
+    assert "發現 2 處漂移" in result.output
+
+    result = app.test_cli_runner().invoke(args=['rebuild-summary'])
+    assert result.exit_code == 0
+    assert "修正 2 處漂移" in result.output
+    assert _check(app).exit_code == 0
+    assert _stages(client, headers) == {'初期': (2, 600.0), '跟進中': (2, 400.0)}
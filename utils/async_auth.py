@@ -0,0 +1,39 @@
+# crm_project/utils/async_auth.py
+
+from functools import wraps
+
+import jwt
+from quart import current_app, g, jsonify, request
+
+def jwt_required():
+    """
+    ASGI路由的JWT認證裝飾器，用法與 flask_jwt_extended.jwt_required 相同
+    校驗由 /api/auth/login 簽發的訪問令牌（共用 JWT_SECRET_KEY），失敗時返回401
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(*args, **kwargs):
+            header = request.headers.get("Authorization", "")
+            scheme, _, token = header.partition(" ")
+            if scheme != "Bearer" or not token:
+                return jsonify({"msg": "Missing Authorization Header"}), 401
+            try:
+                claims = jwt.decode(
+                    token,
+                    current_app.config["JWT_SECRET_KEY"],
+                    algorithms=[current_app.config.get("JWT_ALGORITHM", "HS256")],
+                )
+            except jwt.ExpiredSignatureError:
+                return jsonify({"msg": "Token has expired"}), 401
+            except jwt.InvalidTokenError as e:
+                return jsonify({"msg": str(e)}), 401
+            if claims.get("type") != "access":
+                return jsonify({"msg": "Only non-refresh tokens are allowed"}), 401
+            g.jwt_claims = claims
+            return await view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def get_jwt_identity():
+    """當前請求令牌中的用戶身份"""
+    return g.jwt_claims.get("sub")
@@ -0,0 +1,67 @@
+# crm_project/utils/async_database.py
+
+from asyncio import current_task
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import async_scoped_session, async_sessionmaker, create_async_engine
+
+from utils.database import apply_engine_profile, engine_options
+
+# 各數據庫對應的異步驅動
+ASYNC_DRIVERS = {
+    'sqlite': 'aiosqlite',
+    'postgresql': 'asyncpg',
+    'mysql': 'aiomysql',
+}
+
+
+def async_url(url):
+    """將同步數據庫URL轉換為對應異步驅動的URL，例如 sqlite:///app.db -> sqlite+aiosqlite:///app.db"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"不支持異步訪問的數據庫: {backend}")
+    return url.set(drivername=f'{backend}+{ASYNC_DRIVERS[backend]}')
+
+
+class AsyncDatabase:
+    """
+    ASGI應用使用的異步數據庫引擎與會話
+    引擎與同步應用共用 SQLALCHEMY_DATABASE_URI 和數據庫配置檔；
+    session 按asyncio任務隔離（每個請求一個會話），請求結束時自動關閉
+    """
+
+    def __init__(self, app=None):
+        self.engine = None
+        self.session = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        url = async_url(app.config['SQLALCHEMY_DATABASE_URI'])
+        options = engine_options(app.config)
+        if url.get_backend_name() == 'sqlite' and 'pool_size' in options:
+            # aiosqlite默認每次新建連接（NullPool），按配置檔改用連接池以復用已執行PRAGMA的連接
+            options.setdefault('poolclass', AsyncAdaptedQueuePool)
+        self.engine = create_async_engine(url, **options)
+        # 連接事件註冊在底層的同步引擎上，SQLite PRAGMA 與同步應用一致
+        apply_engine_profile(self.engine.sync_engine, app.config)
+        self.session = async_scoped_session(
+            async_sessionmaker(self.engine, expire_on_commit=False), scopefunc=current_task
+        )
+        app.teardown_request(self._remove_session)
+
+    @property
+    def dialect_name(self):
+        return self.engine.dialect.name
+
+    async def _remove_session(self, exc=None):
+        await self.session.remove()
+
+    async def dispose(self):
+        await self.engine.dispose()
+
+
+# 全局單例，在asgi.py中綁定應用
+async_db = AsyncDatabase()
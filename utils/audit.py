@@ -0,0 +1,366 @@
+# crm_project/utils/audit.py
+
+import atexit
+import collections
+import datetime
+import decimal
+import logging
+import os
+import threading
+import time
+
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import create_engine, event, insert, inspect, select
+from sqlalchemy.orm import Session
+
+from utils.database import apply_engine_profile, engine_options
+
+logger = logging.getLogger(__name__)
+
+# 會話 info 中保存本事務待寫入的變更的鍵
+PENDING_KEY = 'audit_pending'
+
+
+def _jsonable(value):
+    """把列值轉換為可寫入JSON列的值"""
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    return value
+
+
+def _diff(before, after):
+    """比較兩組字段值，返回 {字段: [舊值, 新值]}，只包含發生變化的字段"""
+    return {
+        field: [_jsonable(before.get(field)), _jsonable(after.get(field))]
+        for field in dict.fromkeys([*before, *after]) if before.get(field) != after.get(field)
+    }
+
+
+class AuditTrail:
+    """
+    寫後（write-behind）審計：記錄帶有 AUDITED_FIELDS 的模型的字段級變更
+    - 變更在會話中捕獲：flush 時從對象的屬性歷史讀取舊值與新值；
+      DAO的批量INSERT/UPDATE/DELETE不經過flush，在語句執行前後按主鍵讀取受影響的行；
+    - 事務提交後變更才進入進程內的有界緩衝區，回滾時丟棄，請求線程不等待審計表的寫入；
+    - 後台線程每攢夠 AUDIT_BATCH_SIZE 條或每隔 AUDIT_FLUSH_INTERVAL 秒以一條executemany批量寫入；
+    - 背壓：緩衝區已滿時提交方最多等待 AUDIT_ENQUEUE_TIMEOUT 秒，仍無空位則在當前線程內直接寫入一次，
+      失敗時不重試，直接丟棄並計入 dropped，請求線程不會陷入退避等待；
+    - 寫入線程寫入失敗時以指數退避重試 AUDIT_WRITE_RETRIES 次；仍失敗的批次會丟失，
+      記錯誤日誌並計入 stats() 的 dropped（見 /api/sales/audit/metrics）；
+    - 進程退出（atexit、gunicorn worker_exit）時寫完緩衝區中剩餘的變更
+    寫入使用獨立的小連接池，不佔用請求的數據庫連接
+    """
+
+    def __init__(self, app=None, identity=None):
+        self.enabled = False
+        self.queue_size = 10000
+        self.batch_size = 500
+        self.flush_interval = 1.0
+        self.enqueue_timeout = 0.5
+        self.write_retries = 5
+        self.retry_backoff = 0.1
+        self.written = 0
+        self.retried = 0
+        self.dropped = 0
+        self.identity = get_jwt_identity
+        self._config = None
+        self._engine = None
+        self._table = None
+        self._table_ready = False
+        self._buffer = collections.deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._pid = None
+        self._stopping = False
+        self._inflight = 0
+        self._flushing = 0
+        self._listening = False
+        if app is not None:
+            self.init_app(app, identity)
+
+    def init_app(self, app, identity=None):
+        """
+        :param identity: 返回當前用戶身份的函數，默認為 flask_jwt_extended.get_jwt_identity；
+                         ASGI應用傳入 utils.async_auth.get_jwt_identity
+        """
+        from models.audit import AuditLog
+
+        # 同一進程中再次創建應用時（測試、基準腳本），先把緩衝區寫入之前配置的數據庫
+        self.flush()
+        self.enabled = app.config['AUDIT_ENABLED']
+        self.queue_size = app.config['AUDIT_QUEUE_SIZE']
+        self.batch_size = app.config['AUDIT_BATCH_SIZE']
+        self.flush_interval = app.config['AUDIT_FLUSH_INTERVAL']
+        self.enqueue_timeout = app.config['AUDIT_ENQUEUE_TIMEOUT']
+        self.write_retries = app.config['AUDIT_WRITE_RETRIES']
+        self.retry_backoff = app.config['AUDIT_RETRY_BACKOFF']
+        self.identity = identity or get_jwt_identity
+        self._config = app.config
+        self._table = AuditLog.__table__
+        if self._engine is not None:
+            self._engine.dispose()
+        self._engine = None
+        self._table_ready = False
+
+        if not self._listening:
+            # 監聽會話基類，同時覆蓋同步應用的 RoutingSession 與 AsyncSession 內部的同步會話
+            event.listen(Session, 'after_flush', self._after_flush)
+            event.listen(Session, 'do_orm_execute', self._on_execute)
+            event.listen(Session, 'after_commit', self._after_commit)
+            event.listen(Session, 'after_rollback', self._after_rollback)
+            self._listening = True
+
+    # 捕獲變更
+
+    @staticmethod
+    def _audited_fields(mapper):
+        return getattr(mapper.class_, 'AUDITED_FIELDS', None) if mapper is not None else None
+
+    @staticmethod
+    def _record(session, mapper, entity_id, action, changes):
+        if changes or action != 'update':
+            session.info.setdefault(PENDING_KEY, []).append(
+                (mapper.local_table.name, entity_id, action, changes)
+            )
+
+    def _after_flush(self, session, flush_context):
+        if not self.enabled:
+            return
+        for action, objects in (('create', session.new), ('update', session.dirty), ('delete', session.deleted)):
+            for obj in objects:
+                state = inspect(obj)
+                fields = self._audited_fields(state.mapper)
+                if not fields:
+                    continue
+                if action == 'update':
+                    changes = {}
+                    for field in fields:
+                        history = state.attrs[field].history
+                        if history.added or history.deleted:
+                            old = history.deleted[0] if history.deleted else None
+                            new = history.added[0] if history.added else None
+                            if old != new:
+                                changes[field] = [_jsonable(old), _jsonable(new)]
+                else:
+                    # 讀取已加載的值，不為已刪除的行觸發加載
+                    values = {field: state.dict.get(field) for field in fields}
+                    changes = _diff({}, values) if action == 'create' else _diff(values, {})
+                entity_id = state.mapper.primary_key_from_instance(obj)[0]
+                self._record(session, state.mapper, entity_id, action, changes)
+
+    def _on_execute(self, orm_execute_state):
+        """記錄ORM批量INSERT/UPDATE/DELETE語句的變更"""
+        state = orm_execute_state
+        if not self.enabled or not (state.is_insert or state.is_update or state.is_delete):
+            return None
+        mapper = state.bind_mapper
+        fields = self._audited_fields(mapper)
+        if not fields:
+            return None
+        session, statement, params = state.session, state.statement, state.parameters
+        pk = mapper.primary_key[0]
+
+        if state.is_insert:
+            names = [column['name'] for column in statement.returning_column_descriptions]
+            if pk.key not in names:
+                # 沒有RETURNING主鍵的INSERT無法確定新行，不記錄
+                return None
+            # 凍結結果後讀取新行主鍵，再返回一份副本給調用方
+            frozen = state.invoke_statement().freeze()
+            ids = [row[names.index(pk.key)] for row in frozen()]
+            for entity_id, values in self._snapshot(session, pk, fields, ids).items():
+                self._record(session, mapper, entity_id, 'create', _diff({}, values))
+            return frozen()
+
+        if isinstance(params, list):
+            # 按主鍵批量UPDATE，每組參數包含主鍵
+            ids = [row[pk.key] for row in params]
+        else:
+            query = select(pk)
+            if statement.whereclause is not None:
+                query = query.where(statement.whereclause)
+            ids = list(session.scalars(query))
+        before = self._snapshot(session, pk, fields, ids)
+        result = state.invoke_statement()
+        if state.is_delete:
+            for entity_id, values in before.items():
+                self._record(session, mapper, entity_id, 'delete', _diff(values, {}))
+        else:
+            after = self._snapshot(session, pk, fields, list(before))
+            for entity_id, values in after.items():
+                self._record(session, mapper, entity_id, 'update', _diff(before[entity_id], values))
+        return result
+
+    @staticmethod
+    def _snapshot(session, pk, fields, ids, chunk_size=500):
+        """在當前事務中讀取主鍵對應行的字段值，返回 {主鍵: {字段: 值}}"""
+        table = pk.table
+        columns = [table.c[field] for field in fields]
+        values = {}
+        ids = list(dict.fromkeys(ids))
+        for start in range(0, len(ids), chunk_size):
+            query = select(pk, *columns).where(pk.in_(ids[start:start + chunk_size]))
+            for row in session.execute(query):
+                values[row[0]] = dict(zip(fields, row[1:]))
+        return values
+
+    def _after_commit(self, session):
+        pending = session.info.pop(PENDING_KEY, None)
+        if pending:
+            actor = self._actor()
+            changed_at = datetime.datetime.utcnow()
+            self.enqueue([
+                {'entity_type': entity_type, 'entity_id': entity_id, 'action': action,
+                 'changes': changes, 'actor': actor, 'changed_at': changed_at}
+                for entity_type, entity_id, action, changes in pending
+            ])
+
+    def _after_rollback(self, session):
+        session.info.pop(PENDING_KEY, None)
+
+    def _actor(self):
+        try:
+            identity = self.identity()
+        except (RuntimeError, AttributeError):
+            # 不在請求中（命令行、後台任務）或請求未經認證
+            return None
+        return None if identity is None else str(identity)
+
+    # 緩衝與寫入
+
+    def enqueue(self, rows):
+        """把已提交的變更放入緩衝區；緩衝區在等待 enqueue_timeout 後仍無空位時直接寫入一次（不重試）"""
+        with self._cond:
+            if self._ensure_writer():
+                self._cond.wait_for(
+                    lambda: len(self._buffer) + len(rows) <= self.queue_size or self._stopping,
+                    self.enqueue_timeout,
+                )
+                if len(self._buffer) + len(rows) <= self.queue_size and not self._stopping:
+                    self._buffer.extend(rows)
+                    self._cond.notify_all()
+                    return
+        if self.queue_size:
+            # 緩衝區大小為0表示有意在提交方線程內同步寫入
+            logger.warning("審計緩衝區已滿或寫入線程未運行，在當前線程內寫入 %d 條變更", len(rows))
+        # 重試及其退避等待只在寫入線程中進行，提交方只嘗試一次
+        self._write(rows, retries=0)
+
+    def _ensure_writer(self):
+        """在當前進程中啟動寫入線程（調用方持有鎖），已停止時返回False"""
+        if self._pid != os.getpid():
+            # 預派生（prefork）部署中每個worker進程各自啟動寫入線程；fork繼承的緩衝區屬於父進程
+            self._buffer.clear()
+            self._inflight = 0
+            self._stopping = False
+            self._engine = None
+            self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._thread.start()
+            if self._pid is None:
+                atexit.register(self.shutdown)
+            self._pid = os.getpid()
+        return not self._stopping
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._buffer or self._stopping)
+                if not self._buffer:
+                    return
+                # 不足一批時等到攢夠一批、超時、要求刷新或停止
+                self._cond.wait_for(
+                    lambda: len(self._buffer) >= self.batch_size or self._flushing or self._stopping,
+                    self.flush_interval,
+                )
+                batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+                self._inflight += len(batch)
+                self._cond.notify_all()
+            try:
+                self._write(batch)
+            finally:
+                with self._cond:
+                    self._inflight -= len(batch)
+                    self._cond.notify_all()
+
+    def _write(self, rows, retries=None):
+        """
+        寫入一批變更，失敗時以指數退避重試；重試用盡後丟棄該批並計入 dropped，返回是否寫入成功
+        :param retries: 重試次數，默認為 write_retries
+        """
+        retries = self.write_retries if retries is None else retries
+        for attempt in range(retries + 1):
+            try:
+                engine = self._get_engine()
+                with engine.begin() as connection:
+                    if not self._table_ready:
+                        # 已有數據庫升級後首次寫入時創建審計表
+                        self._table.create(connection, checkfirst=True)
+                        self._table_ready = True
+                    connection.execute(insert(self._table), rows)
+            except Exception:
+                if attempt == retries:
+                    with self._cond:
+                        self.dropped += len(rows)
+                    logger.exception("寫入 %d 條審計記錄失敗，已重試 %d 次，丟棄這些記錄", len(rows), attempt)
+                    return False
+                delay = self.retry_backoff * 2 ** attempt
+                logger.warning("寫入 %d 條審計記錄失敗，%.2f 秒後重試", len(rows), delay, exc_info=True)
+                with self._cond:
+                    self.retried += 1
+                time.sleep(delay)
+            else:
+                with self._cond:
+                    self.written += len(rows)
+                return True
+
+    def stats(self):
+        """當前進程的審計寫入統計：緩衝中、寫入中、已寫入、重試次數與重試用盡後丟棄的條數"""
+        with self._cond:
+            return {
+                'buffered': len(self._buffer),
+                'inflight': self._inflight,
+                'written': self.written,
+                'retried': self.retried,
+                'dropped': self.dropped,
+            }
+
+    def _get_engine(self):
+        if self._engine is None:
+            options = engine_options(self._config)
+            if 'pool_size' in options:
+                # 只有寫入線程（以及緩衝區已滿時的提交方）使用
+                options.update(pool_size=1, max_overflow=4)
+            engine = create_engine(self._config['SQLALCHEMY_DATABASE_URI'], **options)
+            apply_engine_profile(engine, self._config)
+            self._engine = engine
+        return self._engine
+
+    def flush(self, timeout=None):
+        """等待緩衝區中的變更全部寫入，返回是否在超時前完成"""
+        with self._cond:
+            if self._pid != os.getpid() or self._thread is None or not self._thread.is_alive():
+                return not self._buffer
+            self._flushing += 1
+            self._cond.notify_all()
+            try:
+                return self._cond.wait_for(lambda: not self._buffer and not self._inflight, timeout)
+            finally:
+                self._flushing -= 1
+
+    def shutdown(self, timeout=10):
+        """寫完緩衝區並停止寫入線程；之後的變更在提交方線程內直接寫入，直到下次在新進程中啟動"""
+        with self._cond:
+            if self._pid != os.getpid() or self._thread is None:
+                return
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.warning("審計寫入線程未在 %s 秒內結束，剩餘 %d 條變更未寫入", timeout, len(self._buffer))
+
+
+# 全局單例，在app.py與asgi.py中通過 init_app 加載配置
+audit_trail = AuditTrail()
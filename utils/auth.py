@@ -2,7 +2,9 @@
 
 from flask import request, jsonify, Blueprint
 from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
+from extensions import db
 from models.user import User
+from utils.hashing import password_hasher, HasherBusyError
 
 auth_bp = Blueprint("auth", __name__)
 
@@ -17,9 +19,9 @@ def register():
         return jsonify({"error": "Username already exists"}), 400
 
     new_user = User(username=username)
-    new_user.set_password(password)
+    # 在有界進程池中計算哈希，池滿時拋出HasherBusyError並返回429
+    new_user.password_hash = password_hasher.hash(password)
     
-    from app import db
     db.session.add(new_user)
     db.session.commit()
     
@@ -35,7 +37,10 @@ def login():
 
     user = User.query.filter_by(username=username).first()
 
-    if user and user.check_password(password):
+    if user and password_hasher.verify(user.password_hash, password):
+        if password_hasher.needs_rehash(user.password_hash):
+            _rehash_password(user, password)
+
         # 根據"記住我"選項設置過期時間
         if remember:
             # 對於"記住我"，我們使用刷新令牌來實現長期登錄
@@ -49,6 +54,15 @@ def login():
 
     return jsonify({"error": "Invalid credentials"}), 401
 
+def _rehash_password(user, password):
+    """哈希參數變更後，登錄成功時透明地按新參數重新哈希"""
+    try:
+        user.password_hash = password_hasher.hash(password)
+    except HasherBusyError:
+        # 進程池繁忙時跳過，下次登錄再重新哈希
+        return
+    db.session.commit()
+
 @auth_bp.route("/refresh", methods=["POST"])
 @jwt_required(refresh=True)
 def refresh():
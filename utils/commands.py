@@ -0,0 +1,106 @@
+# crm_project/utils/commands.py
+
+import click
+
+def register_commands(app):
+    """註冊 flask 命令行工具"""
+
+    @app.cli.command("rebuild-search-index")
+    def rebuild_search_index():
+        """根據銷售機會表全量重建全文索引"""
+        from dao.sales_dao import SalesDAO
+
+        count = SalesDAO().fulltext.rebuild()
+        click.echo(f"已為 {count} 條銷售機會建立全文索引")
+
+    @app.cli.command("rebuild-summary")
+    @click.option("--check", is_flag=True, help="只檢查匯總表是否漂移，不修改")
+    def rebuild_summary(check):
+        """根據銷售機會表重算銷售漏斗匯總"""
+        from dao.summary_dao import SummaryDAO
+
+        drift = SummaryDAO().rebuild(check=check)
+        for dimension, key, have, want in drift:
+            click.echo(f"{dimension}={key}: 匯總表 {have}，實際 {want}")
+        if check:
+            click.echo(f"發現 {len(drift)} 處漂移" if drift else "匯總表與銷售機會一致")
+            if drift:
+                raise SystemExit(1)
+        else:
+            click.echo(f"已重建匯總表，修正 {len(drift)} 處漂移")
+
+    @app.cli.command("backfill-changes")
+    def backfill_changes():
+        """升級已有數據庫：補建 version、updated_at、change_seq 列與相關表，為沒有序列號的銷售機會分配序列號"""
+        from dao.sales_dao import SalesDAO
+
+        sales_dao = SalesDAO()
+        count = sales_dao.changes.backfill()
+        if count:
+            # 運行中的worker可能緩存了沒有序列號的記錄
+            sales_dao.cache.invalidate_all()
+        click.echo(f"已為 {count} 條銷售機會分配變更序列號")
+
+    @app.cli.command("replicate")
+    @click.option("--interval", default=1.0, show_default=True, help="同步間隔（秒）")
+    @click.option("--delay", default=0.0, show_default=True, help="人為的複製延遲（秒）")
+    @click.option("--once", is_flag=True, help="只同步一次")
+    def replicate(interval, delay, once):
+        """本地開發用：把主庫持續複製到 DATABASE_REPLICA_URLS 中的SQLite副本"""
+        from extensions import db
+        from utils.replication import SQLiteReplicator
+
+        bind_keys = app.config["DATABASE_READ_BINDS"]
+        if not bind_keys:
+            raise click.UsageError("未配置 DATABASE_REPLICA_URLS")
+        # 使用引擎上的URL，相對路徑的SQLite文件已由 Flask-SQLAlchemy 解析到實例目錄
+        replicas = [db.engines[key].url for key in bind_keys]
+        replicator = SQLiteReplicator(db.engine.url, replicas, delay)
+        if once:
+            elapsed = replicator.sync_once(db.session)
+            click.echo(f"已同步 {len(replicas)} 個副本，用時 {elapsed * 1000:.1f}ms")
+            return
+        click.echo(f"每 {interval} 秒同步 {len(replicas)} 個副本，按 Ctrl+C 停止")
+        try:
+            replicator.run(db.session, interval)
+        except KeyboardInterrupt:
+            pass
+
+    @app.cli.command("import-opportunities")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--format", "format", type=click.Choice(("csv", "jsonl")), help="文件格式，默認根據擴展名判斷")
+    @click.option("--chunk-size", type=int, help="每個事務插入的行數，默認為 IMPORT_CHUNK_SIZE")
+    @click.option("--defer", is_flag=True, help="導入期間暫停二級索引、全文索引與匯總表的維護，完成時統一重建")
+    @click.option("--restart", is_flag=True, help="丟棄已有的檢查點，從頭導入")
+    @click.option("--rejects", "rejects_path", type=click.Path(dir_okay=False), help="校驗失敗的記錄寫入的文件")
+    @click.option("--progress-interval", default=2.0, show_default=True, help="報告進度的間隔（秒）")
+    def import_opportunities(path, format, chunk_size, defer, restart, rejects_path, progress_interval):
+        """從CSV或JSON Lines文件流式批量導入銷售機會，中斷後再次運行從檢查點繼續"""
+        import time
+        from services.import_service import OpportunityImportService
+
+        last_report = [time.perf_counter()]
+
+        def report(progress):
+            now = time.perf_counter()
+            if now - last_report[0] >= progress_interval:
+                last_report[0] = now
+                click.echo(_import_progress(progress))
+
+        try:
+            result = OpportunityImportService().import_file(
+                path, format, chunk_size or app.config["IMPORT_CHUNK_SIZE"], defer, restart, rejects_path, report
+            )
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        except KeyboardInterrupt:
+            raise click.ClickException("導入已中斷，已提交的數據保留，再次運行同一命令將從檢查點繼續")
+        click.echo(f"導入完成: {_import_progress(result)}")
+        if result["rejected"]:
+            click.echo(f"被拒絕的記錄已寫入 {result['rejects_path']}")
+
+
+def _import_progress(progress):
+    percent = progress["offset"] / progress["size"] * 100 if progress["size"] else 100.0
+    return (f"已導入 {progress['imported']} 行，拒絕 {progress['rejected']} 行，"
+            f"讀取 {percent:.1f}%，本次 {progress['rows_per_second']:.0f} 行/秒")
@@ -0,0 +1,68 @@
+# crm_project/utils/database.py
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# 可選的數據庫引擎配置檔
+ENGINE_PROFILES = ('default', 'production')
+
+
+def engine_options(config):
+    """
+    根據配置檔生成 SQLALCHEMY_ENGINE_OPTIONS
+    default 使用SQLAlchemy的默認設置；production 為服務器數據庫設置連接池大小、
+    溢出、回收與pre-ping，為SQLite文件數據庫設置連接池大小
+    :param config: 應用配置（字典或Config類的屬性映射）
+    """
+    profile = config.get('DATABASE_PROFILE', 'default')
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(f"不支持的數據庫配置檔: {profile}")
+    options = dict(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    if profile == 'default':
+        return options
+
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() == 'sqlite':
+        if url.database and url.database != ':memory:':
+            # 文件數據庫使用QueuePool；WAL模式下讀連接互不阻塞，連接數可與工作線程數一致
+            options.setdefault('pool_size', config['DATABASE_POOL_SIZE'])
+            options.setdefault('max_overflow', config['DATABASE_MAX_OVERFLOW'])
+            options.setdefault('pool_timeout', config['DATABASE_POOL_TIMEOUT'])
+        return options
+
+    options.setdefault('pool_size', config['DATABASE_POOL_SIZE'])
+    options.setdefault('max_overflow', config['DATABASE_MAX_OVERFLOW'])
+    options.setdefault('pool_timeout', config['DATABASE_POOL_TIMEOUT'])
+    # 早於數據庫或中間代理的空閒超時回收連接，並在取出時檢測失效連接
+    options.setdefault('pool_recycle', config['DATABASE_POOL_RECYCLE'])
+    options.setdefault('pool_pre_ping', config['DATABASE_POOL_PRE_PING'])
+    return options
+
+
+def apply_engine_profile(engine, config):
+    """
+    為引擎註冊連接事件：production 配置檔下，SQLite的每個新連接都執行 SQLITE_PRAGMAS
+    :return: 實際應用的PRAGMA字典
+    """
+    if config.get('DATABASE_PROFILE', 'default') != 'production' or engine.dialect.name != 'sqlite':
+        return {}
+    pragmas = dict(config.get('SQLITE_PRAGMAS') or {})
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    return pragmas
+
+
+def init_database(app, db):
+    """為應用的所有引擎應用配置檔，須在 SQLAlchemy(app) 之後、首次訪問數據庫之前調用"""
+    with app.app_context():
+        engines = set(db.engines.values())
+    for engine in engines:
+        apply_engine_profile(engine, app.config)
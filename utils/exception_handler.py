@@ -1,7 +1,9 @@
-_# crm_project/utils/exception_handler.py_
+# crm_project/utils/exception_handler.py
 
 from flask import jsonify
 from werkzeug.exceptions import HTTPException
+from utils.hashing import HasherBusyError
+from utils.rate_limit import RateLimitExceeded, ServerOverloaded
 
 def register_error_handlers(app):
     """註冊全局異常處理器"""
@@ -18,6 +20,30 @@ def register_error_handlers(app):
         response.content_type = "application/json"
         return response
 
+    @app.errorhandler(HasherBusyError)
+    def handle_hasher_busy(e):
+        """密碼哈希進程池已滿，快速拒絕"""
+        response = jsonify({"error": str(e)})
+        response.status_code = 429
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response
+
+    @app.errorhandler(RateLimitExceeded)
+    def handle_rate_limit_exceeded(e):
+        """調用方超出限額"""
+        response = jsonify({"error": str(e)})
+        response.status_code = 429
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response
+
+    @app.errorhandler(ServerOverloaded)
+    def handle_server_overloaded(e):
+        """worker過載，丟棄開銷較大的請求"""
+        response = jsonify({"error": str(e)})
+        response.status_code = 503
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response
+
     @app.errorhandler(ValueError)
     def handle_value_error(e):
         """處理ValueError"""
@@ -0,0 +1,136 @@
+# crm_project/utils/hashing.py
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HasherBusyError(Exception):
+    """密碼哈希進程池已滿，請求應被快速拒絕（429）"""
+
+    def __init__(self, retry_after):
+        super().__init__("Too many concurrent authentication requests")
+        self.retry_after = retry_after
+
+
+def _hash(password, method):
+    return generate_password_hash(password, method=method)
+
+
+def _verify(pwhash, password):
+    return check_password_hash(pwhash, password)
+
+
+def _mp_context():
+    """
+    進程池子進程的啟動方式
+    進程池在多線程的worker中延遲創建，fork出的子進程可能繼承其他線程持有的鎖（日誌、連接池）而死鎖，
+    因此不使用fork：優先forkserver（由單線程的服務進程派生），不支持時（Windows）使用spawn
+    """
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(method)
+
+
+class PasswordHasher:
+    """
+    在獨立的有界進程池中執行密碼哈希，避免PBKDF2等慢哈希佔滿請求線程
+    同時進行中的任務數（執行中 + 排隊）有上限，超出時立即拋出 HasherBusyError；
+    workers 為0時在當前線程內直接計算
+    """
+
+    def __init__(self, app=None):
+        self.method = 'pbkdf2:sha256:600000'
+        self._prefix = None
+        self.workers = 0
+        self.retry_after = 1
+        self._slots = None
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.method = app.config['PASSWORD_HASH_METHOD']
+        self._prefix = None
+        self.workers = app.config['PASSWORD_HASH_WORKERS']
+        self.retry_after = app.config['PASSWORD_HASH_RETRY_AFTER']
+        self._slots = threading.BoundedSemaphore(self.workers + app.config['PASSWORD_HASH_QUEUE_SIZE'])
+
+    def hash(self, password):
+        """生成密碼哈希"""
+        return self._run(_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        """校驗密碼"""
+        return self._run(_verify, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """哈希參數（算法、迭代次數等）與當前配置不一致時需要重新哈希"""
+        return pwhash.split('$', 1)[0] != self._method_prefix()
+
+    def _method_prefix(self):
+        """
+        當前配置生成的哈希前綴
+        配置可以省略參數（例如 scrypt、pbkdf2:sha256），而生成的哈希總是寫出完整的參數
+        （scrypt:32768:8:1、pbkdf2:sha256:600000），因此以實際生成一次的哈希為準；
+        在第一次校驗登錄時經進程池計算，不增加啟動時間，也不佔用請求線程的CPU
+        """
+        if self._prefix is None:
+            self._prefix = self._run(_hash, '', self.method).split('$', 1)[0]
+        return self._prefix
+
+    def _run(self, func, *args):
+        if not self.workers:
+            return func(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusyError(self.retry_after)
+        executor = self._get_executor()
+        try:
+            return self._submit(executor, func, *args)
+        except BrokenProcessPool:
+            # 子進程被殺死（例如OOM）後進程池不再可用：重建進程池並重試一次
+            self._discard_executor(executor)
+            if not self._slots.acquire(blocking=False):
+                raise HasherBusyError(self.retry_after)
+            return self._submit(self._get_executor(), func, *args)
+
+    def _submit(self, executor, func, *args):
+        """提交任務並等待結果；調用前已佔用一個名額，任務結束（或提交失敗）時釋放"""
+        try:
+            future = executor.submit(func, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def _get_executor(self):
+        # 預派生（prefork）部署中每個worker進程在首次使用時各自創建進程池
+        if self._pid != os.getpid() or self._executor is None:
+            with self._lock:
+                if self._pid != os.getpid() or self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=_mp_context())
+                    self._pid = os.getpid()
+        return self._executor
+
+    def _discard_executor(self, executor):
+        """丟棄已損壞的進程池，下次使用時重建；其他線程已重建時不重複丟棄"""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def shutdown(self):
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=True)
+        self._executor = None
+        self._pid = None
+
+
+# 全局實例，在app.py中通過 init_app 加載配置
+password_hasher = PasswordHasher()
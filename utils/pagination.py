@@ -0,0 +1,76 @@
+# crm_project/utils/pagination.py
+
+import base64
+import datetime
+import json
+
+
+def parse_sort(sort, allowed_fields, default='id'):
+    """
+    解析排序參數，例如 "amount,-created_at"（前綴"-"表示降序）
+    :param sort: 排序字符串
+    :param allowed_fields: 允許排序的字段
+    :return: [(字段名, 是否降序), ...]，始終以id作為最後的決勝字段，保證順序穩定
+    """
+    spec = []
+    for part in (sort or default).split(','):
+        part = part.strip()
+        if not part:
+            continue
+        descending = part.startswith('-')
+        name = part.lstrip('+-')
+        if name not in allowed_fields:
+            raise ValueError(f"不支持的排序字段: {name}")
+        if any(name == field for field, _ in spec):
+            raise ValueError(f"重複的排序字段: {name}")
+        spec.append((name, descending))
+
+    if not any(field == 'id' for field, _ in spec):
+        # 決勝字段與最後一個排序字段同向，使 (字段, id) 複合索引可以直接使用
+        spec.append(('id', spec[-1][1] if spec else False))
+    return spec
+
+
+def _sort_key(spec):
+    return ','.join(('-' if descending else '') + name for name, descending in spec)
+
+
+def _dump_value(value):
+    if isinstance(value, datetime.datetime):
+        return {'$dt': value.isoformat()}
+    return value
+
+
+def _load_value(value):
+    if isinstance(value, dict) and '$dt' in value:
+        return datetime.datetime.fromisoformat(value['$dt'])
+    return value
+
+
+def encode_cursor(spec, values):
+    """將最後一行的排序鍵值編碼為不透明的游標"""
+    payload = {'s': _sort_key(spec), 'v': [_dump_value(v) for v in values]}
+    raw = json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, spec):
+    """
+    解碼游標
+    :raises ValueError: 游標格式錯誤或與當前排序條件不一致
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw.decode('utf-8'))
+        sort_key, values = payload['s'], payload['v']
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("無效的分頁游標")
+
+    if not isinstance(values, list):
+        raise ValueError("無效的分頁游標")
+    if sort_key != _sort_key(spec) or len(values) != len(spec):
+        raise ValueError("分頁游標與排序條件不匹配")
+    try:
+        return [_load_value(v) for v in values]
+    except (ValueError, TypeError):
+        raise ValueError("無效的分頁游標")
@@ -0,0 +1,163 @@
+# crm_project/utils/profiling.py
+
+import time
+from contextlib import contextmanager
+
+from flask import current_app, g, has_app_context, request
+from flask.json.provider import JSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class RequestProfile:
+    """單個請求的SQL與各階段耗時統計"""
+
+    __slots__ = ('started', 'query_count', 'db_time', 'spans', 'statements')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.db_time = 0.0
+        # {階段名稱: 秒}，階段耗時已扣除其間的SQL執行時間
+        self.spans = {}
+        # {SQL語句: [執行次數, 總耗時]}
+        self.statements = {}
+
+    def record_query(self, statement, elapsed, max_statements):
+        self.query_count += 1
+        self.db_time += elapsed
+        stats = self.statements.get(statement)
+        if stats is not None:
+            stats[0] += 1
+            stats[1] += elapsed
+        elif len(self.statements) < max_statements:
+            self.statements[statement] = [1, elapsed]
+
+    def repeated(self, threshold):
+        """執行次數達到閾值的相同語句，通常意味著N+1查詢"""
+        return [(sql, count) for sql, (count, _) in self.statements.items() if count >= threshold]
+
+
+class ProfilingJSONProvider(JSONProvider):
+    """包裝應用原有的JSON提供者，將jsonify的JSON編碼耗時計入serialize階段"""
+
+    def __init__(self, app, provider):
+        super().__init__(app)
+        self.provider = provider
+
+    def __getattr__(self, name):
+        # sort_keys、mimetype 等屬性沿用被包裝的提供者
+        return getattr(self.provider, name)
+
+    def dumps(self, obj, **kwargs):
+        with request_profiler.span('serialize'):
+            return self.provider.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        return self.provider.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        with request_profiler.span('serialize'):
+            return self.provider.response(*args, **kwargs)
+
+
+class RequestProfiler:
+    """
+    請求級性能埋點
+    通過SQLAlchemy引擎事件統計每個請求的查詢次數與SQL耗時，配合代碼中的span
+    統計ORM查詢（hydrate，含語句編譯、獲取連接與構建對象）和序列化（serialize）耗時，
+    以 Server-Timing 響應頭返回；
+    同一請求內重複執行的相同語句記為疑似N+1，慢請求連同其SQL語句寫入日誌
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.slow_request_ms = 500
+        self.n_plus_one_threshold = 5
+        self.max_statements = 50
+        self._listening = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('PROFILING_ENABLED', False)
+        self.slow_request_ms = app.config.get('PROFILING_SLOW_REQUEST_MS', self.slow_request_ms)
+        self.n_plus_one_threshold = app.config.get('PROFILING_N_PLUS_ONE_THRESHOLD', self.n_plus_one_threshold)
+        self.max_statements = app.config.get('PROFILING_MAX_STATEMENTS', self.max_statements)
+        if not self.enabled:
+            return
+
+        app.json = ProfilingJSONProvider(app, app.json)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        if not self._listening:
+            # 監聽Engine類，覆蓋應用創建的所有引擎
+            event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+            self._listening = True
+
+    @staticmethod
+    def current():
+        """當前請求的統計；不在請求中或未啟用時返回None"""
+        return g.get('_request_profile') if has_app_context() else None
+
+    @contextmanager
+    def span(self, name):
+        """
+        統計一段代碼的耗時並計入指定階段，其間的SQL執行時間不計入
+        不在請求中時不做任何統計
+        """
+        profile = self.current()
+        if profile is None:
+            yield
+            return
+        start, db_time = time.perf_counter(), profile.db_time
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start - (profile.db_time - db_time)
+            profile.spans[name] = profile.spans.get(name, 0.0) + elapsed
+
+    def _start(self):
+        g._request_profile = RequestProfile()
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None and self.current() is not None:
+            context._profiling_start = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, '_profiling_start', None)
+        if start is None:
+            return
+        profile = self.current()
+        if profile is not None:
+            profile.record_query(statement, time.perf_counter() - start, self.max_statements)
+
+    def _finish(self, response):
+        profile = g.pop('_request_profile', None)
+        if profile is None:
+            return response
+        total = time.perf_counter() - profile.started
+
+        metrics = [f'db;dur={profile.db_time * 1000:.2f};desc="{profile.query_count} queries"']
+        metrics += [f'{name};dur={elapsed * 1000:.2f}' for name, elapsed in profile.spans.items()]
+        metrics.append(f'total;dur={total * 1000:.2f}')
+        response.headers.add('Server-Timing', ', '.join(metrics))
+
+        repeated = profile.repeated(self.n_plus_one_threshold)
+        for statement, count in repeated:
+            current_app.logger.warning(
+                "疑似N+1查詢: %s %s 中相同語句執行了%d次: %s", request.method, request.path, count, statement
+            )
+        if total * 1000 >= self.slow_request_ms:
+            statements = sorted(profile.statements.items(), key=lambda item: item[1][1], reverse=True)
+            current_app.logger.warning(
+                "慢請求: %s %s 用時%.1fms，%d次查詢，SQL用時%.1fms\n%s",
+                request.method, request.path, total * 1000, profile.query_count, profile.db_time * 1000,
+                '\n'.join(f'  {count}次 {elapsed * 1000:.1f}ms  {sql}' for sql, (count, elapsed) in statements),
+            )
+        return response
+
+
+# 全局單例，在app.py中綁定應用
+request_profiler = RequestProfiler()
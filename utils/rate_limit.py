@@ -0,0 +1,232 @@
+# crm_project/utils/rate_limit.py
+
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+from functools import wraps
+
+from flask import Response, request
+from flask_jwt_extended import get_jwt_identity
+
+
+class RateLimitExceeded(Exception):
+    """調用方的令牌桶餘額不足，請求應被拒絕（429）"""
+
+    def __init__(self, retry_after):
+        super().__init__("Rate limit exceeded")
+        self.retry_after = retry_after
+
+
+class ServerOverloaded(Exception):
+    """worker過載，按負載丟棄開銷較大的請求（503）"""
+
+    def __init__(self, retry_after):
+        super().__init__("Server is overloaded, please retry later")
+        self.retry_after = retry_after
+
+
+def _refill(tokens, updated, now, capacity, rate, cost):
+    """
+    按經過的時間補充令牌並嘗試扣除cost
+    :return: (是否允許, 扣除後的令牌數)
+    """
+    tokens = min(capacity, tokens + max(now - updated, 0.0) * rate)
+    if tokens >= cost:
+        return True, tokens - cost
+    return False, tokens
+
+
+class MemoryBucketStore:
+    """進程內的令牌桶存儲，只在單進程部署（或開發、測試）中使用"""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, cost, capacity, rate):
+        now = time.time()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            allowed, tokens = _refill(tokens, updated, now, capacity, rate, cost)
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > 10000:
+                self._purge(now, capacity, rate)
+        return allowed, tokens
+
+    def _purge(self, now, capacity, rate):
+        """清理已經補滿的桶，與不存在時的初始狀態相同"""
+        horizon = now - capacity / rate
+        self._buckets = {k: v for k, v in self._buckets.items() if v[1] >= horizon}
+
+
+class SQLiteBucketStore:
+    """
+    基於SQLite文件的令牌桶存儲，同一主機上的所有預派生worker共用，限額在進程之間保持一致
+    每次扣除在一個 BEGIN IMMEDIATE 事務中讀取並更新一行；限流狀態可以丟失，不做fsync
+    所有worker的每個受限請求都串行地取得同一個文件的寫鎖：扣除吞吐量不隨worker數增加
+    （本地磁盤上合計約每秒數萬次，見 README），磁盤較慢或競爭激烈時等待寫鎖的時間直接計入請求延遲，
+    因此需通過 RATE_LIMIT_STORAGE=sqlite 顯式啟用
+    """
+
+    # 平均每多少次扣除清理一次已補滿的桶
+    PURGE_EVERY = 1000
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        # 連接不能跨進程或線程共享：每個worker進程的每個線程各自打開
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS rate_limit_buckets '
+                '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)'
+            )
+            local.connection, local.pid = connection, os.getpid()
+        return local.connection
+
+    def take(self, key, cost, capacity, rate):
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            now = time.time()
+            row = connection.execute(
+                'SELECT tokens, updated FROM rate_limit_buckets WHERE key = ?', (key,)
+            ).fetchone()
+            allowed, tokens = _refill(*(row or (capacity, now)), now, capacity, rate, cost)
+            connection.execute(
+                'INSERT INTO rate_limit_buckets (key, tokens, updated) VALUES (?, ?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated',
+                (key, tokens, now),
+            )
+            if random.randrange(self.PURGE_EVERY) == 0:
+                connection.execute('DELETE FROM rate_limit_buckets WHERE updated < ?', (now - capacity / rate,))
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        return allowed, tokens
+
+
+class RateLimiter:
+    """
+    按JWT身份的令牌桶限流與按負載丟棄請求
+    - 每個身份一個容量為 RATE_LIMIT_CAPACITY、每秒補充 RATE_LIMIT_REFILL_PER_SECOND 個令牌的桶，
+      每個請求按開銷扣除 RATE_LIMIT_COSTS 中對應的令牌數（按ID讀取便宜，不帶過濾條件的全表列表昂貴），
+      餘額不足時返回429並在 Retry-After 中給出補足所需的秒數；
+    - 負載丟棄：worker內請求延遲的指數移動平均超過 RATE_LIMIT_SHED_LATENCY_MS，
+      且同時處理中的請求數（含本請求）達到 RATE_LIMIT_SHED_QUEUE_DEPTH 時，開銷高於最便宜一檔的請求直接返回503，
+      先保證按ID讀取等輕量請求；延遲與處理中的請求數按worker進程各自統計，
+      一個worker同時處理的請求數不超過其線程數，隊列深度默認等於 GUNICORN_THREADS，即所有線程都在忙；
+      流式響應（導出）的延遲與處理中狀態持續到響應體發送完畢
+    """
+
+    # 延遲指數移動平均中最新樣本的權重
+    LATENCY_ALPHA = 0.2
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.capacity = 300
+        self.rate = 10.0
+        self.costs = {}
+        self.shed_latency = 1.0
+        self.shed_queue_depth = 16
+        self.shed_retry_after = 1
+        self.store = None
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self._latency = 0.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config['RATE_LIMIT_ENABLED']
+        self.capacity = app.config['RATE_LIMIT_CAPACITY']
+        self.rate = app.config['RATE_LIMIT_REFILL_PER_SECOND']
+        self.costs = dict(app.config['RATE_LIMIT_COSTS'])
+        self.shed_latency = app.config['RATE_LIMIT_SHED_LATENCY_MS'] / 1000
+        self.shed_queue_depth = app.config['RATE_LIMIT_SHED_QUEUE_DEPTH']
+        self.shed_retry_after = app.config['RATE_LIMIT_SHED_RETRY_AFTER']
+        storage = app.config['RATE_LIMIT_STORAGE']
+        if storage == 'sqlite':
+            self.store = SQLiteBucketStore(app.config['RATE_LIMIT_STORAGE_PATH'])
+        elif storage == 'memory':
+            self.store = MemoryBucketStore()
+        else:
+            raise ValueError(f"不支持的限流存儲: {storage}")
+
+    def limit(self, cost):
+        """
+        路由裝飾器，放在 jwt_required 之後
+        :param cost: RATE_LIMIT_COSTS 中的開銷名稱，或根據當前請求返回開銷名稱的函數
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return view(*args, **kwargs)
+                # 先計入處理中的請求，判斷過載時包含本請求
+                with self._lock:
+                    self._inflight += 1
+                start = time.perf_counter()
+                try:
+                    self.check(self.costs[cost() if callable(cost) else cost])
+                except Exception:
+                    with self._lock:
+                        self._inflight -= 1
+                    raise
+                return self._timed(start, view, *args, **kwargs)
+            return wrapper
+        return decorator
+
+    def check(self, cost):
+        """按當前負載與調用方的令牌桶決定是否接受開銷為cost的請求，拒絕時拋出異常"""
+        if cost > min(self.costs.values(), default=0) and self.overloaded():
+            raise ServerOverloaded(self.shed_retry_after)
+        # 開銷超過桶容量的請求在桶滿時仍可執行
+        cost = min(cost, self.capacity)
+        allowed, tokens = self.store.take(self._key(), cost, self.capacity, self.rate)
+        if not allowed:
+            raise RateLimitExceeded(max(1, math.ceil((cost - tokens) / self.rate)))
+
+    def overloaded(self):
+        with self._lock:
+            return self._latency > self.shed_latency and self._inflight >= self.shed_queue_depth
+
+    def _timed(self, start, view, *args, **kwargs):
+        """執行視圖，結束時減少處理中的請求數並更新延遲的移動平均"""
+        try:
+            response = view(*args, **kwargs)
+        except BaseException:
+            self._finish(start)
+            raise
+        if isinstance(response, Response) and response.is_streamed:
+            # 流式響應在視圖返回後才逐塊生成並發送：在響應關閉時結束計時
+            response.call_on_close(lambda: self._finish(start))
+        else:
+            self._finish(start)
+        return response
+
+    def _finish(self, start):
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._inflight -= 1
+            self._latency += self.LATENCY_ALPHA * (elapsed - self._latency)
+
+    @staticmethod
+    def _key():
+        identity = get_jwt_identity()
+        if identity is not None:
+            return f'user:{identity}'
+        return f'ip:{request.remote_addr}'
+
+
+# 全局單例，在app.py中通過 init_app 加載配置
+rate_limiter = RateLimiter()
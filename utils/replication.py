@@ -0,0 +1,258 @@
+# crm_project/utils/replication.py
+
+import math
+import random
+import sqlite3
+import threading
+import time
+
+from flask import g, has_request_context
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, select
+from sqlalchemy.engine import make_url
+
+# 會話 info 中記錄本事務是否有寫入的鍵
+WROTE_KEY = 'replication_wrote'
+# 代計數器中記錄用戶最近一次寫入時間的槽位鍵前綴
+LAST_WRITE_KEY = 'last_write'
+
+
+class RoutingSession(Session):
+    """
+    按讀寫路由的會話：帶有 read_replica 標記的查詢發往只讀副本，其餘查詢、
+    flush 以及本事務已有寫入之後的查詢都發往主庫
+    讀查詢通過 query.execution_options(read_replica=True) 或
+    session.get(..., bind_arguments={'read_replica': True}) 標記
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        wants_replica = kwargs.pop('read_replica', False) or (
+            clause is not None and clause.get_execution_options().get('read_replica', False)
+        )
+        if wants_replica and bind is None and not self._flushing and not self.info.get(WROTE_KEY):
+            bind_key = replica_router.read_bind()
+            if bind_key is not None:
+                return self._db.engines[bind_key]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaRouter:
+    """
+    只讀副本路由
+    - 每個請求選定一個副本（請求內的讀取看到一致的數據），無可用副本時使用主庫；
+    - 讀你所寫：用戶寫入後 READ_YOUR_WRITES_SECONDS 內的讀取固定走主庫，之後只使用
+      心跳時間晚於該用戶最近一次寫入的副本（副本已包含這次寫入）；
+    - 複製延遲：按 REPLICA_LAG_CHECK_INTERVAL 讀取副本的心跳，延遲超過
+      REPLICA_MAX_LAG_SECONDS 或無法讀取的副本暫時不再接收讀流量
+    用戶最近的寫入時間按JWT身份記錄在DAO緩存的共享代計數器中（同一主機上的所有worker共用），
+    不依賴客戶端cookie；身份哈希到與緩存共用的槽位，衝突時只會讓少數用戶多走一段時間主庫
+    """
+
+    def __init__(self, app=None, db=None):
+        self.db = None
+        self.read_binds = ()
+        self.sticky_seconds = 5
+        self.max_lag = 10
+        self.lag_check_interval = 1
+        self._lock = threading.Lock()
+        # {副本: (檢查時間, 心跳時間)}
+        self._heartbeats = {}
+        self.generations = None
+        self._listening = False
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db, generations=None):
+        """
+        :param generations: 記錄用戶最近寫入時間的代計數器（dao.cache.DAOCache），
+                            在使用時才讀取其存儲，可先於DAO緩存初始化
+        """
+        self.db = db
+        if generations is None:
+            from dao.cache import dao_cache as generations
+        self.generations = generations
+        self.read_binds = tuple(app.config.get('DATABASE_READ_BINDS') or ())
+        self.sticky_seconds = app.config.get('READ_YOUR_WRITES_SECONDS', self.sticky_seconds)
+        self.max_lag = app.config.get('REPLICA_MAX_LAG_SECONDS', self.max_lag)
+        self.lag_check_interval = app.config.get('REPLICA_LAG_CHECK_INTERVAL', self.lag_check_interval)
+
+        if not self._listening:
+            # 監聽會話類，create_app 多次調用時只註冊一次
+            event.listen(RoutingSession, 'after_flush', self._on_write)
+            event.listen(RoutingSession, 'do_orm_execute', self._on_execute)
+            event.listen(RoutingSession, 'after_commit', self._after_commit)
+            event.listen(RoutingSession, 'after_rollback', self._after_rollback)
+            self._listening = True
+
+    @property
+    def enabled(self):
+        return bool(self.read_binds)
+
+    def read_bind(self):
+        """當前請求的讀查詢應使用的副本，None表示使用主庫"""
+        if not self.enabled or not has_request_context():
+            return None
+        if '_read_bind' not in g:
+            g._read_bind = self._choose_bind()
+        return g._read_bind
+
+    def pinned(self):
+        """當前用戶處於讀你所寫的窗口內，讀取固定走主庫"""
+        if not self.enabled or not has_request_context():
+            return False
+        last_write = self._last_write()
+        return last_write is not None and time.time() - last_write < self.sticky_seconds
+
+    def fresh_as_of(self):
+        """
+        當前請求的讀取至少包含此時間（time.time()）之前提交的寫入：
+        讀主庫時為無窮大，讀副本時為該副本的心跳時間，心跳未知時為0
+        """
+        bind_key = self.read_bind()
+        if bind_key is None:
+            return math.inf
+        return self._heartbeat(bind_key, time.time()) or 0.0
+
+    def _choose_bind(self):
+        last_write = self._last_write()
+        now = time.time()
+        if last_write is not None and now - last_write < self.sticky_seconds:
+            return None
+        candidates = []
+        for bind_key in self.read_binds:
+            heartbeat = self._heartbeat(bind_key, now)
+            if heartbeat is None or now - heartbeat > self.max_lag:
+                continue
+            if last_write is not None and heartbeat < last_write:
+                continue
+            candidates.append(bind_key)
+        return random.choice(candidates) if candidates else None
+
+    def _heartbeat(self, bind_key, now):
+        """副本的心跳時間，每個副本每 lag_check_interval 秒最多讀取一次"""
+        with self._lock:
+            checked_at, heartbeat = self._heartbeats.get(bind_key, (None, None))
+        if checked_at is not None and now - checked_at < self.lag_check_interval:
+            return heartbeat
+
+        from models.replication import ReplicationHeartbeat
+
+        try:
+            with self.db.engines[bind_key].connect() as connection:
+                heartbeat = connection.scalar(select(ReplicationHeartbeat.updated_at))
+        except Exception:
+            # 副本不可用或尚未完成首次複製
+            heartbeat = None
+        with self._lock:
+            self._heartbeats[bind_key] = (now, heartbeat)
+        return heartbeat
+
+    def lag(self, bind_key):
+        """副本的複製延遲（秒），無法確定時為None"""
+        heartbeat = self._heartbeat(bind_key, time.time())
+        return None if heartbeat is None else max(time.time() - heartbeat, 0.0)
+
+    def _identity(self):
+        try:
+            return get_jwt_identity()
+        except RuntimeError:
+            return None
+
+    def _last_write_slot(self):
+        """當前用戶在代計數器中的槽位，未認證時為None"""
+        identity = self._identity()
+        return None if identity is None else self.generations.slot(f'{LAST_WRITE_KEY}:{identity}')
+
+    def _last_write(self):
+        slot = self._last_write_slot()
+        if slot is None:
+            return None
+        # 代號即最近一次寫入的時間（微秒），0表示從未寫入
+        generation = self.generations.store.get(slot)
+        return generation / 1_000_000 if generation else None
+
+    def mark_write(self):
+        """記錄當前用戶的寫入，本請求之後的讀取與其後一段時間內的請求都走主庫"""
+        if not self.enabled or not has_request_context():
+            return
+        g._read_bind = None
+        slot = self._last_write_slot()
+        if slot is not None:
+            self.generations.store.bump([slot])
+
+    def _on_write(self, session, flush_context):
+        session.info[WROTE_KEY] = True
+
+    def _on_execute(self, orm_execute_state):
+        if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+            orm_execute_state.session.info[WROTE_KEY] = True
+
+    def _after_commit(self, session):
+        if session.info.pop(WROTE_KEY, False):
+            self.mark_write()
+
+    def _after_rollback(self, session):
+        session.info.pop(WROTE_KEY, None)
+
+
+def write_heartbeat(session):
+    """在主庫寫入心跳時間"""
+    from models.replication import ReplicationHeartbeat
+
+    ReplicationHeartbeat.__table__.create(session.connection(), checkfirst=True)
+    heartbeat = session.get(ReplicationHeartbeat, 1)
+    if heartbeat is None:
+        session.add(ReplicationHeartbeat(id=1, updated_at=time.time()))
+    else:
+        heartbeat.updated_at = time.time()
+    session.commit()
+
+
+class SQLiteReplicator:
+    """
+    本地開發用的副本同步器，代替真實的數據庫複製：
+    定時在主庫寫入心跳，再用SQLite在線備份API把主庫完整複製到每個副本文件
+    :param delay: 人為的複製延遲（秒），用於驗證延遲處理
+    """
+
+    def __init__(self, primary_url, replica_urls, delay=0.0):
+        self.primary = self._path(primary_url)
+        self.replicas = [self._path(url) for url in replica_urls]
+        self.delay = delay
+
+    @staticmethod
+    def _path(url):
+        url = make_url(url)
+        if url.get_backend_name() != 'sqlite' or not url.database or url.database == ':memory:':
+            raise ValueError(f"副本同步器只支持SQLite文件數據庫: {url}")
+        return url.database
+
+    def sync_once(self, session):
+        """寫入心跳並複製一次，返回用時（秒）"""
+        write_heartbeat(session)
+        if self.delay:
+            time.sleep(self.delay)
+        start = time.perf_counter()
+        source = sqlite3.connect(self.primary)
+        try:
+            for path in self.replicas:
+                target = sqlite3.connect(path)
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+        finally:
+            source.close()
+        return time.perf_counter() - start
+
+    def run(self, session, interval=1.0, stop=None):
+        """每 interval 秒同步一次，直到 stop 事件被設置"""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            self.sync_once(session)
+            stop.wait(interval)
+
+
+# 全局單例，在app.py中綁定應用
+replica_router = ReplicaRouter()
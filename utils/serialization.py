@@ -0,0 +1,77 @@
+# crm_project/utils/serialization.py
+
+import datetime
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # 可選依賴，未安裝時使用標準庫json
+    orjson = None
+
+# 可選的JSON提供者，auto 表示已安裝orjson時使用orjson
+JSON_PROVIDERS = ('auto', 'orjson', 'stdlib')
+
+
+def _default(o):
+    """datetime/date 輸出為ISO 8601（與 to_dict 一致），其餘類型沿用Flask的默認處理"""
+    if isinstance(o, (datetime.date, datetime.time)):
+        return o.isoformat()
+    return DefaultJSONProvider.default(o)
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """標準庫json編碼，直接序列化查詢得到的datetime值"""
+
+    default = staticmethod(_default)
+
+
+class OrjsonJSONProvider(DefaultJSONProvider):
+    """
+    orjson編碼：在C中直接生成UTF-8字節並原生序列化datetime，
+    jsonify 的響應體不再經過 str 再編碼
+    """
+
+    default = staticmethod(_default)
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            # orjson不支持 indent/separators 等標準庫參數
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode('utf-8')
+
+    def dumps_bytes(self, obj, indent=False):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(self.dumps_bytes(obj, indent), mimetype=self.mimetype)
+
+
+def create_json_provider(app):
+    """
+    按 JSON_PROVIDER 配置創建應用的JSON提供者
+    :raises ValueError: 未知的提供者，或指定了orjson但未安裝
+    """
+    name = app.config.get('JSON_PROVIDER', 'auto')
+    if name not in JSON_PROVIDERS:
+        raise ValueError(f"不支持的JSON提供者: {name}")
+    if name == 'orjson' and orjson is None:
+        raise ValueError("JSON_PROVIDER=orjson 需要先安裝 orjson")
+    if name == 'stdlib' or orjson is None:
+        return StdlibJSONProvider(app)
+    return OrjsonJSONProvider(app)
+
+
+def init_json(app):
+    """為應用註冊JSON提供者，需在 request_profiler.init_app 之前調用"""
+    app.json = create_json_provider(app)
@@ -0,0 +1,12 @@
+# crm_project/wsgi.py
+
+"""
+WSGI入口，創建應用實例
+
+啟動:
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+from app import create_app
+
+app = create_app()